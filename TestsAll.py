@@ -3,6 +3,16 @@
 from fracdim_tests.TestFracdimUtils import *
 from fracdim_tests.TestFractalGenerator import *
 from fracdim_tests.TestTimeSeries import *
+from fracdim_tests.TestParallelCounting import *
+from fracdim_tests.TestBenchmarks import *
+from fracdim_tests.TestCorrelationSum import *
+from fracdim_tests.TestMultifractal import *
+from fracdim_tests.TestKernels import *
+from fracdim_tests.TestCountCache import *
+from fracdim_tests.TestQuantization import *
+from fracdim_tests.TestPackage import *
+from fracdim_tests.TestCommandLine import *
+from fracdim_tests.TestScalingRegion import *
 
 if __name__ == "__main__":
     unittest.main()
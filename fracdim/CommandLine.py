@@ -0,0 +1,196 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import ParallelCounting as pc
+from fracdim import ScalingRegion as sr
+from fracdim import TimeSeries as ts
+
+
+def load_points(path, dimension=1, lag=1, dtype="float64", columns=1):
+    """
+    Open input file without reading it whenever possible. One-column data is a series and is
+    time-delay embedded, data with several columns is a set of points
+    :param path: .npy file, .csv file or raw binary file of any other extension
+    :param dimension: embedding dimension for series
+    :param lag: embedding time delay for series
+    :param dtype: samples type of raw binary file
+    :param columns: columns count of raw binary file
+    :return: (N, dim) array of points, memory-mapped for .npy and raw files
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        data = np.load(path, mmap_mode="r")
+    elif extension == ".csv":
+        data = np.loadtxt(path, delimiter=",", ndmin=2)
+    else:
+        data = np.memmap(path, dtype=np.dtype(dtype), mode="r")
+        data = data[:data.shape[0] - data.shape[0] % columns].reshape((-1, columns))
+
+    if data.ndim == 2 and data.shape[1] == 1:
+        data = data[:, 0]
+    if data.ndim == 1:
+        return fu.time_delay_embedding(data, dimension, lag)
+    if data.ndim != 2:
+        raise Exception("Input should be a series or a 2-D array of points")
+    return data
+
+
+def analyze_file(path, dimension=1, lag=1, scales=None, mode="points", cube=False, dtype="float64",
+                 columns=1, region=False):
+    """
+    Blocks counts and fractal dimension of one input file
+    :param region: fit dimension over automatically detected scaling region only
+    :return: dictionary with file name, points count, scales, counts, dimension, input file size in
+             bytes and seconds, and also confidence interval and scaling region when region is True
+    """
+    start = time.perf_counter()
+    points = load_points(path, dimension, lag, dtype, columns)
+    pointsCount, dim = points.shape
+    if pointsCount == 0:
+        raise Exception("No points in input")
+
+    if scales is None:
+        scales = ts.default_scales(pointsCount, dim)
+    globalCell = fu.bounding_cell(points, cube)
+    finest = max(scales)
+    if mode == "points" and all(finest % s == 0 for s in scales):
+        counts, fitted = fu.box_counting(points, globalCell, scales)
+    else:
+        counter = fu.BlocksCounter(globalCell=globalCell, mode=mode)
+        counts = []
+        for s in scales:
+            counter.set_cells_per_axis(s)
+            counts.append(counter.calculate(points))
+        fitted = fu.fit_dimension(scales, counts)
+
+    record = {"file": path, "points": int(pointsCount), "scales": [int(s) for s in scales],
+              "counts": [int(c) for c in counts], "dimension": float(fitted),
+              "bytes": os.path.getsize(path)}
+    if region:
+        fit = sr.fit_scaling_region(scales, counts, minPoints=max(3, min(4, len(scales))))
+        record["dimension"] = fit.slope
+        record["lower"] = fit.lower
+        record["upper"] = fit.upper
+        record["region"] = [int(s) for s in scales[fit.begin:fit.end]]
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def _analyze_safely(path, options):
+    try:
+        return analyze_file(path, **options)
+    except Exception as e:
+        return {"file": path, "error": str(e)}
+
+
+class ResultWriter:
+    """
+    Writes results one by one as they are ready, in JSON lines or CSV format
+    """
+    CSV_FIELDS = ["file", "points", "dimension", "lower", "upper", "seconds", "scales", "counts", "region",
+                  "error"]
+
+    def __init__(self, stream, format="jsonl"):
+        if format != "jsonl" and format != "csv":
+            raise Exception("Invalid output format")
+        self.__stream = stream
+        self.__csv = None
+        if format == "csv":
+            self.__csv = csv.DictWriter(stream, fieldnames=self.CSV_FIELDS, extrasaction="ignore")
+            self.__csv.writeheader()
+
+    def write(self, record):
+        # Undefined values, e.g. dimension fitted by one scale, are null in JSON and empty in CSV
+        record = {key: None if isinstance(value, float) and not math.isfinite(value) else value
+                  for key, value in record.items()}
+        if self.__csv is None:
+            self.__stream.write(json.dumps(record, allow_nan=False) + "\n")
+        else:
+            row = dict(record)
+            for key in ["scales", "counts", "region"]:
+                if key in row:
+                    row[key] = " ".join(str(v) for v in row[key])
+            self.__csv.writerow(row)
+        self.__stream.flush()
+
+
+def run(paths, writer, options, workers=1):
+    """
+    Analyze files and write result of every file as soon as it is ready
+    :param paths: input files
+    :param writer: ResultWriter object
+    :param options: keyword arguments of analyze_file
+    :param workers: processes count, files are analyzed in this process if it is 1
+    :return: dictionary of throughput statistics
+    """
+    start = time.perf_counter()
+    summary = {"files": 0, "failed": 0, "points": 0, "bytes": 0}
+
+    def account(record):
+        writer.write(record)
+        summary["files"] += 1
+        if "error" in record:
+            summary["failed"] += 1
+        else:
+            summary["points"] += record["points"]
+            summary["bytes"] += record["bytes"]
+
+    if workers == 1:
+        for path in paths:
+            account(_analyze_safely(path, options))
+    else:
+        with pc.process_pool(workers) as executor:
+            futures = [executor.submit(_analyze_safely, path, options) for path in paths]
+            for future in as_completed(futures):
+                account(future.result())
+
+    seconds = time.perf_counter() - start
+    summary["seconds"] = seconds
+    summary["pointsPerSecond"] = summary["points"] / seconds if seconds > 0 else 0.0
+    summary["bytesPerSecond"] = summary["bytes"] / seconds if seconds > 0 else 0.0
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fracdim",
+                                     description="Box-counting fractal dimension of series and point sets")
+    parser.add_argument("files", nargs="+", help=".npy, .csv or raw binary files")
+    parser.add_argument("--dimension", type=int, default=1, help="embedding dimension of series")
+    parser.add_argument("--lag", type=int, default=1, help="embedding time delay of series")
+    parser.add_argument("--scales", default=None,
+                        help="comma separated cells per axis, powers of two by default")
+    parser.add_argument("--mode", choices=["points", "lines"], default="points")
+    parser.add_argument("--cube", action="store_true", help="use cubic bounding cell")
+    parser.add_argument("--dtype", default="float64", help="samples type of raw binary files")
+    parser.add_argument("--columns", type=int, default=1, help="columns count of raw binary files")
+    parser.add_argument("--region", action="store_true",
+                        help="fit dimension with confidence interval over detected scaling region")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--output", default=None, help="results file, standard output by default")
+
+    args = parser.parse_args(argv)
+    options = {"dimension": args.dimension, "lag": args.lag, "mode": args.mode, "cube": args.cube,
+               "dtype": args.dtype, "columns": args.columns, "region": args.region,
+               "scales": None if args.scales is None else [int(s) for s in args.scales.split(",")]}
+
+    stream = sys.stdout if args.output is None else open(args.output, "w", newline="")
+    try:
+        summary = run(args.files, ResultWriter(stream, args.format), options, args.workers)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    sys.stderr.write("%d files (%d failed), %d points in %.3f s: %.0f points/s, %.1f MB/s\n"
+                     % (summary["files"], summary["failed"], summary["points"], summary["seconds"],
+                        summary["pointsPerSecond"], summary["bytesPerSecond"] / 1e6))
+    return 1 if summary["failed"] else 0
@@ -0,0 +1,151 @@
+import itertools
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import Kernels as kernels
+
+
+def pairs_count(pointsCount, theiler=0):
+    """
+    Count of pairs (i, j), i < j, with j - i > theiler
+    :param pointsCount: points count
+    :param theiler: Theiler window
+    :return: pairs count
+    """
+    n = pointsCount - theiler - 1
+    if n <= 0:
+        return 0
+    return n * (n + 1) // 2
+
+
+def correlation_sum(points, radii, theiler=0, metric="chebyshev", batchPairs=1 << 22, grid=None):
+    """
+    Grassberger-Procaccia correlation sum C(r) for many radii at once. Points are sorted to a
+    cell list with cell side max(radii), so only pairs from neighbour cells are checked. Time is
+    proportional to count of checked pairs, that is about count of pairs closer than max(radii):
+    on one core 10^6 points of Henon attractor take 2 s for max(radii) = 0.001 (10^8 close pairs)
+    and 28 s for 0.01 (1.5 * 10^9 pairs) with Numba, 2-3 times longer with NumPy. For larger
+    radii use sampled_correlation_sum
+    :param points: (N, dim) array of points
+    :param radii: radii to evaluate C(r) for
+    :param theiler: pairs of points closer than theiler+1 in time are excluded
+    :param metric: "chebyshev" for maximum norm or "euclidean"
+    :param batchPairs: count of candidate pairs which indices are generated at once by NumPy
+                       backend, bounds its memory
+    :param grid: optional MultiGrid built for the same points with cell sides not less than max(radii)
+    :return: array of C(r) values, one for every radius
+    """
+    if metric != "chebyshev" and metric != "euclidean":
+        raise Exception("Invalid metric for correlation sum")
+
+    points = np.asarray(points)
+    radii = np.asarray(radii, dtype=float)
+    order = np.argsort(radii)
+    sortedRadii = radii[order]
+    pointsCount, dim = points.shape
+    total = pairs_count(pointsCount, theiler)
+    if total == 0:
+        return np.zeros(radii.shape[0])
+
+    rmax = sortedRadii[-1]
+    if grid is None:
+        grid = cell_list(points, rmax)
+    else:
+        cell = grid.get_global_cell()
+        sides = (np.asarray(cell.get_max(), dtype=float) - np.asarray(cell.get_min(), dtype=float)) \
+            / grid.get_cells_per_axis()
+        if np.any(sides < rmax):
+            raise Exception("Grid cells are smaller than the largest radius")
+
+    # Points are permuted so every cell is a contiguous range of sorted points
+    permutation = grid.get_permutation()
+    sortedColumns = np.ascontiguousarray(points[permutation].T)
+    starts = grid.get_offsets()[:-1]
+    counts = grid.get_counts()
+
+    histogram = np.zeros(sortedRadii.shape[0] + 1, dtype=np.int64)
+    for offset in itertools.product((-1, 0, 1), repeat=dim):
+        offset = np.asarray(offset, dtype=np.int64)
+        nonZero = np.nonzero(offset)[0]
+        # Every pair of different cells is visited once, by lexicographically positive offset
+        if nonZero.shape[0] != 0 and offset[nonZero[0]] < 0:
+            continue
+
+        first, second = grid.shifted_cells(offset)
+        kernels.cell_pairs_histogram(histogram, sortedColumns, permutation, starts, counts, first, second,
+                                     nonZero.shape[0] == 0, sortedRadii, theiler, metric, batchPairs)
+
+    cumulative = np.cumsum(histogram)[:-1]
+    result = np.empty(radii.shape[0])
+    result[order] = cumulative / total
+    return result
+
+
+def cell_list(points, side):
+    """
+    MultiGrid of cubic cells with given side covering all the points
+    :param points: (N, dim) array of points
+    :param side: cell side
+    :return: built MultiGrid object
+    """
+    points = np.asarray(points)
+    pmin = points.min(axis=0).astype(float)
+    cellsPerAxis = np.floor((points.max(axis=0) - pmin) / side).astype(np.int64) + 1
+    if np.prod(cellsPerAxis.astype(float)) > 2.0**62:
+        raise Exception("Cell list is too large, use sampled_correlation_sum")
+    grid = fu.MultiGrid()
+    grid.build(fu.MultiCell(points.shape[1], pmin, pmin + cellsPerAxis * side), cellsPerAxis, points)
+    return grid
+
+
+def sampled_correlation_sum(points, radii, pairs, theiler=0, metric="chebyshev", seed=None):
+    """
+    Correlation sum estimated by uniformly sampled pairs of points
+    :param points: (N, dim) array of points
+    :param radii: radii to evaluate C(r) for
+    :param pairs: count of sampled pairs
+    :param theiler: pairs of points closer than theiler+1 in time are excluded
+    :param metric: "chebyshev" for maximum norm or "euclidean"
+    :param seed: random generator seed
+    :return: tuple (C(r) estimates, standard errors of estimates)
+    """
+    if metric != "chebyshev" and metric != "euclidean":
+        raise Exception("Invalid metric for correlation sum")
+
+    points = np.asarray(points)
+    radii = np.asarray(radii, dtype=float)
+    pointsCount = points.shape[0]
+    if pairs_count(pointsCount, theiler) == 0:
+        raise Exception("Not enough points for correlation sum")
+
+    rng = np.random.default_rng(seed)
+    i = np.empty(0, dtype=np.int64)
+    j = np.empty(0, dtype=np.int64)
+    # Rejection of pairs inside Theiler window keeps sampling uniform over allowed pairs
+    while i.shape[0] < pairs:
+        a = rng.integers(0, pointsCount, 2 * (pairs - i.shape[0]))
+        b = rng.integers(0, pointsCount, a.shape[0])
+        keep = np.abs(a - b) > theiler
+        i = np.concatenate((i, a[keep]))
+        j = np.concatenate((j, b[keep]))
+    i = i[:pairs]
+    j = j[:pairs]
+
+    columns = np.ascontiguousarray(points.T)
+    distances = kernels.distances(columns, i, j, metric)
+    estimates = (distances[np.newaxis, :] < radii[:, np.newaxis]).mean(axis=1)
+    errors = np.sqrt(estimates * (1 - estimates) / pairs)
+    return estimates, errors
+
+
+def correlation_dimension(radii, sums):
+    """
+    Correlation dimension as slope of log(C(r)) versus log(r). Radii with zero sum are ignored
+    :param radii: radii
+    :param sums: C(r) values
+    :return: fitted dimension
+    """
+    radii = np.asarray(radii, dtype=float)
+    sums = np.asarray(sums, dtype=float)
+    positive = sums > 0
+    return fu.fit_dimension(radii[positive], sums[positive])
@@ -0,0 +1,195 @@
+import collections
+import hashlib
+import os
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+
+
+def _count_scales(points, globalCell, scales, mode):
+    return np.asarray([fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=s, mode=mode).calculate(points)
+                       for s in scales], dtype=np.int64)
+
+
+class CountCache:
+    """
+    Cache of blocks count curves N(cellsPerAxis). Curves are keyed by content hash of data
+    together with grid parameters. Recently used curves are kept in memory, all curves are
+    optionally stored to a directory as .npy files, the oldest files are removed when
+    directory grows above size limit
+    """
+
+    # Changes of keys or files layout should increment it, so old files are not used
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory=None, memoryEntries=256, diskLimitBytes=256 * 1024 * 1024):
+        """
+        :param directory: directory for on-disk tier, only memory tier is used if it is None
+        :param memoryEntries: count of curves kept in memory
+        :param diskLimitBytes: total size of cache files in directory
+        :return: constructed object
+        """
+        self.__directory = directory
+        self.__memoryEntries = memoryEntries
+        self.__diskLimitBytes = diskLimitBytes
+        self.__memory = collections.OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(data, globalCell, scales, mode="points", dimension=None, lag=None):
+        """
+        :param data: points array or series row
+        :param globalCell: MultiCell object, None means bounding cell of data
+        :param scales: cellsPerAxis values
+        :param mode: BlocksCounter mode
+        :param dimension: embedding dimension when data is a series row
+        :param lag: embedding lag when data is a series row
+        :return: hex string key
+        """
+        data = np.ascontiguousarray(data)
+        digest = hashlib.blake2b(digest_size=20)
+        if globalCell is None:
+            cell = None
+        else:
+            cell = (np.asarray(globalCell.get_min(), dtype=float).tolist(),
+                    np.asarray(globalCell.get_max(), dtype=float).tolist())
+        parameters = (CountCache.FORMAT_VERSION, data.dtype.str, data.shape, cell,
+                      [int(s) for s in scales], mode, dimension, lag)
+        digest.update(repr(parameters).encode())
+        digest.update(memoryview(data.reshape(-1)).cast("B"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        :param key: curve key
+        :return: int64 array of counts or None when curve is not cached
+        """
+        counts = self.__memory.get(key)
+        if counts is not None:
+            self.__memory.move_to_end(key)
+            self.__hits += 1
+            return counts.copy()
+
+        if self.__directory is not None:
+            path = self.__path(key)
+            try:
+                counts = np.load(path)
+                # File modification time orders files for eviction
+                os.utime(path)
+            except (OSError, ValueError):
+                counts = None
+            if counts is not None:
+                self.__remember(key, counts)
+                self.__hits += 1
+                return counts.copy()
+
+        self.__misses += 1
+        return None
+
+    def put(self, key, counts):
+        """
+        :param key: curve key
+        :param counts: counts array
+        :return: nothing
+        """
+        counts = np.array(counts, dtype=np.int64)
+        self.__remember(key, counts)
+        if self.__directory is None:
+            return
+
+        path = self.__path(key)
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary, "wb") as f:
+            np.save(f, counts)
+        # Readers of other processes never see partially written file
+        os.replace(temporary, path)
+        self.__evict_files()
+
+    def box_counts(self, points, globalCell, scales, mode="points"):
+        """
+        Cached blocks counts of points set
+        :param points: (N, dim) array of points
+        :param globalCell: MultiCell object describes area of blocks counting
+        :param scales: cellsPerAxis values
+        :param mode: BlocksCounter mode
+        :return: int64 array of counts, one for every scale
+        """
+        key = self.key(points, globalCell, scales, mode)
+        counts = self.get(key)
+        if counts is None:
+            counts = _count_scales(points, globalCell, scales, mode)
+            self.put(key, counts)
+        return counts
+
+    def series_counts(self, row, dimension, scales, lag=1, globalCell=None, mode="points"):
+        """
+        Cached blocks counts of series time-delay embedding. Key is computed from series itself,
+        so it is much shorter than points array
+        :param row: 1-D series
+        :param dimension: embedding dimension
+        :param scales: cellsPerAxis values
+        :param lag: embedding time delay in samples
+        :param globalCell: MultiCell object, bounding cell of embedding by default
+        :param mode: BlocksCounter mode
+        :return: int64 array of counts, one for every scale
+        """
+        row = np.asarray(row)
+        key = self.key(row, globalCell, scales, mode, dimension, lag)
+        counts = self.get(key)
+        if counts is None:
+            points = fu.time_delay_embedding(row, dimension, lag)
+            if points.shape[0] == 0:
+                counts = np.zeros(len(scales), dtype=np.int64)
+            else:
+                cell = globalCell if globalCell is not None else fu.bounding_cell(points)
+                counts = _count_scales(points, cell, scales, mode)
+            self.put(key, counts)
+        return counts
+
+    def stats(self):
+        """
+        :return: tuple (hits, misses)
+        """
+        return self.__hits, self.__misses
+
+    def clear(self):
+        """
+        Remove all cached curves from memory and directory
+        :return: nothing
+        """
+        self.__memory.clear()
+        if self.__directory is None:
+            return
+        for entry in os.scandir(self.__directory):
+            if entry.name.endswith(".npy"):
+                os.remove(entry.path)
+
+    def __remember(self, key, counts):
+        self.__memory[key] = counts
+        self.__memory.move_to_end(key)
+        while len(self.__memory) > self.__memoryEntries:
+            self.__memory.popitem(last=False)
+
+    def __path(self, key):
+        return os.path.join(self.__directory, key + ".npy")
+
+    def __evict_files(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.__directory):
+            if entry.name.endswith(".npy"):
+                info = entry.stat()
+                files.append((info.st_mtime, info.st_size, entry.path))
+                total += info.st_size
+        files.sort()
+        for mtime, size, path in files:
+            if total <= self.__diskLimitBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
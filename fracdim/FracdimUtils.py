@@ -1,8 +1,41 @@
 import numpy as np
+import itertools
+import logging
 import math
+import time
 
+from fracdim import Kernels as kernels
 
-def row_to_points(row, dimension):
+
+def time_delay_embedding(row, dimension, lag=1):
+    """
+    Time-delay embedding of discrete row without copying it:
+    time_delay_embedding([a, b, c, d, e, f, g], 3, lag=2) gives
+    [[a, c, e],
+     [b, d, f],
+     [c, e, g]]
+    Result is a read-only strided view of row, so it takes no memory
+    proportional to dimension
+    :param row: discrete row, 1-D array or sequence
+    :param dimension: dimension of points space
+    :param lag: distance between neighbour coordinates in row samples
+    :return: (len(row) - (dimension-1)*lag, dimension) array view
+    """
+    if dimension < 1 or lag < 1:
+        raise Exception("Invalid embedding dimension or lag")
+
+    row = np.asarray(row)
+    if row.ndim != 1:
+        raise Exception("Row should be one-dimensional")
+
+    window = (dimension - 1) * lag + 1
+    if window > row.shape[0]:
+        return row[:0].reshape((0, dimension))
+
+    return np.lib.stride_tricks.sliding_window_view(row, window)[:, ::lag]
+
+
+def row_to_points(row, dimension, lag=1):
     """
     Transform discrete row to an array of points this way:
     row_to_points([a, b, c, d, e, f, g, h, k], 3) gives
@@ -12,21 +45,17 @@ def row_to_points(row, dimension):
      [e, f, g],
      [f, g, h],
      [g, h, k]]
+    This function makes a writable copy, use time_delay_embedding to avoid it
     :param row: discrete row
     :param dimension: dimension of points space
-    :return: result of operation
+    :param lag: distance between neighbour coordinates in row samples
+    :return: result of operation, of the same type as row samples
     """
-    rowLen = len(row)
-    pointsCount = rowLen-dimension+1
-    if pointsCount < 1:
+    points = time_delay_embedding(row, dimension, lag)
+    if points.shape[0] < 1:
         return 0
 
-    a = np.ndarray(shape=(pointsCount, dimension))
-
-    for i in range(0, pointsCount):
-        for j in range(0, dimension):
-            a[i, j] = row[i+j]
-    return a
+    return np.array(points)
 
 
 def get_point_on_line(lineBegin, lineEnd, axis, axisValue, targetPoint):
@@ -48,40 +77,270 @@ def get_point_on_line(lineBegin, lineEnd, axis, axisValue, targetPoint):
         targetPoint[i] = (1-progress) * lineBegin[i] + progress * lineEnd[i]
 
 
+def cell_transform(globalCell):
+    """
+    Origin and extent of gridded area, computed once for quantize
+    :param globalCell: MultiCell object describes gridded area
+    :return: tuple (origin, extent) of (dim,) float64 arrays
+    """
+    origin = np.asarray(globalCell.get_min(), dtype=np.float64)
+    extent = np.asarray(globalCell.get_max(), dtype=np.float64) - origin
+    return origin, extent
+
+
+def quantize(points, origin, extent, cellsPerAxis):
+    """
+    Map every point to indices of grid cell given by cell_transform result. Index is
+    floor((p - origin) / extent * cellsPerAxis), rounded exactly like the original per-point
+    code, so points lying on cell boundaries go to the same cells. Points on right boundary
+    of the grid belong to the last cell, points outside of the grid get indices below zero
+    or not less than cellsPerAxis
+    :param points: (N, dim) array of points
+    :param origin: grid origin
+    :param extent: grid size along every axis
+    :param cellsPerAxis: Axis division, scalar or one value for every axis
+    :return: (N, dim) int64 array of cell indices
+    """
+    # For right boundary values than formally does not included to system
+    # because cells are alike [0, 1), [1, 2), ... , [9, 10) <-- this border
+    # should not be open
+    return kernels.quantize(points, origin, extent, cellsPerAxis)
+
+
+def points_to_cell_indexes(points, globalCell, cellsPerAxis):
+    """
+    Map every point to indices of grid cell it belongs to. Grid divides globalCell
+    to cellsPerAxis equal parts along each axis
+    :param points: (N, dim) array of points
+    :param globalCell: MultiCell object describes gridded area
+    :param cellsPerAxis: Axis division
+    :return: (N, dim) int64 array of cell indices
+    """
+    origin, extent = cell_transform(globalCell)
+    return quantize(points, origin, extent, cellsPerAxis)
+
+
+def polyline_cell_indexes(points, globalCell, cellsPerAxis, vertexIndexes=None):
+    """
+    Cells visited by polyline connecting points one by one. This is Amanatides-Woo grid
+    traversal done for all segments at once: crossings of every segment with grid planes
+    are sorted by line parameter and every crossing moves current cell by one step
+    along crossed axis. Simultaneous crossings are applied in axis order
+    :param points: (N, dim) array of polyline vertices
+    :param globalCell: MultiCell object describes gridded area
+    :param cellsPerAxis: Axis division
+    :param vertexIndexes: cell indices of points when they are already quantized
+    :return: (M, dim) int64 array of visited cells indices, cells may repeat
+    """
+    if vertexIndexes is None:
+        vertexIndexes = points_to_cell_indexes(points, globalCell, cellsPerAxis)
+    if points.shape[0] < 2:
+        return vertexIndexes
+
+    deltas = vertexIndexes[1:] - vertexIndexes[:-1]
+    crossed = deltas != 0
+    crossedAxesCount = crossed.sum(axis=1)
+    result = [vertexIndexes]
+
+    # Segments crossing planes of only one axis visit cells between their vertex cells
+    single = np.nonzero(crossedAxesCount == 1)[0]
+    if single.shape[0] != 0:
+        axes = np.argmax(crossed[single], axis=1)
+        steps = deltas[single, axes]
+        crossings = np.abs(steps)
+        total = int(crossings.sum())
+        owners = np.repeat(np.arange(single.shape[0]), crossings)
+        passed = np.arange(1, total + 1) - np.repeat(np.cumsum(crossings) - crossings, crossings)
+        cells = vertexIndexes[single[owners]]
+        cells[np.arange(total), axes[owners]] += np.sign(steps[owners]) * passed
+        result.append(cells)
+
+    multi = np.nonzero(crossedAxesCount > 1)[0]
+    if multi.shape[0] != 0:
+        result.append(_traverse_segments(points[multi], points[multi + 1], vertexIndexes[multi],
+                                         deltas[multi], globalCell, cellsPerAxis))
+
+    return np.concatenate(result)
+
+
+def _traverse_segments(begins, ends, beginIndexes, deltas, globalCell, cellsPerAxis):
+    """
+    Cells entered by segments after every crossing with grid planes, see polyline_cell_indexes
+    :param begins: (S, dim) array of segments begin points
+    :param ends: (S, dim) array of segments end points
+    :param beginIndexes: (S, dim) cell indices of begin points
+    :param deltas: (S, dim) difference of end and begin cell indices
+    :param globalCell: MultiCell object describes gridded area
+    :param cellsPerAxis: Axis division
+    :return: (K, dim) array of entered cells indices
+    """
+    cellMin = np.asarray(globalCell.get_min(), dtype=float)
+    cellSize = (np.asarray(globalCell.get_max(), dtype=float) - cellMin) / cellsPerAxis
+    return kernels.traverse_segments(begins, ends, beginIndexes, deltas, cellMin, cellSize)
+
+
+def sorted_unique(values):
+    """
+    Sorted unique values of 1-D array. Sorting and dropping equal neighbours is much
+    faster than hash-based np.unique for large integer arrays
+    :param values: 1-D array
+    :return: sorted array of unique values
+    """
+    values = np.sort(values)
+    if values.shape[0] == 0:
+        return values
+    keep = np.empty(values.shape[0], dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def morton_codes(indexes, bitsPerAxis):
+    """
+    Interleave bits of cell indices to Morton (Z-order) codes. Shifting a code right by
+    dim * k bits gives the code of the cell with indices shifted right by k bits
+    :param indexes: (N, dim) array of non-negative cell indices
+    :param bitsPerAxis: bits used for one index, dim * bitsPerAxis should not exceed 64
+    :return: (N,) uint64 array of codes
+    """
+    count, dim = indexes.shape
+    if dim * bitsPerAxis > 64:
+        raise Exception("Morton code does not fit 64 bits")
+
+    source = indexes.astype(np.uint64)
+    codes = np.zeros(count, dtype=np.uint64)
+    one = np.uint64(1)
+    for bit in range(0, bitsPerAxis):
+        for axis in range(0, dim):
+            codes |= ((source[:, axis] >> np.uint64(bit)) & one) << np.uint64(bit * dim + axis)
+    return codes
+
+
+def fit_dimension(scales, counts):
+    """
+    Fractal dimension as slope of log(N) versus log(cellsPerAxis)
+    :param scales: cellsPerAxis values
+    :param counts: blocks count for every scale
+    :return: fitted dimension
+    """
+    if len(scales) < 2:
+        return float("nan")
+    slope, intercept = np.polyfit(np.log(np.asarray(scales, dtype=float)),
+                                  np.log(np.asarray(counts, dtype=float)), 1)
+    return float(slope)
+
+
+def fit_dimensions(scales, counts):
+    """
+    Vectorized fit_dimension for many curves
+    :param scales: cellsPerAxis values
+    :param counts: (curves, scales) array of blocks counts
+    :return: array of fitted dimensions, one for every curve
+    """
+    x = np.log(np.asarray(scales, dtype=float))
+    # Curves with zero counts, e.g. of too short series, get nan dimension
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y = np.log(np.asarray(counts, dtype=float))
+    if x.shape[0] < 2:
+        return np.full(y.shape[0], float("nan"))
+    x = x - x.mean()
+    with np.errstate(invalid="ignore"):
+        return ((y - y.mean(axis=1, keepdims=True)) @ x) / (x @ x)
+
+
+def cell_histograms(points, globalCell, scales):
+    """
+    Count points in every occupied cell for several grids at once. Points are quantized only
+    once for the finest grid and coarser grids are derived by merging already sorted cells,
+    so the whole sweep costs about one fine-grid count.
+    :param points: (N, dim) array of points
+    :param globalCell: MultiCell object describes area of blocks counting
+    :param scales: cellsPerAxis values, each of them should divide the largest one
+    :return: list of integer arrays of points counts in occupied cells, one array for every scale
+    """
+    points = np.asarray(points)
+    scales = [int(s) for s in scales]
+    finest = max(scales)
+    for s in scales:
+        if s < 1 or finest % s != 0:
+            raise Exception("Every scale should divide the finest scale")
+
+    indexes = points_to_cell_indexes(points, globalCell, finest)
+    if indexes.size != 0 and (indexes.min() < 0 or indexes.max() >= finest):
+        raise Exception("Points are out of global cell")
+
+    pointsCount, dim = indexes.shape
+    countType = np.uint32 if pointsCount < 2**32 else np.uint64
+    bits = max(1, (finest - 1).bit_length())
+    powerOfTwoRatios = all((finest // s) & (finest // s - 1) == 0 for s in scales)
+    histograms = {}
+
+    if powerOfTwoRatios and dim * bits <= 64:
+        # Sorted Morton codes stay sorted after shifting, so each coarser level is
+        # obtained by merging neighbours of the previous one without new sorting
+        codes = np.sort(morton_codes(indexes, bits))
+        counts = np.ones(pointsCount, dtype=countType)
+        currentShift = -1
+        for s in sorted(set(scales), reverse=True):
+            shift = (finest // s).bit_length() - 1
+            if shift != currentShift:
+                codes = codes >> np.uint64(dim * (shift - max(currentShift, 0)))
+                starts = np.ones(codes.shape[0], dtype=bool)
+                starts[1:] = codes[1:] != codes[:-1]
+                starts = np.nonzero(starts)[0]
+                if starts.shape[0] != 0:
+                    counts = np.add.reduceat(counts, starts).astype(countType)
+                codes = codes[starts]
+                currentShift = shift
+            histograms[s] = counts
+    else:
+        cells, counts = np.unique(indexes, axis=0, return_counts=True)
+        for s in sorted(set(scales), reverse=True):
+            coarse, inverse = np.unique(cells // (finest // s), axis=0, return_inverse=True)
+            histograms[s] = np.bincount(inverse.ravel(), weights=counts,
+                                        minlength=coarse.shape[0]).astype(countType)
+
+    return [histograms[s] for s in scales]
+
+
+def box_counting(points, globalCell, scales):
+    """
+    Count occupied blocks for several grids at once, see cell_histograms
+    :param points: (N, dim) array of points
+    :param globalCell: MultiCell object describes area of blocks counting
+    :param scales: cellsPerAxis values, each of them should divide the largest one
+    :return: tuple (counts, dimension), counts[i] corresponds to scales[i]
+    """
+    histograms = cell_histograms(points, globalCell, scales)
+    result = np.asarray([h.shape[0] for h in histograms], dtype=np.int64)
+    return result, fit_dimension(scales, result)
+
+
 class MultiCell:
     """
         Rectangular cell in multi-dimensional space
     """
+    __slots__ = ("userFlag", "__dim", "__minCorner", "__maxCorner")
+
     def __init__(self, dim, p1=None, p2=None):
         self.userFlag = False
-        self.__dim = 1
-        self.__minCorner = None
-        self.__maxCorner = None
 
-        if p1 is not None and p1.shape != (dim,):
+        if p1 is not None and np.shape(p1) != (dim,):
             raise Exception("Invalid pmin shape")
 
-        if p1 is not None and p2.shape != (dim,):
+        if p2 is not None and np.shape(p2) != (dim,):
             raise Exception("Invalid pmax shape")
 
         self.__dim = dim
-        self.__minCorner = np.ndarray(shape=(dim))
-        self.__maxCorner = np.ndarray(shape=(dim))
 
         if (p1 is not None) and (p2 is not None):
-            for i in range(0, dim):
-                if p1[i] > p2[i]:
-                    self.__maxCorner[i] = p1[i]
-                    self.__minCorner[i] = p2[i]
-                else:
-                    self.__maxCorner[i] = p2[i]
-                    self.__minCorner[i] = p1[i]
+            p1 = np.asarray(p1, dtype=np.float64)
+            p2 = np.asarray(p2, dtype=np.float64)
+            self.__minCorner = np.minimum(p1, p2)
+            self.__maxCorner = np.maximum(p1, p2)
         else:
-            if p1 is not None:
-                self.__minCorner = p1
-
-            if p2 is not None:
-                self.__maxCorner = p2
+            self.__minCorner = p1 if p1 is not None else np.ndarray(shape=(dim))
+            self.__maxCorner = p2 if p2 is not None else np.ndarray(shape=(dim))
 
     def set(self, pmin=None, pmax=None):
         if pmin is not None:
@@ -101,40 +360,379 @@ class MultiCell:
         if lenP > len(self.__minCorner):
             raise Exception("Invalid point dimension")
 
-        for i in range(0, lenP):
-            if p[i] < self.__minCorner[i] or p[i] > self.__maxCorner[i]:
-                return False
+        p = np.asarray(p)
+        return bool(np.all(p >= self.__minCorner[:lenP]) and np.all(p <= self.__maxCorner[:lenP]))
+
+    def check_points(self, points):
+        """
+        Vectorized check_point
+        :param points: (N, k) array of points, k <= dim
+        :return: (N,) boolean mask of points inside the cell, boundaries included
+        """
+        points = np.asarray(points)
+        lenP = points.shape[1]
+        if lenP > len(self.__minCorner):
+            raise Exception("Invalid point dimension")
 
-        return True
+        inside = np.ones(points.shape[0], dtype=bool)
+        for i in range(0, lenP):
+            column = points[:, i]
+            inside &= (column >= self.__minCorner[i]) & (column <= self.__maxCorner[i])
+        return inside
 
     def dim(self):
         return self.__dim
 
 
+class MultiCellArray:
+    """
+        K rectangular cells of the same dimension stored as (K, dim) arrays of corners
+    """
+    __slots__ = ("__minCorners", "__maxCorners")
+
+    def __init__(self, pmins, pmaxs):
+        """
+        :param pmins: (K, dim) array of first corners
+        :param pmaxs: (K, dim) array of opposite corners
+        :return: constructed object
+        """
+        pmins = np.asarray(pmins, dtype=np.float64)
+        pmaxs = np.asarray(pmaxs, dtype=np.float64)
+        if pmins.ndim != 2 or pmins.shape != pmaxs.shape:
+            raise Exception("Invalid corners shape")
+
+        self.__minCorners = np.minimum(pmins, pmaxs)
+        self.__maxCorners = np.maximum(pmins, pmaxs)
+
+    @staticmethod
+    def from_cells(cells):
+        """
+        :param cells: list of MultiCell objects of the same dimension
+        :return: MultiCellArray object
+        """
+        return MultiCellArray([c.get_min() for c in cells], [c.get_max() for c in cells])
+
+    def __len__(self):
+        return self.__minCorners.shape[0]
+
+    def dim(self):
+        return self.__minCorners.shape[1]
+
+    def get_min(self):
+        return self.__minCorners
+
+    def get_max(self):
+        return self.__maxCorners
+
+    def get_cell(self, index):
+        return MultiCell(self.dim(), self.__minCorners[index], self.__maxCorners[index])
+
+    def volumes(self):
+        return np.prod(self.__maxCorners - self.__minCorners, axis=1)
+
+    def check_points(self, points):
+        """
+        Point-in-box test for all pairs of points and cells
+        :param points: (N, dim) array of points
+        :return: (N, K) boolean mask, boundaries included
+        """
+        points = np.asarray(points)
+        if points.shape[1] != self.dim():
+            raise Exception("Invalid point dimension")
+
+        inside = np.ones((points.shape[0], len(self)), dtype=bool)
+        for i in range(0, self.dim()):
+            column = points[:, i, np.newaxis]
+            inside &= (column >= self.__minCorners[:, i]) & (column <= self.__maxCorners[:, i])
+        return inside
+
+    def overlaps(self, other):
+        """
+        Box overlap test for all pairs of cells, touching cells overlap
+        :param other: MultiCellArray object
+        :return: (K, L) boolean mask, L is count of cells in other
+        """
+        if other.dim() != self.dim():
+            raise Exception("Invalid cells dimension")
+
+        result = np.ones((len(self), len(other)), dtype=bool)
+        for i in range(0, self.dim()):
+            result &= (self.__minCorners[:, i, np.newaxis] <= other.get_max()[:, i]) \
+                & (self.__maxCorners[:, i, np.newaxis] >= other.get_min()[:, i])
+        return result
+
+
 class MultiGrid:
     """
-        Multi-dimensional space grid of rectangular cells
-        NOT IMPLEMENTED
+    Multi-dimensional space grid of rectangular cells that indexes a points set. Only occupied
+    cells are stored, in CSR form: sorted linear indices of cells and offsets to points array
+    permuted so points of every cell are contiguous. Built grid may be shared by estimators
+    instead of quantizing the same points again
     """
     def __init__(self):
         self.__globalCell = None
-        self.__cells = None
-        self.__cellsPerAxis = 0
+        self.__cellsPerAxis = None
+        self.__strides = None
+        self.__origin = None
+        self.__extent = None
+        self.__cells = np.empty(0, dtype=np.int64)
+        self.__cellIndexes = None
+        self.__offsets = np.zeros(1, dtype=np.int64)
+        self.__permutation = np.empty(0, dtype=np.int64)
 
-    def get_cell(self, indices):
-        index = 0
-        for i in reversed(indices):
-            index = index * self.__cellsPerAxis + i
-        return self.__cells[index]
+    def build(self, global_cell, cells_count_per_axis, points=None):
+        """
+        Index points by grid cells
+        :param global_cell: MultiCell object describes gridded area
+        :param cells_count_per_axis: Axis division, scalar or one value for every axis
+        :param points: (N, dim) array of points inside global_cell
+        :return: nothing
+        """
+        self.__set_grid(global_cell, cells_count_per_axis)
+        if points is None:
+            points = np.empty((0, global_cell.dim()))
+        self.__index(self.point_cells(np.asarray(points)))
+
+    def build_indexes(self, global_cell, cells_count_per_axis, indexes):
+        """
+        Index points already quantized to this grid, e.g. by QuantizedPoints
+        :param global_cell: MultiCell object describes gridded area
+        :param cells_count_per_axis: Axis division, scalar or one value for every axis
+        :param indexes: (N, dim) integer array of points cell indices
+        :return: nothing
+        """
+        self.__set_grid(global_cell, cells_count_per_axis)
+        self.__index(np.asarray(indexes).astype(np.int64, copy=False))
+
+    def __set_grid(self, global_cell, cells_count_per_axis):
+        dim = global_cell.dim()
+        cellsPerAxis = np.broadcast_to(np.asarray(cells_count_per_axis, dtype=np.int64), (dim,)).copy()
+        if np.prod(cellsPerAxis.astype(float)) > 2.0**62:
+            raise Exception("Linear cell indices of grid do not fit int64")
 
-    def build(self, global_cell, cells_count_per_axis):
         self.__globalCell = global_cell
-        self.__cellsPerAxis = cells_count_per_axis
-        __cells = []
+        self.__cellsPerAxis = cellsPerAxis
+        self.__strides = np.ones(dim, dtype=np.int64)
+        for i in range(1, dim):
+            self.__strides[i] = self.__strides[i - 1] * cellsPerAxis[i - 1]
+        self.__origin, self.__extent = cell_transform(global_cell)
+
+    def __index(self, indexes):
+        if np.any((indexes < 0) | (indexes >= self.__cellsPerAxis)):
+            raise Exception("Points are out of global cell")
+
+        keys = indexes @ self.__strides
+        self.__permutation = np.argsort(keys, kind="stable")
+        sortedKeys = keys[self.__permutation]
+        isStart = np.ones(sortedKeys.shape[0], dtype=bool)
+        np.not_equal(sortedKeys[1:], sortedKeys[:-1], out=isStart[1:])
+        starts = np.nonzero(isStart)[0]
+        self.__cells = sortedKeys[starts]
+        self.__cellIndexes = indexes[self.__permutation[starts]]
+        self.__offsets = np.append(starts, sortedKeys.shape[0])
+
+    def dim(self):
+        return self.__globalCell.dim()
+
+    def get_global_cell(self):
+        return self.__globalCell
+
+    def get_cells_per_axis(self):
+        return self.__cellsPerAxis
+
+    def get_cells(self):
+        """
+        :return: sorted linear indices of occupied cells
+        """
+        return self.__cells
+
+    def get_cell_indexes(self):
+        """
+        :return: (M, dim) array of occupied cells indices in the order of get_cells()
+        """
+        return self.__cellIndexes
+
+    def get_offsets(self):
+        """
+        :return: (M + 1,) array, points of k-th occupied cell are
+                 get_permutation()[offsets[k]:offsets[k + 1]]
+        """
+        return self.__offsets
+
+    def get_permutation(self):
+        """
+        :return: indices of points sorted by cells
+        """
+        return self.__permutation
 
-    def __recursive_add_cells(self, currentDim, offset):
-        for i in range(0, self.__cellsPerAxis):
-            pass  # TODO implement from here when this class is needed
+    def get_counts(self):
+        """
+        :return: points count of every occupied cell
+        """
+        return np.diff(self.__offsets)
+
+    def get_cell(self, indices):
+        """
+        :param indices: cell indices
+        :return: MultiCell object of the cell
+        """
+        indices = np.asarray(indices, dtype=float)
+        return MultiCell(self.dim(), self.__origin + self.__extent * (indices / self.__cellsPerAxis),
+                         self.__origin + self.__extent * ((indices + 1) / self.__cellsPerAxis))
+
+    def point_cells(self, points):
+        """
+        :param points: (N, dim) array of points
+        :return: (N, dim) array of indices of cells that points belong to
+        """
+        return quantize(points, self.__origin, self.__extent, self.__cellsPerAxis)
+
+    def linear_indexes(self, indexes):
+        """
+        :param indexes: (N, dim) array of cell indices
+        :return: (N,) array of linear cell indices
+        """
+        return indexes @ self.__strides
+
+    def find_cells(self, indexes):
+        """
+        :param indexes: (N, dim) array of cell indices
+        :return: positions of cells in occupied cells list, -1 for empty or outside cells
+        """
+        indexes = np.asarray(indexes, dtype=np.int64)
+        inside = np.all((indexes >= 0) & (indexes < self.__cellsPerAxis), axis=1)
+        result = np.full(indexes.shape[0], -1, dtype=np.int64)
+        if self.__cells.shape[0] == 0:
+            return result
+        linear = self.linear_indexes(indexes[inside])
+        position = np.minimum(np.searchsorted(self.__cells, linear), self.__cells.shape[0] - 1)
+        result[inside] = np.where(self.__cells[position] == linear, position, -1)
+        return result
+
+    def cell_points(self, indices):
+        """
+        :param indices: cell indices
+        :return: indices of points in the cell
+        """
+        position = self.find_cells(np.asarray(indices).reshape((1, -1)))[0]
+        if position < 0:
+            return np.empty(0, dtype=np.int64)
+        return self.__permutation[self.__offsets[position]:self.__offsets[position + 1]]
+
+    def shifted_cells(self, offset):
+        """
+        Pairs of occupied cells, the second cell of pair is the first one shifted by offset
+        :param offset: (dim,) shift of cell indices
+        :return: tuple (first, second) of positions in occupied cells list
+        """
+        first = np.arange(self.__cells.shape[0])
+        second = self.find_cells(self.__cellIndexes + np.asarray(offset, dtype=np.int64))
+        found = second >= 0
+        return first[found], second[found]
+
+    def neighbours(self, indices, radius=1):
+        """
+        Occupied cells around given one, the cell itself included
+        :param indices: cell indices
+        :param radius: maximal difference of indices along every axis
+        :return: positions of neighbour cells in occupied cells list
+        """
+        offsets = np.asarray(list(itertools.product(range(-radius, radius + 1), repeat=self.dim())),
+                             dtype=np.int64)
+        positions = self.find_cells(np.asarray(indices, dtype=np.int64) + offsets)
+        return positions[positions >= 0]
+
+    def coarse_cells(self, cellsPerAxis):
+        """
+        Occupied cells of coarser grid over the same global cell
+        :param cellsPerAxis: Axis division that divides division of this grid
+        :return: (K, dim) array of unique cell indices of coarser grid
+        """
+        ratio = self.__cellsPerAxis // cellsPerAxis
+        if np.any(ratio * cellsPerAxis != self.__cellsPerAxis):
+            raise Exception("Coarse grid division should divide grid division")
+        if np.all(ratio == 1):
+            return self.__cellIndexes
+        coarse = self.__cellIndexes // ratio
+        strides = np.ones(self.dim(), dtype=np.int64)
+        for i in range(1, self.dim()):
+            strides[i] = strides[i - 1] * cellsPerAxis
+        keys = coarse @ strides
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        keep = np.ones(keys.shape[0], dtype=bool)
+        np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+        return coarse[order[keep]]
+
+
+def bounding_cell(points, cube=False):
+    """
+    Smallest MultiCell that contains all the points. Degenerate axes are widened to unit length
+    :param points: (N, dim) array of points
+    :param cube: make all sides equal to the largest one, so grid cells are cubes and
+                 counts of different datasets are comparable
+    :return: MultiCell object
+    """
+    points = np.asarray(points)
+    if points.shape[0] == 0:
+        raise Exception("Bounding cell of empty points set")
+    pmin = points.min(axis=0).astype(float)
+    pmax = points.max(axis=0).astype(float)
+    if cube:
+        side = float((pmax - pmin).max())
+        pmax = pmin + (side if side != 0 else 1.0)
+    pmax[pmax == pmin] += 1.0
+    return MultiCell(points.shape[1], pmin, pmax)
+
+
+class CounterStats:
+    """
+    Accumulated work of BlocksCounter: time of every phase, processed points and segments,
+    visited and occupied cells, bytes of allocated arrays
+    """
+    __slots__ = ("calls", "points", "segments", "cellsVisited", "cellsOccupied", "allocatedBytes", "phases")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.points = 0
+        self.segments = 0
+        self.cellsVisited = 0
+        self.cellsOccupied = 0
+        self.allocatedBytes = 0
+        self.phases = {}
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def total_time(self):
+        return sum(self.phases.values())
+
+    def as_dict(self):
+        return {"calls": self.calls, "points": self.points, "segments": self.segments,
+                "cellsVisited": self.cellsVisited, "cellsOccupied": self.cellsOccupied,
+                "allocatedBytes": self.allocatedBytes, "phases": dict(self.phases)}
+
+    def __repr__(self):
+        phases = ", ".join("%s=%.6fs" % (name, seconds) for name, seconds in self.phases.items())
+        return "CounterStats(calls=%d, points=%d, segments=%d, cellsVisited=%d, cellsOccupied=%d, " \
+               "allocatedBytes=%d, %s)" % (self.calls, self.points, self.segments, self.cellsVisited,
+                                          self.cellsOccupied, self.allocatedBytes, phases)
+
+
+logger = logging.getLogger("fracdim")
+
+
+def log_stats(stats):
+    """
+    BlocksCounter callback that writes stats to "fracdim" logger with DEBUG level
+    :param stats: CounterStats object
+    :return: nothing
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%r", stats)
 
 
 class BlocksCounter(object):
@@ -142,138 +740,351 @@ class BlocksCounter(object):
     This class calculates count of blocks that concrete dataset included to.
     """
 
-    def __init__(self, globalCell=None, cellsPerAxis=1, mode="points"):
+    # Dense occupancy grids larger than this are replaced by sparse storage in "auto" mode
+    DENSE_LIMIT_BYTES = 256 * 1024 * 1024
+    # Type of dense occupancy flags
+    OCCUPANCY_TYPE = np.uint8
+
+    def __init__(self, globalCell=None, cellsPerAxis=1, mode="points", storage="auto",
+                 denseLimitBytes=DENSE_LIMIT_BYTES, cube=False, outside="raise", stats=None, callback=None):
         """
         Constructor that configure BlocksCounter
-        :param globalCell: MultiCell object describes area of blocks counting
+        :param globalCell: MultiCell object describes area of blocks counting. If it is not given
+                           and set_size is not called, bounding cell of every dataset is used
         :param cellsPerAxis: Axis division method
         :param mode: "points" means than only points inclusions will be accounted,
-                     "lines" means than lines connecting points will be accounted too. NOT IMPLEMENTED
+                     "lines" means than lines connecting points will be accounted too
+        :param storage: "dense" keeps a byte flag for every grid cell, "sparse" keeps only linear indices
+                        of occupied cells, "auto" selects "sparse" when dense grid exceeds denseLimitBytes
+        :param denseLimitBytes: memory budget for dense occupancy grid used by "auto" storage
+        :param cube: inferred bounding cell has equal sides
+        :param outside: what to do with points outside of globalCell: "raise" throws exception,
+                        "drop" ignores such points (and parts of lines outside of the cell)
+        :param stats: True or CounterStats object to accumulate work statistics, None disables them
+        :param callback: function called with CounterStats after every counting, e.g. log_stats.
+                         Statistics are enabled when callback is given
         :return: constructed object
         """
         if mode != "points" and mode != "lines":
             raise Exception("Invalid mode for BlocksCounter")
 
+        if storage != "auto" and storage != "dense" and storage != "sparse":
+            raise Exception("Invalid storage for BlocksCounter")
+
+        if outside != "raise" and outside != "drop":
+            raise Exception("Invalid outside points policy for BlocksCounter")
+
         self.__globalCell = None
+        self.__inferCell = True
+        self.__cube = cube
+        self.__outside = outside
+        self.__outsideCount = 0
+        self.__origin = None
+        self.__extent = None
         self.__offsets = []
-        self.__cellsPerAxis = 0
+        self.__cellsPerAxis = cellsPerAxis
         self.__cell_has_point = None
+        self.__storage = storage
+        self.__denseLimitBytes = denseLimitBytes
+        self.__sparse = False
         self.__mode = mode
         self.__dim = 0
+        self.__stats = None
+        self.__callback = None
+        self.__clock = 0.0
+
+        if stats is not None or callback is not None:
+            self.enable_stats(stats if isinstance(stats, CounterStats) else None, callback)
 
         if globalCell is not None:
             self.set_size(globalCell)
-            self.set_cells_per_axis(cellsPerAxis)
 
     def set_size(self, cell):
-        self.__globalCell = cell
-        self.__dim = cell.dim()
+        self.__inferCell = False
+        self.__set_cell(cell)
+
+    def get_size(self):
+        """
+        :return: global cell given by user or inferred for the last dataset
+        """
+        return self.__globalCell
 
     def set_cells_per_axis(self, cells_per_axis):
         self.__cellsPerAxis = cells_per_axis
-        self.__offsets.append(1)
+        if self.__globalCell is None:
+            # Storage is allocated when global cell is inferred for the first dataset
+            self.__offsets = []
+            return
+        self.__offsets = [1]
         for i in range(0, self.__globalCell.dim()-1):
             self.__offsets.append(self.__offsets[i] * cells_per_axis)
+        self.__origin, self.__extent = cell_transform(self.__globalCell)
+
+        cellsCount = self.__offsets[-1] * self.__cellsPerAxis
+        if self.__storage == "auto":
+            denseBytes = cellsCount * np.dtype(self.OCCUPANCY_TYPE).itemsize
+            self.__sparse = denseBytes > self.__denseLimitBytes
+        else:
+            self.__sparse = self.__storage == "sparse"
+
+        if self.__sparse:
+            self.__cell_has_point = None
+        else:
+            self.__cell_has_point = np.zeros(cellsCount, dtype=self.OCCUPANCY_TYPE)
+            if self.__stats is not None:
+                self.__stats.allocatedBytes += self.__cell_has_point.nbytes
 
-        self.__cell_has_point = np.ndarray(self.__offsets[-1] * self.__cellsPerAxis)
-        self.__cell_has_point[:] = 0
+    def is_sparse(self):
+        return self.__sparse
+
+    def enable_stats(self, stats=None, callback=None):
+        """
+        Start accumulating work statistics
+        :param stats: CounterStats object to accumulate to, it may be shared by several counters
+        :param callback: function called with CounterStats after every counting
+        :return: CounterStats object
+        """
+        self.__stats = stats if stats is not None else CounterStats()
+        self.__callback = callback
+        return self.__stats
+
+    def disable_stats(self):
+        self.__stats = None
+        self.__callback = None
+
+    def get_stats(self):
+        """
+        :return: CounterStats object or None when statistics are disabled
+        """
+        return self.__stats
+
+    def outside_count(self):
+        """
+        :return: count of points outside of global cell in the last processed dataset
+        """
+        return self.__outsideCount
 
     def calculate(self, points):
-        if self.__mode == "points":
-            return self.__calculate_points(points)
+        if self.__stats is None:
+            return self.__count_cells(self.__visited_indexes(np.asarray(points)))
+
+        self.__clock = time.perf_counter()
+        points = np.asarray(points)
+        self.__tick("conversion")
+        count = self.__count_cells(self.__visited_indexes(points))
+        self.__finish(points.shape[0], count)
+        return count
+
+    def occupied_cells(self, points):
+        """
+        Occupied cells of points set. Results for parts of dataset may be joined by merge_cells
+        :param points: (N, dim) array of points
+        :return: sorted unique linear indices of cells, or unique (M, dim) rows of cell indices
+                 when linear indices do not fit int64
+        """
+        if self.__stats is None:
+            return self.__unique_cells(self.__visited_indexes(np.asarray(points)))
+
+        self.__clock = time.perf_counter()
+        points = np.asarray(points)
+        self.__tick("conversion")
+        cells = self.__unique_cells(self.__visited_indexes(points))
+        self.__tick("counting")
+        self.__finish(points.shape[0], cells.shape[0])
+        return cells
+
+    def calculate_grid(self, grid):
+        """
+        Count blocks of points indexed by MultiGrid without quantizing them again. Grid division
+        should be a multiple of cellsPerAxis. Only "points" mode is supported
+        :param grid: built MultiGrid object
+        :return: blocks count
+        """
+        if self.__mode != "points":
+            raise Exception("Only points mode blocks may be counted by grid")
+        self.__adopt_cell(grid.get_global_cell())
+        self.__outsideCount = 0
+        if self.__stats is None:
+            return self.__count_cells(grid.coarse_cells(self.__cellsPerAxis))
+
+        self.__clock = time.perf_counter()
+        indexes = grid.coarse_cells(self.__cellsPerAxis)
+        self.__tick("quantization")
+        count = self.__count_cells(indexes)
+        self.__finish(grid.get_offsets()[-1], count)
+        return count
+
+    def calculate_quantized(self, quantized):
+        """
+        Count blocks of points quantized by QuantizedPoints, cell indices are obtained by shifts.
+        cellsPerAxis should be a power of two not greater than quantized.cells_per_axis()
+        :param quantized: QuantizedPoints object over the same global cell
+        :return: blocks count
+        """
+        if self.__mode != "points":
+            raise Exception("Only points mode blocks may be counted by quantized points")
+        self.__adopt_cell(quantized.get_global_cell())
+        self.__outsideCount = 0
+        if self.__stats is None:
+            return self.__count_cells(quantized.indexes(self.__cellsPerAxis))
+
+        self.__clock = time.perf_counter()
+        indexes = quantized.indexes(self.__cellsPerAxis)
+        self.__tick("quantization")
+        count = self.__count_cells(indexes)
+        self.__finish(len(quantized), count)
+        return count
+
+    def __adopt_cell(self, cell):
+        """
+        Use global cell of already quantized data, or check that it is the same as given by user
+        """
+        if self.__inferCell:
+            self.__set_cell(cell)
+        elif not (np.array_equal(np.asarray(self.__globalCell.get_min(), dtype=float),
+                                 np.asarray(cell.get_min(), dtype=float)) and
+                  np.array_equal(np.asarray(self.__globalCell.get_max(), dtype=float),
+                                 np.asarray(cell.get_max(), dtype=float))):
+            raise Exception("Global cells of data and BlocksCounter differ")
+
+    def __set_cell(self, cell):
+        """
+        Replace global cell keeping occupancy storage when dimension is the same
+        """
+        self.__globalCell = cell
+        if cell.dim() != self.__dim or len(self.__offsets) == 0:
+            self.__dim = cell.dim()
+            self.set_cells_per_axis(self.__cellsPerAxis)
         else:
-            return self.__calculate_lines(points)
+            self.__origin, self.__extent = cell_transform(cell)
 
-    def __mark_visited(self, indices):
+    def __visited_indexes(self, points):
+        if points.shape[0] == 0:
+            # Empty dataset occupies no cells, even when there is no global cell to infer
+            self.__outsideCount = 0
+            return np.empty((0, points.shape[1] if points.ndim == 2 else self.__dim), dtype=np.int64)
+
+        if self.__inferCell:
+            self.__set_cell(bounding_cell(points, self.__cube))
+            if self.__stats is not None:
+                self.__tick("bounding")
+
+        if self.__mode == "points":
+            indexes = quantize(points, self.__origin, self.__extent, self.__cellsPerAxis)
+            inside = self.__inside_grid(indexes)
+            self.__check_outside(indexes.shape[0] - np.count_nonzero(inside))
+            if not inside.all():
+                indexes = indexes[inside]
+            if self.__stats is not None:
+                self.__tick("quantization")
+                self.__stats.cellsVisited += indexes.shape[0]
+                self.__stats.allocatedBytes += indexes.nbytes
+            return indexes
+
+        vertexIndexes = quantize(points, self.__origin, self.__extent, self.__cellsPerAxis)
+        self.__check_outside(vertexIndexes.shape[0] - np.count_nonzero(self.__inside_grid(vertexIndexes)))
+        if self.__stats is not None:
+            self.__tick("quantization")
+        indexes = polyline_cell_indexes(points, self.__globalCell, self.__cellsPerAxis, vertexIndexes)
+        if self.__outsideCount != 0:
+            # Lines are clipped by global cell
+            indexes = indexes[self.__inside_grid(indexes)]
+        if self.__stats is not None:
+            self.__tick("traversal")
+            self.__stats.segments += max(points.shape[0] - 1, 0)
+            self.__stats.cellsVisited += indexes.shape[0]
+            self.__stats.allocatedBytes += vertexIndexes.nbytes + indexes.nbytes
+        return indexes
+
+    def __tick(self, phase):
         """
-        Mark cell visited by its indices
-        :param indices: cell ids
-        :return: nothing
+        Add time passed since previous tick to phase
         """
-        index = 0
-        for i in reversed(indices):
-            index = index * self.__cellsPerAxis + i
-        self.__cell_has_point[index] = 1
-
-    def __get_point_indexes(self, point, indices):
-        for i in range(0, self.__globalCell.dim()):
-            tmp = (point[i] - self.__globalCell.get_min()[i]) \
-                  / (self.__globalCell.get_max()[i] - self.__globalCell.get_min()[i])
-            index = int(tmp * self.__cellsPerAxis)
-            # For right boundary values than formally does not imcluded to system
-            # because cells are alike [0, 1), [1, 2), ... , [9, 10) <-- this border
-            # should not be open
-            if index == self.__cellsPerAxis:
-                index = self.__cellsPerAxis-1
-
-            indices[i] = index
-
-    def __index_to_lower_boundary_coordinate(self, axis, index):
-        return self.__globalCell.get_min()[axis] + \
-               (self.__globalCell.get_max()[axis] - self.__globalCell.get_min()[axis]) * \
-               (index / self.__cellsPerAxis)
-
-    def __get_cell_size(self, axis):
-        return (self.__globalCell.get_max()[axis] - self.__globalCell.get_min()[axis]) / self.__cellsPerAxis
-
-    def __calculate_lines(self, points):
-        self.__cell_has_point[:] = 0
-        if points.shape[0] == 1:
-            return 1
-
-        begin_indexes = np.ndarray(self.__globalCell.dim(), dtype=int)
-        end_indexes = np.ndarray(self.__globalCell.dim(), dtype=int)
-        indexes = np.ndarray(self.__globalCell.dim(), dtype=int)
-
-        middle_point = np.ndarray(self.__globalCell.dim())
-
-        self.__get_point_indexes(points[0, :], begin_indexes)
-        for pointIndex in range(1, points.shape[0]):
-            self.__get_point_indexes(points[pointIndex, :], end_indexes)
-            self.__mark_visited(end_indexes)
-            self.__mark_visited(begin_indexes)
-            # Iterating by all dimensions to find all crossings of line with grid
-            for d in range(0, self.__dim):
-                # Now iterating by cells crossing along this dimension
-                begin = min(begin_indexes[d], end_indexes[d]) + 1
-                end = max(begin_indexes[d], end_indexes[d])
-
-                for i in range(begin, end+1):
-                    # We have crossing with i's cell lowest border on axis d
-                    get_point_on_line(lineBegin=points[pointIndex - 1, :],
-                                      lineEnd=points[pointIndex, :],
-                                      axis=d,
-                                      axisValue=self.__index_to_lower_boundary_coordinate(axis=d, index=i),
-                                      targetPoint=middle_point)
-                    # a little move of border point inside cell
-                    middle_point[d] -= self.__get_cell_size(d) * 0.1
-                    self.__get_point_indexes(middle_point, indexes)
-                    self.__mark_visited(indexes)
-
-            begin_indexes = end_indexes.copy()
-
-        result = 0
-        for m in self.__cell_has_point:
-            if m != 0:
-                result += 1
+        now = time.perf_counter()
+        self.__stats.add_time(phase, now - self.__clock)
+        self.__clock = now
 
-        return result
+    def __finish(self, pointsCount, occupied):
+        self.__stats.calls += 1
+        self.__stats.points += int(pointsCount)
+        self.__stats.cellsOccupied += int(occupied)
+        if self.__callback is not None:
+            self.__callback(self.__stats)
 
-    def __calculate_points(self, points):
-        self.__cell_has_point[:] = 0
+    def __inside_grid(self, indexes):
+        return np.all((indexes >= 0) & (indexes < self.__cellsPerAxis), axis=1)
 
-        indexes = np.ndarray(self.__globalCell.dim(), dtype=int)
-        for i in range(0, points.shape[0]):
-            self.__get_point_indexes(points[i, :], indexes)
-            self.__mark_visited(indexes)
+    def __check_outside(self, count):
+        self.__outsideCount = int(count)
+        if count != 0 and self.__outside == "raise":
+            raise Exception("%d points are out of global cell" % count)
 
-        result = 0
+    def __count_cells(self, indexes):
+        """
+        Count distinct cells among given ones
+        :param indexes: (M, dim) array of cell indices, may contain repeats
+        :return: count of distinct cells
+        """
+        if indexes.shape[0] == 0:
+            count = 0
+        elif not self.__sparse:
+            count = kernels.mark_cells(indexes, np.asarray(self.__offsets, dtype=np.int64), self.__cell_has_point)
+        else:
+            # Sparse storage: memory is proportional to points count, not to grid volume
+            count = int(self.__unique_cells(indexes).shape[0])
+        if self.__stats is not None:
+            self.__tick("counting")
+        return count
 
-        for m in self.__cell_has_point:
-            if m != 0:
-                result += 1
+    def __unique_cells(self, indexes):
+        if indexes.shape[0] == 0 and self.__globalCell is None:
+            return np.empty(0, dtype=np.int64)
+        if self.__linear_indexes_fit_int64():
+            return sorted_unique(self.__linear_indexes(indexes))
+        # Grid is too large even for int64 linear indices, so compare index rows directly
+        return np.unique(indexes, axis=0)
 
-        return result
+    def __linear_indexes_fit_int64(self):
+        return self.__offsets[-1] * self.__cellsPerAxis <= np.iinfo(np.int64).max
+
+    def __linear_indexes(self, indexes):
+        """
+        Flatten cell indices with row-major offsets
+        :param indexes: (N, dim) array of cell indices
+        :return: (N,) array of linear cell indices
+        """
+        return indexes @ np.asarray(self.__offsets, dtype=np.int64)
+
+
+def merge_cells(cellsList):
+    """
+    Union of occupied cells sets returned by BlocksCounter.occupied_cells
+    :param cellsList: list of occupied cells arrays
+    :return: sorted unique cells of all sets
+    """
+    cells = np.concatenate(cellsList)
+    if cells.ndim == 1:
+        return sorted_unique(cells)
+    return np.unique(cells, axis=0)
+
+
+def insert_cells(cells, newCells):
+    """
+    Add cells returned by BlocksCounter.occupied_cells to a larger set of them. Sorted linear
+    indices are inserted in place found by binary search, so the cost is linear in size of cells
+    instead of sorting them again
+    :param cells: sorted unique cells
+    :param newCells: sorted unique cells to add
+    :return: sorted unique cells of both sets
+    """
+    if cells.ndim != 1 or newCells.ndim != 1:
+        return merge_cells([cells, newCells])
+    positions = np.searchsorted(cells, newCells)
+    present = positions < cells.shape[0]
+    present[present] = cells[positions[present]] == newCells[present]
+    if present.all():
+        return cells
+    return np.insert(cells, positions[~present], newCells[~present])
 
 
 def calculate_blocks_count_1d(data, block_size):
@@ -3,53 +3,350 @@ import math
 
 
 class KochSnowflake:
+    # Segments count processed at once, bounds temporary memory of construct
+    BLOCK_SEGMENTS = 65536
+
     def __init__(self):
         self.__points = None
         self.__depth = 0
         self.__pointsCount = 0
-        self.__currentPointsCount = 0
 
-    def __appendPoint(self, point):
-        self.__points[self.__currentPointsCount, :] = point
-        self.__currentPointsCount += 1
+    @staticmethod
+    def get_dimension():
+        return math.log(4) / math.log(3)
+
+    @staticmethod
+    def get_points_count(depth):
+        """
+        :param depth: snowflake depth
+        :return: count of polyline points generated by construct(depth)
+        """
+        return 3 * 4**(depth-1) + 1
+
+    def construct(self, depth, dtype=np.float64, out=None):
+        """
+        Construct closed snowflake polyline level by level. Points of level k are placed to output
+        with stride 4**(depth-k), so every level fills gaps between points of previous one.
+        Levels are computed by blocks of BLOCK_SEGMENTS segments, so memory besides output
+        does not depend on depth
+        :param depth: snowflake depth, 1 gives a triangle
+        :param dtype: output type, np.float32 halves memory for deep snowflakes
+        :param out: optional (get_points_count(depth), 2) buffer or memmap to write points to
+        :return: (get_points_count(depth), 2) array of points
+        """
+        if depth < 1:
+            raise Exception("Invalid depth for KochSnowflake")
 
-    def construct(self, depth):
-        self.__currentPointsCount = 0
-        self.__pointsCount = 3 * 4**(depth-1) + 1
-        self.__points = np.ndarray(shape=(self.__pointsCount, 2))
+        self.__pointsCount = self.get_points_count(depth)
         self.__depth = depth
-        p1 = np.asarray([0, 0])
-        p2 = np.asarray([1, 0])
-        p3 = np.asarray([0.5, math.sqrt(3) / 2])
-        self.__appendPoint(p1)
-        self.__recursiveAddLine(1, p1, p2)
-        self.__appendPoint(p2)
-        self.__recursiveAddLine(1, p2, p3)
-        self.__appendPoint(p3)
-        self.__recursiveAddLine(1, p3, p1)
-        self.__appendPoint(p1)
+        if out is None:
+            out = np.ndarray(shape=(self.__pointsCount, 2), dtype=dtype)
+        elif out.shape != (self.__pointsCount, 2):
+            raise Exception("Invalid output buffer shape")
+        self.__points = out
+
+        stride = 4**(depth-1)
+        out[0::stride, :] = [[0, 0], [1, 0], [0.5, math.sqrt(3) / 2], [0, 0]]
+
+        while stride > 1:
+            step = stride // 4
+            segmentsCount = (self.__pointsCount - 1) // stride
+            # Segments are processed by blocks, so temporaries do not grow with curve size
+            for begin in range(0, segmentsCount, self.BLOCK_SEGMENTS):
+                end = min(begin + self.BLOCK_SEGMENTS, segmentsCount)
+                first = begin * stride
+                last = end * stride
+                p1 = out[first:last:stride, :].astype(np.float64)
+                p2 = out[first + stride:last + 1:stride, :].astype(np.float64)
+
+                pl = p1 * 2.0/3.0 + p2 * 1.0/3.0
+                pr = p1 * 1.0/3.0 + p2 * 2.0/3.0
+                pc = p1 * 0.5 + p2 * 0.5
+
+                vs = (p2-p1) / 3
+                pc[:, 0] += vs[:, 1] * math.sqrt(3) / 2
+                pc[:, 1] += -vs[:, 0] * math.sqrt(3) / 2
+
+                out[first + step:last:stride, :] = pl
+                out[first + 2*step:last:stride, :] = pc
+                out[first + 3*step:last:stride, :] = pr
+            stride = step
+
         return self.__points
 
-    def __recursiveAddLine(self, currentDepth, p1, p2):
-        if currentDepth == self.__depth:
-            return
-
-        pl = p1 * 2.0/3.0 + p2 * 1.0/3.0
-        pr = p1 * 1.0/3.0 + p2 * 2.0/3.0
-        pc = p1 * 0.5 + p2 * 0.5
-
-        vs = (p2-p1) / 3
-        vslen = math.sqrt(vs[0]*vs[0] + vs[1]*vs[1])
-        v = np.ndarray(shape=[2])
-        v[0] = vs[1] * math.sqrt(3) / 2
-        v[1] = -vs[0] * math.sqrt(3) / 2
-        pc += v
-        self.__recursiveAddLine(currentDepth+1, p1, pl)
-        self.__appendPoint(pl)
-        self.__recursiveAddLine(currentDepth+1, pl, pc)
-        self.__appendPoint(pc)
-        self.__recursiveAddLine(currentDepth+1, pc, pr)
-        self.__appendPoint(pr)
-        self.__recursiveAddLine(currentDepth+1, pr, p2)
 
+class CantorSet:
+    """
+    Middle-thirds Cantor set represented by left ends of its intervals
+    """
+    @staticmethod
+    def get_dimension():
+        return math.log(2) / math.log(3)
+
+    def construct(self, depth, dtype=np.float64):
+        """
+        :param depth: count of thirds removing steps
+        :param dtype: output type
+        :return: (2**depth, 1) array of points
+        """
+        if depth < 0:
+            raise Exception("Invalid depth for CantorSet")
+
+        points = np.zeros(1)
+        for level in range(0, depth):
+            points = np.concatenate((points / 3, points / 3 + 2.0 / 3.0))
+        return points.astype(dtype).reshape((-1, 1))
+
+
+class SierpinskiTriangle:
+    """
+    Sierpinski triangle points of chaos game. Game steps are independent for every point,
+    so each point is a sum of randomly chosen vertices weighted by powers of 1/2
+    """
+    def __init__(self, seed=None):
+        self.__rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def get_dimension():
+        return math.log(3) / math.log(2)
+
+    def construct(self, count, dtype=np.float64):
+        """
+        :param count: points count
+        :param dtype: output type
+        :return: (count, 2) array of points
+        """
+        # Chosen vertices are encoded by binary fractions: vertex 1 adds a bit to xBits, vertex 2 adds
+        # a bit to yBits. Five game steps are drawn at once as a number below 3**5
+        digits = np.arange(0, 3**5)
+        xTable = np.zeros(3**5, dtype=np.uint64)
+        yTable = np.zeros(3**5, dtype=np.uint64)
+        for step in range(0, 5):
+            xTable = (xTable << np.uint64(1)) | (digits % 3 == 1).astype(np.uint64)
+            yTable = (yTable << np.uint64(1)) | (digits % 3 == 2).astype(np.uint64)
+            digits //= 3
+
+        xBits = np.zeros(count, dtype=np.uint64)
+        yBits = np.zeros(count, dtype=np.uint64)
+        # 40 steps make every point a corner of a triangle of level 40, so it lies on the attractor
+        for block in range(0, 8):
+            drawn = self.__rng.integers(0, 3**5, count, dtype=np.uint8)
+            xBits = (xBits << np.uint64(5)) | xTable[drawn]
+            yBits = (yBits << np.uint64(5)) | yTable[drawn]
+
+        points = np.ndarray(shape=(count, 2), dtype=dtype)
+        scale = 0.5**40
+        points[:, 0] = (xBits * scale + yBits * (scale / 2))
+        points[:, 1] = yBits * (scale * math.sqrt(3) / 2)
+        return points
+
+
+class HenonAttractor:
+    """
+    Henon map attractor. Many independent trajectories are iterated at once
+    """
+    def __init__(self, a=1.4, b=0.3, trajectories=100000, transient=1000, seed=None):
+        """
+        :param a: map parameter
+        :param b: map parameter
+        :param trajectories: count of trajectories iterated together
+        :param transient: iterations skipped before recording
+        :param seed: random generator seed for initial points
+        """
+        self.__a = a
+        self.__b = b
+        self.__trajectories = trajectories
+        self.__transient = transient
+        self.__rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def get_dimension():
+        """
+        :return: box-counting dimension estimate for classic parameters a=1.4, b=0.3
+        """
+        return 1.261
+
+    def construct(self, count, dtype=np.float64):
+        """
+        :param count: points count
+        :param dtype: output type
+        :return: (count, 2) array of points
+        """
+        trajectories = min(self.__trajectories, count)
+        steps = -(-count // trajectories)
+        x = self.__rng.uniform(-0.1, 0.1, trajectories)
+        y = self.__rng.uniform(-0.1, 0.1, trajectories)
+        points = np.ndarray(shape=(steps, trajectories, 2), dtype=dtype)
+        for step in range(0, self.__transient + steps):
+            x, y = 1 - self.__a * x * x + y, self.__b * x
+            if step >= self.__transient:
+                points[step - self.__transient, :, 0] = x
+                points[step - self.__transient, :, 1] = y
+        return points.reshape((-1, 2))[:count]
+
+
+class LorenzAttractor:
+    """
+    Lorenz system attractor integrated by Runge-Kutta method for many trajectories at once
+    """
+    def __init__(self, sigma=10.0, rho=28.0, beta=8.0/3.0, dt=0.01, trajectories=100000, transient=200,
+                 seed=None):
+        """
+        :param sigma: system parameter
+        :param rho: system parameter
+        :param beta: system parameter
+        :param dt: integration step
+        :param trajectories: count of trajectories integrated together
+        :param transient: integration steps skipped before recording
+        :param seed: random generator seed for initial points
+        """
+        self.__sigma = sigma
+        self.__rho = rho
+        self.__beta = beta
+        self.__dt = dt
+        self.__trajectories = trajectories
+        self.__transient = transient
+        self.__rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def get_dimension():
+        """
+        :return: dimension estimate for classic parameters sigma=10, rho=28, beta=8/3
+        """
+        return 2.06
+
+    def __derivative(self, x, y, z):
+        return self.__sigma * (y - x), x * (self.__rho - z) - y, x * y - self.__beta * z
+
+    def construct(self, count, dtype=np.float64):
+        """
+        :param count: points count
+        :param dtype: output type
+        :return: (count, 3) array of points
+        """
+        trajectories = min(self.__trajectories, count)
+        steps = -(-count // trajectories)
+        x, y, z = self.__rng.uniform(-10, 10, (3, trajectories)) + [[0], [0], [25]]
+        points = np.ndarray(shape=(steps, trajectories, 3), dtype=dtype)
+        dt = self.__dt
+        for step in range(0, self.__transient + steps):
+            k1 = self.__derivative(x, y, z)
+            k2 = self.__derivative(x + k1[0] * (dt / 2), y + k1[1] * (dt / 2), z + k1[2] * (dt / 2))
+            k3 = self.__derivative(x + k2[0] * (dt / 2), y + k2[1] * (dt / 2), z + k2[2] * (dt / 2))
+            k4 = self.__derivative(x + k3[0] * dt, y + k3[1] * dt, z + k3[2] * dt)
+            x = x + (k1[0] + 2 * k2[0] + 2 * k3[0] + k4[0]) * (dt / 6)
+            y = y + (k1[1] + 2 * k2[1] + 2 * k3[1] + k4[1]) * (dt / 6)
+            z = z + (k1[2] + 2 * k2[2] + 2 * k3[2] + k4[2]) * (dt / 6)
+            if step >= self.__transient:
+                points[step - self.__transient, :, 0] = x
+                points[step - self.__transient, :, 1] = y
+                points[step - self.__transient, :, 2] = z
+        return points.reshape((-1, 3))[:count]
+
+
+def _fft_size(n):
+    """
+    :param n: required length
+    :return: the smallest length not less than n without prime factors other than 2, 3 and 5
+    """
+    best = 1 << (n - 1).bit_length()
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            size = power35 << max(0, (-(-n // power35) - 1).bit_length())
+            best = min(best, size)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+
+class FractionalBrownianMotion:
+    """
+    Fractional Brownian motion on [0, 1] generated by Davies-Harte circulant embedding method
+    """
+    def __init__(self, hurst=0.5, seed=None):
+        """
+        :param hurst: Hurst exponent in (0, 1)
+        :param seed: random generator seed
+        """
+        if hurst <= 0 or hurst >= 1:
+            raise Exception("Invalid Hurst exponent")
+        self.__hurst = hurst
+        self.__rng = np.random.default_rng(seed)
+
+    def get_dimension(self):
+        """
+        :return: dimension of motion graph
+        """
+        return 2 - self.__hurst
+
+    def construct(self, count, dtype=np.float64):
+        """
+        :param count: samples count
+        :param dtype: output type
+        :return: (count,) array of motion samples, motion starts from zero
+        """
+        n = max(count - 1, 1)
+        # Increments are generated for FFT friendly length and truncated: the first n of them
+        # are fractional Gaussian noise as well
+        m = _fft_size(n)
+        h2 = 2 * self.__hurst
+        k = np.arange(0, m + 1, dtype=float)
+        covariance = 0.5 * (np.abs(k + 1)**h2 - 2 * k**h2 + np.abs(k - 1)**h2)
+        circulant = np.concatenate((covariance, covariance[-2:0:-1]))
+        # Circulant is real and symmetric, so its eigenvalues are given by real FFT
+        eigenvalues = np.fft.rfft(circulant).real
+        if eigenvalues.min() < -1e-10:
+            raise Exception("Circulant embedding is not positive definite")
+
+        # Hermitian weights give real sample by one inverse real FFT (Wood and Chan)
+        weights = np.sqrt(np.maximum(eigenvalues, 0) / (4 * m))
+        weights[0] *= math.sqrt(2)
+        weights[m] *= math.sqrt(2)
+        noise = np.empty(m + 1, dtype=complex)
+        noise.real = self.__rng.standard_normal(m + 1)
+        noise.imag = self.__rng.standard_normal(m + 1)
+        noise.imag[0] = 0
+        noise.imag[m] = 0
+        noise *= weights
+        increments = np.fft.irfft(noise, 2 * m)[:n] * (2 * m)
+
+        motion = np.zeros(n + 1)
+        motion[1:] = np.cumsum(increments) * n**(-self.__hurst)
+        return motion[:count].astype(dtype)
+
+
+class WeierstrassFunction:
+    """
+    Weierstrass function W(x) = sum a**k * cos(b**k * pi * x) on [0, 1]
+    """
+    def __init__(self, a=0.5, b=3.0):
+        """
+        :param a: amplitude ratio, 0 < a < 1
+        :param b: frequency ratio, a * b > 1
+        """
+        if a <= 0 or a >= 1 or a * b <= 1:
+            raise Exception("Invalid Weierstrass function parameters")
+        self.__a = a
+        self.__b = b
+
+    def get_dimension(self):
+        """
+        :return: dimension of function graph
+        """
+        return 2 + math.log(self.__a) / math.log(self.__b)
 
+    def construct(self, count, dtype=np.float64):
+        """
+        :param count: samples count
+        :param dtype: output type
+        :return: (count,) array of function samples on uniform grid
+        """
+        x = np.linspace(0, 1, count)
+        result = np.zeros(count)
+        # Terms with frequency far above sampling rate only add aliasing noise
+        terms = int(math.ceil(math.log(max(count, 2) * 2) / math.log(self.__b))) + 1
+        for k in range(0, terms):
+            result += self.__a**k * np.cos(self.__b**k * math.pi * x)
+        return result.astype(dtype)
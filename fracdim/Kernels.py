@@ -0,0 +1,283 @@
+"""
+    Hot loops of fractal analysis with two backends: NumPy array expressions and, when
+    Numba is installed, compiled parallel loops without temporary arrays. Backends give
+    identical results, so the choice affects only speed and memory
+"""
+
+import importlib
+import importlib.util
+import os
+import numpy as np
+
+
+# Numba is only looked up here, it is imported with compiled kernels on first use
+_numbaInstalled = importlib.util.find_spec("numba") is not None
+_numbaKernels = None
+_backend = "numpy"
+
+# Rows of points converted to float64 at once by NumPy quantize
+QUANTIZE_CHUNK_ROWS = 65536
+
+
+def available_backends():
+    """
+    :return: list of backends that may be used on this system
+    """
+    return ["numpy", "numba"] if _numbaInstalled else ["numpy"]
+
+
+def _compiled():
+    global _numbaKernels
+    if _numbaKernels is None:
+        _numbaKernels = importlib.import_module("fracdim.NumbaKernels")
+    return _numbaKernels
+
+
+def set_threads(count):
+    """
+    Limit threads of compiled kernels, e.g. in worker processes
+    :param count: threads count
+    :return: nothing
+    """
+    if _backend == "numba":
+        _compiled().numba.set_num_threads(count)
+
+
+def set_backend(name="auto"):
+    """
+    Select kernels implementation
+    :param name: "numpy", "numba" or "auto" that selects "numba" when it is installed
+    :return: nothing
+    """
+    global _backend
+    if name == "auto":
+        name = "numba" if _numbaInstalled else "numpy"
+    if name not in available_backends():
+        raise Exception("Kernels backend %s is not available" % name)
+    _backend = name
+
+
+def get_backend():
+    return _backend
+
+
+def quantize(points, origin, extent, cellsPerAxis):
+    """
+    :param points: (N, dim) array of points of any real or integer type
+    :param origin: (dim,) grid origin
+    :param extent: (dim,) grid size along every axis
+    :param cellsPerAxis: Axis division, scalar or one value for every axis
+    :return: (N, dim) int64 array of cell indices floor((p - origin) / extent * cellsPerAxis),
+             right boundary belongs to the last cell
+    """
+    if _backend == "numba":
+        cellsPerAxis = np.ascontiguousarray(np.broadcast_to(np.asarray(cellsPerAxis, dtype=np.int64),
+                                                            (points.shape[1],)))
+        return _compiled().quantize(points, origin, extent, cellsPerAxis)
+
+    indexes = np.empty(points.shape, dtype=np.int64)
+    # Arithmetic is done in float64 chunk by chunk, so float32 and integer points are never
+    # copied entirely and give the same cells as their float64 values
+    for begin in range(0, points.shape[0], QUANTIZE_CHUNK_ROWS):
+        chunk = points[begin:begin + QUANTIZE_CHUNK_ROWS] - origin
+        chunk /= extent
+        chunk *= cellsPerAxis
+        indexes[begin:begin + QUANTIZE_CHUNK_ROWS] = np.floor(chunk, out=chunk)
+    indexes -= indexes == cellsPerAxis
+    return indexes
+
+
+def mark_cells(indexes, strides, occupancy):
+    """
+    Clear occupancy grid and mark cells with given indices
+    :param indexes: (N, dim) array of cell indices
+    :param strides: (dim,) int64 strides of linear cell index
+    :param occupancy: 1-D occupancy grid of any integer type, e.g. uint8
+    :return: count of marked cells
+    """
+    if _backend == "numba":
+        return int(_compiled().mark_cells(indexes, strides, occupancy))
+
+    occupancy[:] = 0
+    occupancy[indexes @ strides] = 1
+    return int(np.count_nonzero(occupancy))
+
+
+def traverse_segments(begins, ends, beginIndexes, deltas, cellMin, cellSize):
+    """
+    Cells entered by segments after every crossing with grid planes. Crossings of every segment
+    are ordered by line parameter, simultaneous crossings are applied in axis order
+    :param begins: (S, dim) array of segments begin points
+    :param ends: (S, dim) array of segments end points
+    :param beginIndexes: (S, dim) cell indices of begin points
+    :param deltas: (S, dim) difference of end and begin cell indices
+    :param cellMin: (dim,) grid origin
+    :param cellSize: (dim,) grid cell size
+    :return: (K, dim) array of entered cells indices, segment by segment
+    """
+    if _backend == "numba":
+        return _compiled().traverse_segments(begins, ends, beginIndexes, deltas, cellMin, cellSize)
+
+    segmentsCount, dim = begins.shape
+    crossingsPerAxis = np.abs(deltas)
+    crossingsPerSegment = crossingsPerAxis.sum(axis=1)
+    total = int(crossingsPerSegment.sum())
+
+    segments = np.empty(total, dtype=np.int64)
+    axes = np.empty(total, dtype=np.int64)
+    t = np.empty(total)
+    position = 0
+    for d in range(0, dim):
+        crossings = crossingsPerAxis[:, d]
+        count = int(crossings.sum())
+        if count == 0:
+            continue
+        axisSegments = np.repeat(np.arange(segmentsCount), crossings)
+        starts = np.cumsum(crossings) - crossings
+        # Lower boundaries of cells lower+1, ..., lower+crossings are crossed
+        lower = np.minimum(beginIndexes[:, d], beginIndexes[:, d] + deltas[:, d])
+        planes = lower[axisSegments] + 1 + (np.arange(count) - starts[axisSegments])
+        boundary = cellMin[d] + cellSize[d] * planes
+        # Coordinates are converted before subtraction, so integer points do not overflow
+        begin = begins[axisSegments, d].astype(np.float64)
+
+        segments[position:position + count] = axisSegments
+        axes[position:position + count] = d
+        t[position:position + count] = (boundary - begin) / (ends[axisSegments, d] - begin)
+        position += count
+
+    order = np.lexsort((axes, t, segments))
+    segments = segments[order]
+    axes = axes[order]
+
+    steps = np.zeros((total, dim), dtype=np.int64)
+    steps[np.arange(total), axes] = np.sign(deltas[segments, axes])
+    steps = np.cumsum(steps, axis=0)
+    # Restart accumulation of steps at the first crossing of every segment
+    firstCrossing = np.cumsum(crossingsPerSegment) - crossingsPerSegment
+    before = np.zeros((segmentsCount, dim), dtype=np.int64)
+    before[1:] = steps[firstCrossing[1:] - 1]
+
+    return beginIndexes[segments] + steps - before[segments]
+
+
+def distances(columns, i, j, metric):
+    """
+    :param columns: (dim, N) array of any real or integer type, every row is contiguous coordinates
+                    of points along one axis
+    :param i: indices of first points of pairs
+    :param j: indices of second points of pairs
+    :param metric: "chebyshev" or "euclidean"
+    :return: distances of pairs
+    """
+    result = np.zeros(i.shape[0])
+    for column in columns:
+        difference = column[i].astype(np.float64) - column[j]
+        if metric == "chebyshev":
+            np.maximum(result, np.abs(difference, out=difference), out=result)
+        else:
+            result += difference * difference
+    if metric == "euclidean":
+        np.sqrt(result, out=result)
+    return result
+
+
+def pair_histogram(histogram, columns, i, j, radii, metric):
+    """
+    Add pairs of points to histogram of distances: pair with distance d goes to bin
+    searchsorted(radii, d, side="right"), pairs not closer than radii[-1] are skipped
+    :param histogram: (len(radii) + 1,) int64 array to add to
+    :param columns: (dim, N) array of coordinates, see distances
+    :param i: indices of first points of pairs
+    :param j: indices of second points of pairs
+    :param radii: sorted radii
+    :param metric: "chebyshev" or "euclidean"
+    :return: nothing
+    """
+    if _backend == "numba":
+        compiled = _compiled()
+        compiled.pair_histogram(histogram, columns, i, j, radii, metric == "euclidean",
+                                compiled.numba.get_num_threads())
+        return
+
+    d = distances(columns, i, j, metric)
+    d = d[d < radii[-1]]
+    histogram += np.bincount(np.searchsorted(radii, d, side="right"), minlength=radii.shape[0] + 1)
+
+
+def cell_pairs_histogram(histogram, columns, permutation, starts, counts, first, second, sameCell, radii,
+                         theiler, metric, batchPairs):
+    """
+    Add pairs of points from pairs of cells to histogram of distances, see pair_histogram. Points
+    of every cell are a contiguous range of columns. Pairs of the same cell are taken with i < j
+    :param histogram: (len(radii) + 1,) int64 array to add to
+    :param columns: (dim, N) array of coordinates of points sorted by cells, see distances
+    :param permutation: original indices of sorted points
+    :param starts: index of the first point of every cell
+    :param counts: points count of every cell
+    :param first: first cells of cell pairs
+    :param second: second cells of cell pairs
+    :param sameCell: first and second cells are the same
+    :param radii: sorted radii
+    :param theiler: pairs with original indices not farther than theiler are skipped
+    :param metric: "chebyshev" or "euclidean"
+    :param batchPairs: count of pairs which indices are generated at once by NumPy backend,
+                       compiled backend takes pairs directly from cells
+    :return: nothing
+    """
+    rows = counts[first]
+    columnsCount = counts[second]
+    if _backend == "numba":
+        compiled = _compiled()
+        # Cell pairs are split to parts of nearly equal work for threads
+        work = np.cumsum(rows * columnsCount)
+        parts = 4 * compiled.numba.get_num_threads()
+        bounds = np.searchsorted(work, np.linspace(0, work[-1] if work.shape[0] else 0, parts + 1)[1:-1])
+        bounds = np.concatenate(([0], bounds, [first.shape[0]])).astype(np.int64)
+        compiled.cell_pairs_histogram(histogram, columns, permutation, starts, counts, first, second, sameCell,
+                                      radii, theiler, metric == "euclidean", bounds)
+        return
+
+    # Every cell pair is split to units of rows of its first cell, so a unit has at most
+    # batchPairs pairs unless a single row is longer
+    rowsPerUnit = np.maximum(batchPairs // np.maximum(columnsCount, 1), 1)
+    unitsPerPair = -(-rows // rowsPerUnit)
+    owners = np.repeat(np.arange(first.shape[0]), unitsPerPair)
+    unitBegin = (np.arange(owners.shape[0]) - np.repeat(np.cumsum(unitsPerPair) - unitsPerPair, unitsPerPair)) \
+        * rowsPerUnit[owners]
+    unitEnd = np.minimum(unitBegin + rowsPerUnit[owners], rows[owners])
+    unitColumns = columnsCount[owners]
+    if sameCell:
+        # Row r of a cell is paired with rows r+1, ... of the same cell only
+        before = unitColumns - unitBegin
+        after = unitColumns - unitEnd
+        unitPairs = before * (before - 1) // 2 - after * (after - 1) // 2
+    else:
+        unitPairs = (unitEnd - unitBegin) * unitColumns
+    bounds = np.cumsum(unitPairs)
+
+    begin = 0
+    while begin < owners.shape[0]:
+        done = bounds[begin - 1] if begin > 0 else 0
+        end = max(int(np.searchsorted(bounds, done + batchPairs, side="right")), begin + 1)
+        unitRows = unitEnd[begin:end] - unitBegin[begin:end]
+        units = np.repeat(np.arange(begin, end), unitRows)
+        row = unitBegin[units] + np.arange(units.shape[0]) - np.repeat(np.cumsum(unitRows) - unitRows, unitRows)
+        rowColumns = unitColumns[units]
+        cellPairs = owners[units]
+        columnBegin = row + 1 if sameCell else 0
+        rowPairs = rowColumns - columnBegin
+        rowOffsets = np.cumsum(rowPairs) - rowPairs
+        i = np.repeat(starts[first[cellPairs]] + row, rowPairs)
+        j = np.repeat(starts[second[cellPairs]] + columnBegin - rowOffsets, rowPairs)
+        j += np.arange(j.shape[0])
+
+        if theiler > 0:
+            keep = np.abs(permutation[i] - permutation[j]) > theiler
+            i = i[keep]
+            j = j[keep]
+        pair_histogram(histogram, columns, i, j, radii, metric)
+        begin = end
+
+
+set_backend(os.environ.get("FRACDIM_BACKEND", "auto"))
@@ -0,0 +1,61 @@
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+
+
+def _slope(x, y):
+    slope, intercept = np.polyfit(x, y, 1)
+    return slope
+
+
+def renyi_spectrum(points, globalCell, scales, qs):
+    """
+    Generalized (Renyi) dimensions D_q and multifractal spectrum f(alpha) computed from
+    cell histograms of one sweep over scales, see FracdimUtils.cell_histograms.
+    f(alpha) is obtained by Chhabra-Jensen direct method
+    :param points: (N, dim) array of points
+    :param globalCell: MultiCell object describes area of blocks counting
+    :param scales: cellsPerAxis values, each of them should divide the largest one
+    :param qs: moment orders q
+    :return: tuple (dq, alpha, f), arrays with one value for every q
+    """
+    qs = np.asarray(qs, dtype=float)
+    scales = np.asarray(scales)
+    if scales.shape[0] < 2:
+        raise Exception("At least two scales are needed for spectrum")
+
+    histograms = fu.cell_histograms(points, globalCell, scales)
+    # Cell size is proportional to 1 / cellsPerAxis
+    logSize = -np.log(scales.astype(float))
+
+    logPartition = np.empty((scales.shape[0], qs.shape[0]))
+    entropy = np.empty(scales.shape[0])
+    alphaSums = np.empty((scales.shape[0], qs.shape[0]))
+    fSums = np.empty((scales.shape[0], qs.shape[0]))
+    for i in range(0, scales.shape[0]):
+        p = histograms[i] / float(histograms[i].sum())
+        logP = np.log(p)
+        weighted = logP[:, np.newaxis] * qs[np.newaxis, :]
+        # Partition function sum(p**q) through logarithms keeps negative q stable
+        shift = weighted.max(axis=0)
+        powers = np.exp(weighted - shift)
+        partition = powers.sum(axis=0)
+        logPartition[i] = np.log(partition) + shift
+        entropy[i] = (p * logP).sum()
+
+        mu = powers / partition
+        alphaSums[i] = (mu * logP[:, np.newaxis]).sum(axis=0)
+        fSums[i] = (mu * np.log(mu)).sum(axis=0)
+
+    dq = np.empty(qs.shape[0])
+    alpha = np.empty(qs.shape[0])
+    f = np.empty(qs.shape[0])
+    for k in range(0, qs.shape[0]):
+        if qs[k] == 1:
+            dq[k] = _slope(logSize, entropy)
+        else:
+            dq[k] = _slope(logSize, logPartition[:, k]) / (qs[k] - 1)
+        alpha[k] = _slope(logSize, alphaSums[:, k])
+        f[k] = _slope(logSize, fSums[:, k])
+
+    return dq, alpha, f
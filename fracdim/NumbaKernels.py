@@ -0,0 +1,133 @@
+"""
+    Numba compiled kernels of Kernels module. This module is imported only when
+    "numba" backend is used, so Numba is not loaded on package import
+"""
+
+import math
+import numba
+import numpy as np
+
+
+@numba.njit(parallel=True, cache=True)
+def quantize(points, origin, extent, cellsPerAxis):
+    pointsCount, dim = points.shape
+    indexes = np.empty((pointsCount, dim), dtype=np.int64)
+    for p in numba.prange(pointsCount):
+        for k in range(dim):
+            index = np.int64(math.floor((points[p, k] - origin[k]) / extent[k] * np.float64(cellsPerAxis[k])))
+            if index == cellsPerAxis[k]:
+                index -= 1
+            indexes[p, k] = index
+    return indexes
+
+
+@numba.njit(parallel=True, cache=True)
+def mark_cells(indexes, strides, occupancy):
+    occupancy[:] = 0
+    for p in numba.prange(indexes.shape[0]):
+        linear = 0
+        for k in range(indexes.shape[1]):
+            linear += indexes[p, k] * strides[k]
+        occupancy[linear] = 1
+    count = 0
+    for c in numba.prange(occupancy.shape[0]):
+        if occupancy[c] != 0:
+            count += 1
+    return count
+
+
+@numba.njit(parallel=True, cache=True)
+def traverse_segments(begins, ends, beginIndexes, deltas, cellMin, cellSize):
+    segmentsCount, dim = begins.shape
+    bounds = np.zeros(segmentsCount + 1, dtype=np.int64)
+    for s in range(segmentsCount):
+        crossings = 0
+        for k in range(dim):
+            crossings += abs(deltas[s, k])
+        bounds[s + 1] = bounds[s] + crossings
+
+    result = np.empty((bounds[segmentsCount], dim), dtype=np.int64)
+    for s in numba.prange(segmentsCount):
+        current = beginIndexes[s].copy()
+        remaining = np.abs(deltas[s])
+        # Next crossed plane: upper boundary of current cell when moving up, lower one otherwise
+        planes = np.empty(dim, dtype=np.int64)
+        for k in range(dim):
+            planes[k] = current[k] + 1 if deltas[s, k] > 0 else current[k]
+        for row in range(bounds[s], bounds[s + 1]):
+            axis = -1
+            tMin = 0.0
+            for k in range(dim):
+                if remaining[k] == 0:
+                    continue
+                boundary = cellMin[k] + cellSize[k] * planes[k]
+                begin = np.float64(begins[s, k])
+                t = (boundary - begin) / (np.float64(ends[s, k]) - begin)
+                if axis < 0 or t < tMin:
+                    axis = k
+                    tMin = t
+            if deltas[s, axis] > 0:
+                current[axis] += 1
+                planes[axis] += 1
+            else:
+                current[axis] -= 1
+                planes[axis] -= 1
+            remaining[axis] -= 1
+            result[row, :] = current
+    return result
+
+
+@numba.njit(parallel=True, cache=True)
+def pair_histogram(histogram, columns, i, j, radii, euclidean, chunks):
+    pairsCount = i.shape[0]
+    local = np.zeros((chunks, histogram.shape[0]), dtype=np.int64)
+    rmax = radii[radii.shape[0] - 1]
+    for c in numba.prange(chunks):
+        for p in range(c * pairsCount // chunks, (c + 1) * pairsCount // chunks):
+            d = 0.0
+            for k in range(columns.shape[0]):
+                difference = np.float64(columns[k, i[p]]) - np.float64(columns[k, j[p]])
+                if euclidean:
+                    d += difference * difference
+                else:
+                    d = max(d, abs(difference))
+            if euclidean:
+                d = math.sqrt(d)
+            if d < rmax:
+                local[c, np.searchsorted(radii, d, side="right")] += 1
+    for c in range(chunks):
+        histogram += local[c]
+
+
+@numba.njit(parallel=True, cache=True)
+def cell_pairs_histogram(histogram, columns, permutation, starts, counts, first, second, sameCell, radii,
+                         theiler, euclidean, bounds):
+    parts = bounds.shape[0] - 1
+    local = np.zeros((parts, histogram.shape[0]), dtype=np.int64)
+    rmax = radii[radii.shape[0] - 1]
+    dim = columns.shape[0]
+    for c in numba.prange(parts):
+        for k in range(bounds[c], bounds[c + 1]):
+            firstBegin = starts[first[k]]
+            secondBegin = starts[second[k]]
+            secondEnd = secondBegin + counts[second[k]]
+            for p in range(firstBegin, firstBegin + counts[first[k]]):
+                for q in range(p + 1 if sameCell else secondBegin, secondEnd):
+                    if theiler > 0 and abs(permutation[p] - permutation[q]) <= theiler:
+                        continue
+                    d = 0.0
+                    for axis in range(dim):
+                        difference = np.float64(columns[axis, p]) - np.float64(columns[axis, q])
+                        if euclidean:
+                            d += difference * difference
+                        else:
+                            d = max(d, abs(difference))
+                            # Maximum never decreases, so far pairs are dropped early
+                            if d >= rmax:
+                                break
+                    if euclidean:
+                        d = math.sqrt(d)
+                    if d < rmax:
+                        local[c, np.searchsorted(radii, d, side="right")] += 1
+    for c in range(parts):
+        histogram += local[c]
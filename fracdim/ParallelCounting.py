@@ -0,0 +1,210 @@
+import mmap
+import numpy as np
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from fracdim import FracdimUtils as fu
+from fracdim import Kernels as kernels
+
+
+class SharedPoints:
+    """
+    Points shared with worker processes, so workers attach to them instead of receiving pickled
+    data. Memory-mapped points, and any strided view of them such as time_delay_embedding of
+    a memory-mapped series, are passed by file name and offset and are not copied at all.
+    Other arrays are copied to shared memory, and a strided view takes only the memory
+    spanned by its base, so embedding of series is shared as the series itself
+    """
+    def __init__(self, points):
+        points = np.asarray(points)
+        self.__points = points
+        self.__shm = None
+        strides = points.strides
+        mapped = _mapped_file(points)
+        if mapped is not None:
+            self.__source = ("file",) + mapped
+        elif all(st >= 0 and st % points.itemsize == 0 for st in strides):
+            span = _span_items(points)
+            flat = np.lib.stride_tricks.as_strided(points, shape=(span,), strides=(points.itemsize,))
+            self.__shm = shared_memory.SharedMemory(create=True, size=max(flat.nbytes, 1))
+            np.ndarray(flat.shape, dtype=flat.dtype, buffer=self.__shm.buf)[...] = flat
+            self.__source = ("shm", self.__shm.name, 0)
+        else:
+            points = np.ascontiguousarray(points)
+            strides = points.strides
+            self.__shm = shared_memory.SharedMemory(create=True, size=max(points.nbytes, 1))
+            np.ndarray(points.shape, dtype=points.dtype, buffer=self.__shm.buf)[...] = points
+            self.__source = ("shm", self.__shm.name, 0)
+        self.__layout = (points.shape, strides, points.dtype.str)
+
+    def descriptor(self):
+        """
+        :return: picklable tuple (kind, name, offset, shape, strides, dtype) describing shared
+                 array, kind is "shm" for shared memory and "file" for memory-mapped file
+        """
+        return self.__source + self.__layout
+
+    def get_points(self):
+        return self.__points
+
+    def close(self):
+        self.__points = None
+        if self.__shm is not None:
+            self.__shm.close()
+            self.__shm.unlink()
+            self.__shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+
+def _span_items(points):
+    """
+    :return: count of items between the first and the last element of array with
+             non-negative strides, inclusive
+    """
+    if points.size == 0:
+        return 0
+    return sum((n - 1) * (st // points.itemsize) for n, st in zip(points.shape, points.strides)) + 1
+
+
+def _mapped_file(points):
+    """
+    :return: tuple (file name, offset of the first element) if points is a view of memory-mapped
+             file with non-negative strides, None otherwise
+    """
+    if points.size == 0 or any(st < 0 for st in points.strides):
+        return None
+    base = points
+    while base is not None:
+        # Views of memmap are memmaps too, but only the one mapping file keeps actual offset
+        if isinstance(base, np.memmap) and isinstance(base.base, mmap.mmap) and base.filename is not None:
+            offset = base.offset + points.ctypes.data - base.ctypes.data
+            return os.fspath(base.filename), int(offset)
+        base = getattr(base, "base", None)
+    return None
+
+
+def attach_points(descriptor):
+    """
+    Attach to points shared by SharedPoints in other process
+    :param descriptor: SharedPoints.descriptor() result
+    :return: tuple (handle, points), handle should be kept alive while points are used
+             and closed after
+    """
+    kind, name, offset, shape, strides, dtype = descriptor
+    if kind == "file":
+        with open(name, "rb") as f:
+            handle = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = handle
+    else:
+        handle = shared_memory.SharedMemory(name=name)
+        buffer = handle.buf
+    points = np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset, strides=strides)
+    return handle, points
+
+
+def _init_worker(backend):
+    kernels.set_backend(backend)
+    # Parallelism is given by processes, threads of every process would compete for cores
+    kernels.set_threads(1)
+
+
+def process_pool(workers):
+    """
+    Process pool with the same kernels backend as in this process. Workers are started by
+    forkserver where possible, because forking a process with running compiled kernels threads
+    may deadlock
+    :param workers: processes count
+    :return: ProcessPoolExecutor object
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                               initargs=(kernels.get_backend(),))
+
+
+def _count_scale(descriptor, globalCell, cellsPerAxis, mode):
+    handle, points = attach_points(descriptor)
+    try:
+        counter = fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=cellsPerAxis, mode=mode)
+        return counter.calculate(points)
+    finally:
+        del points
+        handle.close()
+
+
+def _chunk_cells(descriptor, globalCell, cellsPerAxis, mode, begin, end):
+    handle, points = attach_points(descriptor)
+    try:
+        counter = fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=cellsPerAxis, mode=mode,
+                                   storage="sparse")
+        return counter.occupied_cells(points[begin:end])
+    finally:
+        del points
+        handle.close()
+
+
+def count_by_scales(points, globalCell, scales, mode="points", workers=None):
+    """
+    Count blocks for several grids, every grid is processed by its own worker process
+    :param points: (N, dim) array of points
+    :param globalCell: MultiCell object describes area of blocks counting, bounding cell
+                       of points by default
+    :param scales: cellsPerAxis values
+    :param mode: BlocksCounter mode
+    :param workers: processes count, os.cpu_count() by default
+    :return: int64 array of counts, one for every scale
+    """
+    if len(scales) == 0:
+        return np.empty(0, dtype=np.int64)
+    workers = workers or os.cpu_count()
+    if globalCell is None:
+        globalCell = fu.bounding_cell(points)
+    with SharedPoints(points) as shared:
+        with process_pool(min(workers, len(scales))) as executor:
+            futures = [executor.submit(_count_scale, shared.descriptor(), globalCell, s, mode)
+                       for s in scales]
+            return np.asarray([f.result() for f in futures], dtype=np.int64)
+
+
+def count_by_chunks(points, globalCell, cellsPerAxis, mode="points", workers=None, chunks=None):
+    """
+    Count blocks of one large dataset splitting it to chunks. Every worker finds occupied cells
+    of its chunk and sets of cells are joined. In "lines" mode neighbour chunks share one point
+    so segments between chunks are accounted
+    :param points: (N, dim) array of points
+    :param globalCell: MultiCell object describes area of blocks counting, bounding cell
+                       of points by default
+    :param cellsPerAxis: Axis division
+    :param mode: BlocksCounter mode
+    :param workers: processes count, os.cpu_count() by default
+    :param chunks: chunks count, equal to workers by default
+    :return: blocks count
+    """
+    workers = workers or os.cpu_count()
+    chunks = chunks or workers
+    pointsCount = np.asarray(points).shape[0]
+    if pointsCount == 0:
+        return 0
+    # Cells of chunks are joined, so all of them should be found in one grid
+    if globalCell is None:
+        globalCell = fu.bounding_cell(points)
+    bounds = np.linspace(0, pointsCount, chunks + 1).astype(np.int64)
+    overlap = 1 if mode == "lines" else 0
+
+    with SharedPoints(points) as shared:
+        with process_pool(workers) as executor:
+            futures = [executor.submit(_chunk_cells, shared.descriptor(), globalCell, cellsPerAxis, mode,
+                                       int(bounds[i]), int(min(bounds[i + 1] + overlap, pointsCount)))
+                       for i in range(0, chunks) if bounds[i] < bounds[i + 1]]
+            cells = [f.result() for f in futures]
+
+    if len(cells) == 0:
+        return 0
+    return int(fu.merge_cells(cells).shape[0])
@@ -0,0 +1,177 @@
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import Kernels as kernels
+
+
+class QuantizedPoints:
+    """
+    Points quantized once to the finest grid of 2**bits cells per axis and stored as compact
+    unsigned cell indices. Indices of any coarser grid of 2**k cells per axis are obtained by
+    shifting them right, so points are never quantized again
+    """
+    def __init__(self, indexes, globalCell, bits):
+        """
+        :param indexes: (N, dim) array of cell indices of the finest grid
+        :param globalCell: MultiCell object describes quantized area
+        :param bits: bits per axis, the finest grid has 2**bits cells per axis
+        :return: constructed object
+        """
+        if bits < 1 or bits > 32:
+            raise Exception("Invalid bits count for QuantizedPoints")
+
+        indexes = np.asarray(indexes)
+        if indexes.ndim != 2 or indexes.shape[1] != globalCell.dim():
+            raise Exception("Invalid quantized points shape")
+
+        self.__globalCell = globalCell
+        self.__bits = bits
+        self.__indexes = indexes.astype(np.uint16 if bits <= 16 else np.uint32, copy=False)
+        self.__codes = None
+
+    @staticmethod
+    def from_points(points, globalCell=None, bits=16, cube=False):
+        """
+        :param points: (N, dim) array of points
+        :param globalCell: MultiCell object, bounding cell of points by default
+        :param bits: bits per axis
+        :param cube: inferred bounding cell has equal sides
+        :return: QuantizedPoints object
+        """
+        points = np.asarray(points)
+        if globalCell is None:
+            globalCell = fu.bounding_cell(points, cube)
+
+        if bits < 1 or bits > 32:
+            raise Exception("Invalid bits count for QuantizedPoints")
+
+        cellsPerAxis = 1 << bits
+        origin, extent = fu.cell_transform(globalCell)
+        indexes = np.empty(points.shape, dtype=np.uint16 if bits <= 16 else np.uint32)
+        # Points are quantized by chunks, so int64 indices never take memory of all points
+        chunkRows = kernels.QUANTIZE_CHUNK_ROWS
+        for begin in range(0, points.shape[0], chunkRows):
+            chunk = fu.quantize(points[begin:begin + chunkRows], origin, extent, cellsPerAxis)
+            if chunk.min() < 0 or chunk.max() >= cellsPerAxis:
+                raise Exception("Points are out of global cell")
+            indexes[begin:begin + chunkRows] = chunk
+        return QuantizedPoints(indexes, globalCell, bits)
+
+    def __len__(self):
+        return self.__indexes.shape[0]
+
+    def dim(self):
+        return self.__indexes.shape[1]
+
+    def get_global_cell(self):
+        return self.__globalCell
+
+    def get_bits(self):
+        return self.__bits
+
+    def cells_per_axis(self):
+        """
+        :return: cells per axis of the finest grid
+        """
+        return 1 << self.__bits
+
+    def get_indexes(self):
+        """
+        :return: (N, dim) uint16 or uint32 array of cell indices of the finest grid
+        """
+        return self.__indexes
+
+    def nbytes(self):
+        return self.__indexes.nbytes
+
+    def __shift(self, cellsPerAxis):
+        shift = self.__bits - (int(cellsPerAxis).bit_length() - 1)
+        if cellsPerAxis < 1 or cellsPerAxis & (cellsPerAxis - 1) != 0 or shift < 0:
+            raise Exception("Grid should have power of two cells per axis, not more than the finest one")
+        return shift
+
+    def indexes(self, cellsPerAxis):
+        """
+        :param cellsPerAxis: power of two not greater than cells_per_axis()
+        :return: (N, dim) int64 array of cell indices of the grid
+        """
+        return (self.__indexes >> self.__shift(cellsPerAxis)).astype(np.int64)
+
+    def morton_codes(self):
+        """
+        Morton (Z-order) codes of the finest cells, computed once. Shifting a code right by
+        dim * k bits gives the code of the grid with 2**k times less cells per axis
+        :return: (N,) uint64 array of codes
+        """
+        if self.__codes is None:
+            self.__codes = fu.morton_codes(self.__indexes, self.__bits)
+        return self.__codes
+
+    def box_counts(self, scales):
+        """
+        Blocks counts for several grids. When Morton codes fit 64 bits they are sorted only
+        once and every coarser grid is derived by shift and merge of neighbour codes
+        :param scales: cellsPerAxis values, powers of two not greater than cells_per_axis()
+        :return: int64 array of counts, one for every scale
+        """
+        shifts = [self.__shift(s) for s in scales]
+        counts = np.zeros(len(scales), dtype=np.int64)
+        if len(self) == 0:
+            return counts
+
+        dim = self.dim()
+        if dim * self.__bits <= 64:
+            codes = np.sort(self.morton_codes())
+            currentShift = 0
+            for shift in sorted(set(shifts)):
+                codes = fu.sorted_unique(codes >> np.uint64(dim * (shift - currentShift)))
+                currentShift = shift
+                for k in range(0, len(scales)):
+                    if shifts[k] == shift:
+                        counts[k] = codes.shape[0]
+            return counts
+
+        for k in range(0, len(scales)):
+            counts[k] = np.unique(self.__indexes >> shifts[k], axis=0).shape[0]
+        return counts
+
+    def grid(self, cellsPerAxis):
+        """
+        :param cellsPerAxis: power of two not greater than cells_per_axis()
+        :return: MultiGrid built of quantized points
+        """
+        grid = fu.MultiGrid()
+        grid.build_indexes(self.__globalCell, cellsPerAxis, self.indexes(cellsPerAxis))
+        return grid
+
+    def save(self, path):
+        """
+        Save quantized points to .npy file. Global cell and bits are stored to file
+        path with ".cell.npy" suffix instead of ".npy"
+        :param path: file path ending with ".npy"
+        :return: nothing
+        """
+        np.save(path, self.__indexes)
+        header = np.stack((np.asarray(self.__globalCell.get_min(), dtype=float),
+                           np.asarray(self.__globalCell.get_max(), dtype=float),
+                           np.full(self.dim(), self.__bits, dtype=float)))
+        np.save(_cell_path(path), header)
+
+    @staticmethod
+    def load(path, mmap=False):
+        """
+        :param path: file path given to save()
+        :param mmap: map indices file to memory instead of reading it
+        :return: QuantizedPoints object
+        """
+        indexes = np.load(path, mmap_mode="r" if mmap else None)
+        header = np.load(_cell_path(path))
+        globalCell = fu.MultiCell(header.shape[1], header[0], header[1])
+        return QuantizedPoints(indexes, globalCell, int(header[2, 0]))
+
+
+def _cell_path(path):
+    path = str(path)
+    if path.endswith(".npy"):
+        path = path[:-len(".npy")]
+    return path + ".cell.npy"
@@ -0,0 +1,163 @@
+"""
+    Automatic detection of scaling region of blocks count curves N(cellsPerAxis). A curve in
+    log-log coordinates is fitted by three independent lines: coarse grids, scaling region and
+    fine grids. All breakpoint pairs are tried at once using cumulative sums, so every segment
+    fit costs O(1) and the search costs O(S^2) for S scales, vectorized across many curves
+"""
+
+import math
+import statistics
+import numpy as np
+
+
+class ScalingFit:
+    """
+    Slope of scaling region with its confidence interval. Every field is an array with one
+    value for every curve, or a scalar when a single curve was fitted. Region is scales[begin:end]
+    """
+    __slots__ = ("slope", "intercept", "stderr", "lower", "upper", "begin", "end", "residual")
+
+    def __init__(self, slope, intercept, stderr, lower, upper, begin, end, residual):
+        self.slope = slope
+        self.intercept = intercept
+        self.stderr = stderr
+        self.lower = lower
+        self.upper = upper
+        self.begin = begin
+        self.end = end
+        self.residual = residual
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return "ScalingFit(%s)" % ", ".join("%s=%r" % item for item in self.as_dict().items())
+
+
+def t_quantile(p, dof):
+    """
+    Quantile of Student's t-distribution, exact for 1 and 2 degrees of freedom and
+    Cornish-Fisher expansion of normal quantile otherwise
+    :param p: probability
+    :param dof: array of degrees of freedom
+    :return: array of quantiles, nan where dof < 1
+    """
+    dof = np.asarray(dof, dtype=float)
+    z = statistics.NormalDist().inv_cdf(p)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v = dof
+        result = (z + (z**3 + z) / (4 * v)
+                  + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2)
+                  + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3)
+                  + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * v**4))
+    result = np.where(dof == 1, math.tan(math.pi * (p - 0.5)), result)
+    result = np.where(dof == 2, (2 * p - 1) / math.sqrt(2 * p * (1 - p)), result)
+    return np.where(dof >= 1, result, float("nan"))
+
+
+def _segments_fit(sums, a, b):
+    """
+    Least squares lines of segments [a, b) of every curve
+    :param sums: tuple of cumulative sums (n, x, y, xx, xy, yy), (curves, S + 1) arrays
+    :param a: array of segments begins
+    :param b: array of segments ends
+    :return: tuple (n, slope, intercept, sse, cxx), (curves, segments) arrays
+    """
+    n, sx, sy, sxx, sxy, syy = [s[:, b] - s[:, a] for s in sums]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cxx = sxx - sx * sx / n
+        cxy = sxy - sx * sy / n
+        cyy = syy - sy * sy / n
+        slope = cxy / cxx
+        intercept = (sy - slope * sx) / n
+        sse = np.maximum(cyy - slope * cxy, 0.0)
+    # Segments of less than three points are fitted exactly
+    sse = np.where(n > 2, sse, 0.0)
+    return n, slope, intercept, sse, cxx
+
+
+def fit_scaling_region(scales, counts, minPoints=4, penalty=0.01, confidence=0.95):
+    """
+    Find scaling region of blocks count curves and fit its slope. Region minimizes total squared
+    error of three-lines fit plus penalty for every non-empty segment outside of the region, the
+    longest region wins ties. Non-positive counts are ignored
+    :param scales: cellsPerAxis values, ascending
+    :param counts: blocks counts, 1-D array for one curve or (curves, scales) array
+    :param minPoints: the least count of scales in region
+    :param penalty: cost of a breakpoint in squared log units, larger values give longer regions
+    :param confidence: confidence level of slope interval
+    :return: ScalingFit object, nan slope for curves without minPoints positive counts
+    """
+    x = np.log(np.asarray(scales, dtype=float))
+    counts = np.asarray(counts, dtype=float)
+    single = counts.ndim == 1
+    counts = np.atleast_2d(counts)
+    curvesCount, scalesCount = counts.shape
+    if x.shape[0] != scalesCount:
+        raise Exception("Counts should be given for every scale")
+    if np.any(np.diff(x) <= 0):
+        raise Exception("Scales should be ascending")
+    if minPoints < 3:
+        raise Exception("Scaling region should have at least 3 points")
+
+    valid = counts > 0
+    with np.errstate(divide="ignore"):
+        y = np.where(valid, np.log(np.where(valid, counts, 1.0)), 0.0)
+    w = valid.astype(float)
+    # Centered values keep cumulative sums accurate
+    x = x - x.mean()
+    yMean = (y * w).sum(axis=1, keepdims=True) / np.maximum(w.sum(axis=1, keepdims=True), 1)
+    y = (y - yMean) * w
+    xw = x * w
+    sums = tuple(np.concatenate((np.zeros((curvesCount, 1)), np.cumsum(v, axis=1)), axis=1)
+                 for v in (w, xw, y, xw * x, y * x, y * y))
+
+    # Candidate regions, the longest first
+    begins, ends = [], []
+    for length in range(scalesCount, minPoints - 1, -1):
+        for a in range(0, scalesCount - length + 1):
+            begins.append(a)
+            ends.append(a + length)
+    begins = np.asarray(begins, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+
+    if begins.shape[0] == 0:
+        nan = np.full(curvesCount, float("nan"))
+        empty = np.zeros(curvesCount, dtype=np.int64)
+        result = ScalingFit(nan, nan.copy(), nan.copy(), nan.copy(), nan.copy(), empty, empty.copy(),
+                            nan.copy())
+        return _single(result) if single else result
+
+    positions = np.arange(scalesCount + 1)
+    zeros = np.zeros_like(positions)
+    full = np.full_like(positions, scalesCount)
+    leftSse = _segments_fit(sums, zeros, positions)[3]
+    rightSse = _segments_fit(sums, positions, full)[3]
+    n, slope, intercept, sse, cxx = _segments_fit(sums, begins, ends)
+
+    cost = (sse + leftSse[:, begins] + rightSse[:, ends]
+            + penalty * ((begins > 0).astype(float) + (ends < scalesCount)))
+    cost = np.where(n >= minPoints, cost, np.inf)
+    best = np.argmin(cost, axis=1)
+    rows = np.arange(curvesCount)
+    found = np.isfinite(cost[rows, best])
+
+    n = n[rows, best]
+    slope = np.where(found, slope[rows, best], float("nan"))
+    sse = sse[rows, best]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stderr = np.where(found, np.sqrt(sse / (n - 2) / cxx[rows, best]), float("nan"))
+        residual = np.where(found, np.sqrt(sse / n), float("nan"))
+    halfWidth = t_quantile(0.5 + confidence / 2, n - 2) * stderr
+    # Intercept of uncentered log N versus log cellsPerAxis
+    logMean = np.log(np.asarray(scales, dtype=float)).mean()
+    intercept = np.where(found, intercept[rows, best] + yMean[:, 0] - slope * logMean, float("nan"))
+
+    result = ScalingFit(slope, intercept, stderr, slope - halfWidth, slope + halfWidth,
+                        np.where(found, begins[best], 0), np.where(found, ends[best], 0), residual)
+    return _single(result) if single else result
+
+
+def _single(result):
+    values = [getattr(result, name)[0] for name in ScalingFit.__slots__]
+    return ScalingFit(*[v.item() for v in values])
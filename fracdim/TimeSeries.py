@@ -1,5 +1,320 @@
 from fracdim import FracdimUtils as fu
 
-def intrateByCellSize(points):
+import collections
+import math
+import time
+import numpy as np
+
+
+def default_scales(pointsCount, dim):
+    """
+    :param pointsCount: points count
+    :param dim: points dimension
+    :return: powers of two up to the size when cells count reaches points count
+    """
+    levels = max(1, int(math.log2(max(pointsCount, 2)) / dim))
+    return [2**i for i in range(1, levels + 1)]
+
+
+def intrateByCellSize(points, scales=None, globalCell=None):
+    """
+    Count blocks for a sweep of grids and fit fractal dimension
+    :param points: (N, dim) array of points
+    :param scales: cellsPerAxis values, powers of two up to the size when cells count
+                   reaches points count by default
+    :param globalCell: area of blocks counting, bounding cell of points by default
+    :return: tuple (scales, counts, dimension)
+    """
     pointsCount, dim = points.shape
-    pass
\ No newline at end of file
+    if globalCell is None:
+        globalCell = fu.bounding_cell(points)
+
+    if scales is None:
+        scales = default_scales(pointsCount, dim)
+
+    counts, dimension = fu.box_counting(points, globalCell, scales)
+    return scales, counts, dimension
+
+
+def batch_box_counting(series, dimension, scales, lag=1):
+    """
+    Box counting of time-delay embeddings of many series in one vectorized pass.
+    Every series is scaled to its own range of values. Cell codes of all series are tagged
+    by series number and sorted once, then coarser scales are obtained by shifting codes
+    :param series: 2-D array with one series per row or list of 1-D series of any lengths
+    :param dimension: embedding dimension
+    :param scales: cellsPerAxis values, each of them should be the finest one divided by power of two
+    :param lag: embedding time delay in samples
+    :return: tuple (counts, dimensions), counts is (series count, scales count) int64 array,
+             dimensions are log-log slopes for every series
+    """
+    if isinstance(series, np.ndarray) and series.ndim == 2:
+        lengths = np.full(series.shape[0], series.shape[1], dtype=np.int64)
+        flat = series.ravel()
+    else:
+        rows = [np.asarray(s).ravel() for s in series]
+        lengths = np.asarray([r.shape[0] for r in rows], dtype=np.int64)
+        flat = np.concatenate(rows) if len(rows) != 0 else np.empty(0)
+
+    seriesCount = lengths.shape[0]
+    scales = [int(s) for s in scales]
+    finest = max(scales)
+    shifts = {}
+    for s in scales:
+        ratio = finest // s
+        if s < 1 or finest % s != 0 or ratio & (ratio - 1) != 0:
+            raise Exception("Every scale should be the finest one divided by power of two")
+        shifts[s] = ratio.bit_length() - 1
+
+    bits = max(1, (finest - 1).bit_length())
+    idBits = max(1, (seriesCount - 1).bit_length())
+    if dimension * bits + idBits > 64:
+        raise Exception("Cell codes of batch do not fit 64 bits")
+
+    # Time-delay vectors are built by indices, vectors crossing series boundaries are dropped
+    window = (dimension - 1) * lag
+    ends = np.cumsum(lengths)
+    begins = ends - lengths
+    vectorsCounts = np.maximum(lengths - window, 0)
+    owners = np.repeat(np.arange(seriesCount), vectorsCounts)
+    firstSamples = begins[owners] + (np.arange(owners.shape[0])
+                                     - np.repeat(np.cumsum(vectorsCounts) - vectorsCounts, vectorsCounts))
+
+    # Range of every series is found only over samples that belong to its vectors
+    seriesMin = np.zeros(seriesCount)
+    seriesSize = np.ones(seriesCount)
+    used = vectorsCounts > 0
+    if np.any(used):
+        # Reductions start at every non-empty series, so each of them ends exactly where its
+        # series ends, and samples of too short series are not mixed into used ones
+        nonEmpty = lengths > 0
+        starts = begins[nonEmpty]
+        usedOfNonEmpty = used[nonEmpty]
+        seriesMin[used] = np.minimum.reduceat(flat, starts)[usedOfNonEmpty]
+        seriesMax = np.maximum.reduceat(flat, starts)[usedOfNonEmpty]
+        size = seriesMax - seriesMin[used]
+        size[size == 0] = 1.0
+        seriesSize[used] = size
+
+    indexes = np.empty((owners.shape[0], dimension), dtype=np.int64)
+    # Every series has its own origin, so fu.quantize arithmetic is repeated here with per-point
+    # origin and extent: division and then multiplication, rounding exactly like BlocksCounter
+    for axis in range(0, dimension):
+        tmp = (flat[firstSamples + axis * lag] - seriesMin[owners]) / seriesSize[owners]
+        indexes[:, axis] = (tmp * finest).astype(np.int64)
+    indexes[indexes == finest] = finest - 1
+
+    codeBits = dimension * bits
+    keys = np.sort(fu.morton_codes(indexes, bits) | (owners.astype(np.uint64) << np.uint64(codeBits)))
+
+    counts = np.zeros((seriesCount, len(scales)), dtype=np.int64)
+    currentShift = 0
+    for s in sorted(set(scales), reverse=True):
+        shift = shifts[s]
+        keys = fu.sorted_unique(keys >> np.uint64(dimension * (shift - currentShift)))
+        currentShift = shift
+        seriesIds = (keys >> np.uint64(codeBits - dimension * shift)).astype(np.int64)
+        perSeries = np.bincount(seriesIds, minlength=seriesCount)
+        for k in range(0, len(scales)):
+            if scales[k] == s:
+                counts[:, k] = perSeries
+
+    return counts, fu.fit_dimensions(scales, counts)
+
+
+class StreamBlocksCounter:
+    """
+    Blocks counter for time series that arrive by chunks. Time-delay vectors are built
+    across chunks boundaries, so result is the same as for the whole series, but memory
+    is bounded by chunk size and occupied cells count
+    """
+    def __init__(self, globalCell, cellsPerAxis, dimension, lag=1, mode="points", stats=None):
+        """
+        :param globalCell: MultiCell object describes area of blocks counting. It is required,
+                           because cells of chunks are comparable only in the same grid
+        :param cellsPerAxis: Axis division
+        :param dimension: embedding dimension
+        :param lag: embedding time delay in samples
+        :param mode: BlocksCounter mode
+        :param stats: True or CounterStats object to accumulate work statistics, embedding and
+                      merging of chunks cells are timed too
+        :return: constructed object
+        """
+        if globalCell is None:
+            raise Exception("Global cell of stream should be given")
+        self.__counter = fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=cellsPerAxis,
+                                          mode=mode, storage="sparse", stats=stats)
+        self.__stats = self.__counter.get_stats()
+        self.__dimension = dimension
+        self.__lag = lag
+        self.__window = (dimension - 1) * lag + 1
+        self.__tail = None
+        self.__cells = None
+
+    def add_samples(self, samples):
+        """
+        Account next chunk of series
+        :param samples: 1-D array of samples following previously added ones
+        :return: nothing
+        """
+        if self.__stats is not None:
+            start = time.perf_counter()
+        row = np.asarray(samples).ravel()
+        # Samples keep their type, e.g. float32 or int16 series are not converted to float64
+        if self.__tail is not None:
+            row = np.concatenate((self.__tail, row))
+        # The last vector of this chunk is the first one of the next chunk,
+        # so no vector and no segment between chunks is lost
+        self.__tail = row[max(0, row.shape[0] - self.__window):]
+        points = fu.time_delay_embedding(row, self.__dimension, self.__lag)
+        if self.__stats is not None:
+            self.__stats.add_time("embedding", time.perf_counter() - start)
+        if points.shape[0] == 0:
+            return
+
+        cells = self.__counter.occupied_cells(points)
+        if self.__stats is not None:
+            start = time.perf_counter()
+        if self.__cells is None:
+            self.__cells = cells
+        else:
+            self.__cells = fu.insert_cells(self.__cells, cells)
+        if self.__stats is not None:
+            self.__stats.add_time("merging", time.perf_counter() - start)
+
+    def get_stats(self):
+        return self.__stats
+
+    def count(self):
+        if self.__cells is None:
+            return 0
+        return int(self.__cells.shape[0])
+
+    def occupied_cells(self):
+        return self.__cells
+
+
+def count_stream(source, globalCell, cellsPerAxis, dimension, lag=1, mode="points", chunkSize=1 << 20):
+    """
+    Count blocks of time-delay embedded series that is larger than memory
+    :param source: 1-D array or np.memmap, which is read by chunkSize samples,
+                   or iterable of sample chunks
+    :param globalCell: MultiCell object describes area of blocks counting. For array source it may
+                       be None, then bounding cell of the whole embedding is found by one more pass
+    :param cellsPerAxis: Axis division
+    :param dimension: embedding dimension
+    :param lag: embedding time delay in samples
+    :param mode: BlocksCounter mode
+    :param chunkSize: samples count read at once from array source
+    :return: blocks count
+    """
+    if globalCell is None and isinstance(source, np.ndarray):
+        points = fu.time_delay_embedding(source, dimension, lag)
+        if points.shape[0] == 0:
+            return 0
+        globalCell = fu.bounding_cell(points)
+    counter = StreamBlocksCounter(globalCell, cellsPerAxis, dimension, lag, mode)
+    if isinstance(source, np.ndarray):
+        for begin in range(0, source.shape[0], chunkSize):
+            counter.add_samples(source[begin:begin + chunkSize])
+    else:
+        for chunk in source:
+            counter.add_samples(chunk)
+    return counter.count()
+
+
+class SlidingWindowDimension:
+    """
+    Box-counting dimension over a rolling window of time-delay vectors, updated by every sample.
+    Every scale keeps reference counts of its occupied cells, so a vector entering or leaving
+    the window costs O(scales count) independently of window length
+    """
+    def __init__(self, globalCell, scales, dimension, window, lag=1, outside="raise"):
+        """
+        :param globalCell: MultiCell object describes area of blocks counting
+        :param scales: cellsPerAxis values
+        :param dimension: embedding dimension
+        :param window: count of time-delay vectors in window
+        :param lag: embedding time delay in samples
+        :param outside: what to do with vectors outside of globalCell: "raise" throws exception,
+                        "drop" keeps them in window without occupying any cell, see outside_count
+        :return: constructed object
+        """
+        if window < 1:
+            raise Exception("Invalid window length")
+
+        if outside != "raise" and outside != "drop":
+            raise Exception("Invalid outside points policy for SlidingWindowDimension")
+
+        self.__scales = np.asarray(scales, dtype=np.int64)
+        self.__origin, self.__extent = fu.cell_transform(globalCell)
+        self.__outside = outside
+        self.__outsideCount = 0
+        self.__dimension = dimension
+        self.__lag = lag
+        self.__window = window
+        self.__samples = collections.deque(maxlen=(dimension - 1) * lag + 1)
+        self.__windowCells = collections.deque()
+        self.__references = [dict() for s in scales]
+        self.__counts = np.zeros(len(scales), dtype=np.int64)
+
+    def push(self, sample):
+        """
+        Add next sample of series. When window is full, the oldest vector leaves it
+        :param sample: sample value
+        :return: nothing
+        """
+        self.__samples.append(float(sample))
+        if len(self.__samples) < self.__samples.maxlen:
+            return
+
+        point = np.asarray(self.__samples)[np.newaxis, ::self.__lag]
+        # Cells are found the same way as in BlocksCounter
+        cells = [tuple(fu.quantize(point, self.__origin, self.__extent, s)[0].tolist()) for s in self.__scales]
+        if any(c < 0 or c >= self.__scales[0] for c in cells[0]):
+            if self.__outside == "raise":
+                raise Exception("Vector is out of global cell")
+            cells = None
+            self.__outsideCount += 1
+        else:
+            for i in range(0, len(cells)):
+                references = self.__references[i]
+                count = references.get(cells[i], 0)
+                if count == 0:
+                    self.__counts[i] += 1
+                references[cells[i]] = count + 1
+        self.__windowCells.append(cells)
+
+        if len(self.__windowCells) > self.__window:
+            leaving = self.__windowCells.popleft()
+            if leaving is None:
+                self.__outsideCount -= 1
+                return
+            for i in range(0, len(leaving)):
+                references = self.__references[i]
+                count = references[leaving[i]] - 1
+                if count == 0:
+                    del references[leaving[i]]
+                    self.__counts[i] -= 1
+                else:
+                    references[leaving[i]] = count
+
+    def outside_count(self):
+        """
+        :return: count of vectors outside of global cell in current window
+        """
+        return self.__outsideCount
+
+    def counts(self):
+        """
+        :return: blocks count for every scale for current window
+        """
+        return self.__counts.copy()
+
+    def dimension(self):
+        """
+        :return: log-log slope of blocks counts for current window
+        """
+        if len(self.__windowCells) == 0:
+            return float("nan")
+        return fu.fit_dimension(self.__scales, self.__counts)
@@ -2,13 +2,32 @@
     A tool to make simple fractal analysis of signals and geomenty objects
 """
 
-from fracdim import FracdimUtils
-from fracdim import TimeSeries
+import importlib
 
 __version__ = "0.1"
 __all__ = [
     "FracdimUtils",
     "FractalGenerator",
-    "TimeSeries"
+    "TimeSeries",
+    "ParallelCounting",
+    "CorrelationSum",
+    "Multifractal",
+    "Kernels",
+    "CountCache",
+    "Quantization",
+    "CommandLine",
+    "ScalingRegion"
 ]
 
+
+def __getattr__(name):
+    # Submodules are imported on first access, so "import fracdim" does no work
+    if name in __all__:
+        module = importlib.import_module("fracdim." + name)
+        globals()[name] = module
+        return module
+    raise AttributeError("module 'fracdim' has no attribute '%s'" % name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
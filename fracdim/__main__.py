@@ -0,0 +1,6 @@
+import sys
+
+from fracdim.CommandLine import main
+
+if __name__ == "__main__":
+    sys.exit(main())
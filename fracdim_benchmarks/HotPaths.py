@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+"""
+Timing and peak memory of fracdim hot paths over a matrix of sizes
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import FractalGenerator as fg
+from fracdim import Kernels as kernels
+
+
+PRESETS = {
+    "quick": {
+        "sizes": [10**3, 10**4, 10**5],
+        "dimensions": [1, 2, 4],
+        "cellsPerAxis": [10, 100],
+        "kochDepths": [4, 6, 8],
+    },
+    "full": {
+        "sizes": [10**3, 10**4, 10**5, 10**6, 10**7, 10**8],
+        "dimensions": [1, 2, 3, 4, 6, 8],
+        "cellsPerAxis": [10, 100, 1000],
+        "kochDepths": [4, 6, 8, 10, 12],
+    },
+}
+
+
+def measure(function, repeats=3):
+    """
+    Best wall time of several calls and peak memory allocated during one call
+    :param function: callable without arguments
+    :param repeats: count of timed calls
+    :return: tuple (seconds, peakBytes)
+    """
+    best = float("inf")
+    for i in range(0, repeats):
+        begin = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - begin)
+
+    tracemalloc.start()
+    try:
+        function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def benchmark_cases(preset, maxBytes):
+    """
+    :param preset: dictionary of sizes, dimensions, cellsPerAxis and kochDepths lists
+    :param maxBytes: cases which embedded points take more memory are skipped
+    :return: generator of tuples (name, params, function)
+    """
+    rng = np.random.default_rng(0)
+    for size in preset["sizes"]:
+        row = None
+        for dimension in preset["dimensions"]:
+            if size * dimension * 8 > maxBytes or size < dimension:
+                continue
+            if row is None:
+                # Normalized random walk is closer to recorded signals than white noise
+                row = np.cumsum(rng.standard_normal(size))
+                row = (row - row.min()) / (row.max() - row.min())
+            params = {"size": size, "dimension": dimension}
+            yield "row_to_points", params, lambda r=row, d=dimension: fu.row_to_points(r, d)
+
+            points = fu.time_delay_embedding(row, dimension)
+            globalCell = fu.MultiCell(dimension, np.zeros(dimension), np.ones(dimension))
+            for cellsPerAxis in preset["cellsPerAxis"]:
+                for mode in ["points", "lines"]:
+                    counter = fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=cellsPerAxis, mode=mode)
+                    caseParams = dict(params, cellsPerAxis=cellsPerAxis, mode=mode)
+                    yield "BlocksCounter.calculate", caseParams, lambda c=counter, p=points: c.calculate(p)
+
+    for depth in preset["kochDepths"]:
+        if fg.KochSnowflake.get_points_count(depth) * 16 > maxBytes:
+            continue
+        yield "KochSnowflake.construct", {"depth": depth}, lambda d=depth: fg.KochSnowflake().construct(d)
+
+
+def run(preset, maxBytes, repeats=3, stream=None):
+    """
+    Run all benchmark cases
+    :param preset: see benchmark_cases
+    :param maxBytes: see benchmark_cases
+    :param repeats: count of timed calls of every case
+    :param stream: optional text stream for progress lines
+    :return: dictionary with "meta" and "results" ready for JSON
+    """
+    results = []
+    for name, params, function in benchmark_cases(preset, maxBytes):
+        seconds, peak = measure(function, repeats)
+        results.append({"name": name, "params": params, "seconds": seconds, "peakBytes": peak})
+        if stream is not None:
+            stream.write("%-26s %-70s %10.6f s %12d B\n" % (name, json.dumps(params, sort_keys=True), seconds, peak))
+            stream.flush()
+
+    meta = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "backend": kernels.get_backend(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    return {"meta": meta, "results": results}
+
+
+def case_key(record):
+    return record["name"] + " " + json.dumps(record["params"], sort_keys=True)
+
+
+def compare(baseline, current, threshold=0.2, minSeconds=1e-4):
+    """
+    Find cases that became slower or take more memory
+    :param baseline: earlier run result
+    :param current: later run result
+    :param threshold: allowed relative growth of time and peak memory
+    :param minSeconds: cases faster than this in both runs are not compared by time
+    :return: list of tuples (key, metric, baselineValue, currentValue)
+    """
+    # Timings of different kernels backends are not comparable
+    baselineBackend = baseline.get("meta", {}).get("backend")
+    currentBackend = current.get("meta", {}).get("backend")
+    if baselineBackend is not None and currentBackend is not None and baselineBackend != currentBackend:
+        raise Exception("Runs used different kernels backends: %s and %s" % (baselineBackend, currentBackend))
+
+    baselineRecords = {case_key(r): r for r in baseline["results"]}
+    regressions = []
+    for record in current["results"]:
+        key = case_key(record)
+        if key not in baselineRecords:
+            continue
+        old = baselineRecords[key]
+        if max(old["seconds"], record["seconds"]) >= minSeconds and \
+                record["seconds"] > old["seconds"] * (1 + threshold):
+            regressions.append((key, "seconds", old["seconds"], record["seconds"]))
+        if record["peakBytes"] > old["peakBytes"] * (1 + threshold):
+            regressions.append((key, "peakBytes", old["peakBytes"], record["peakBytes"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="fracdim hot paths benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runParser = commands.add_parser("run", help="run benchmarks and write JSON results")
+    runParser.add_argument("--preset", choices=sorted(PRESETS.keys()), default="quick")
+    runParser.add_argument("--max-bytes", type=int, default=2 * 1024**3,
+                           help="skip cases which embedded points exceed this size")
+    runParser.add_argument("--repeats", type=int, default=3)
+    runParser.add_argument("--output", default="bench_output.json")
+
+    compareParser = commands.add_parser("compare", help="report regressions between two runs")
+    compareParser.add_argument("baseline")
+    compareParser.add_argument("current")
+    compareParser.add_argument("--threshold", type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        result = run(PRESETS[args.preset], args.max_bytes, args.repeats, sys.stdout)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=1)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for key, metric, old, new in regressions:
+        print("REGRESSION %s %s: %g -> %g" % (key, metric, old, new))
+    print("%d regressions" % len(regressions))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""
+Benchmark suite for fracdim package
+"""
+__all__ = [
+    "HotPaths",
+]
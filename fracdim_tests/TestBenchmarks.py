@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from fracdim import Kernels as kernels
+from fracdim_benchmarks import HotPaths as hp
+
+
+class Test_HotPaths(unittest.TestCase):
+    def test_tiny_run(self):
+        preset = {"sizes": [100], "dimensions": [1, 2], "cellsPerAxis": [4], "kochDepths": [3]}
+        result = hp.run(preset, maxBytes=1024**2, repeats=1)
+        names = [r["name"] for r in result["results"]]
+        self.assertEqual(result["meta"]["backend"], kernels.get_backend())
+        self.assertEqual(names.count("row_to_points"), 2)
+        self.assertEqual(names.count("BlocksCounter.calculate"), 4)
+        self.assertEqual(names.count("KochSnowflake.construct"), 1)
+        for record in result["results"]:
+            self.assertGreaterEqual(record["seconds"], 0)
+            self.assertGreaterEqual(record["peakBytes"], 0)
+
+    def test_size_limit(self):
+        preset = {"sizes": [1000], "dimensions": [8], "cellsPerAxis": [4], "kochDepths": [10]}
+        self.assertEqual(hp.run(preset, maxBytes=1024, repeats=1)["results"], [])
+
+    def test_compare(self):
+        baseline = {"results": [
+            {"name": "a", "params": {"size": 1}, "seconds": 1.0, "peakBytes": 100},
+            {"name": "b", "params": {"size": 1}, "seconds": 1.0, "peakBytes": 100},
+            {"name": "c", "params": {"size": 1}, "seconds": 1e-6, "peakBytes": 100},
+        ]}
+        current = {"results": [
+            {"name": "a", "params": {"size": 1}, "seconds": 1.1, "peakBytes": 100},
+            {"name": "b", "params": {"size": 1}, "seconds": 2.0, "peakBytes": 300},
+            {"name": "c", "params": {"size": 1}, "seconds": 5e-6, "peakBytes": 100},
+            {"name": "d", "params": {"size": 1}, "seconds": 9.0, "peakBytes": 900},
+        ]}
+        regressions = hp.compare(baseline, current, threshold=0.2)
+        self.assertEqual([(r[0], r[1]) for r in regressions],
+                         [('b {"size": 1}', "seconds"), ('b {"size": 1}', "peakBytes")])
+
+        baseline["meta"] = {"backend": "numba"}
+        current["meta"] = {"backend": "numpy"}
+        self.assertRaises(Exception, hp.compare, baseline, current)
+        current["meta"]["backend"] = "numba"
+        self.assertEqual(len(hp.compare(baseline, current)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
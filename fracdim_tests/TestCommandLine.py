@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from fracdim import CommandLine as cl
+from fracdim import FracdimUtils as fu
+from fracdim import ScalingRegion as sr
+
+
+class Test_commandLine(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(23)
+        self.series = np.cumsum(rng.standard_normal(5000))
+        self.points = rng.random((800, 2))
+        self.seriesPath = os.path.join(self.directory.name, "series.npy")
+        self.pointsPath = os.path.join(self.directory.name, "points.csv")
+        self.rawPath = os.path.join(self.directory.name, "points.f32")
+        np.save(self.seriesPath, self.series)
+        np.savetxt(self.pointsPath, self.points, delimiter=",")
+        self.points.astype(np.float32).tofile(self.rawPath)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def expected_counts(self, points, scales, mode):
+        globalCell = fu.bounding_cell(points)
+        return [fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=s, mode=mode).calculate(points)
+                for s in scales]
+
+    def run_main(self, arguments):
+        output = os.path.join(self.directory.name, "result")
+        code = cl.main(arguments + ["--output", output])
+        with open(output) as f:
+            return code, f.read()
+
+    def test_jsonl_output(self):
+        for mode in ["points", "lines"]:
+            code, text = self.run_main([self.seriesPath, "--dimension", "3", "--lag", "2", "--scales", "3,6,12",
+                                        "--mode", mode])
+            self.assertEqual(code, 0)
+            record = json.loads(text)
+            embedding = fu.time_delay_embedding(self.series, 3, 2)
+            self.assertEqual(record["points"], embedding.shape[0])
+            self.assertEqual(record["bytes"], os.path.getsize(self.seriesPath))
+            self.assertEqual(record["counts"], self.expected_counts(embedding, [3, 6, 12], mode))
+            self.assertAlmostEqual(record["dimension"], fu.fit_dimension([3, 6, 12], record["counts"]))
+
+    def test_scaling_region(self):
+        code, text = self.run_main([self.pointsPath, "--scales", "2,4,8,16,32,64,128", "--region"])
+        self.assertEqual(code, 0)
+        record = json.loads(text)
+        fit = sr.fit_scaling_region(record["scales"], record["counts"])
+        self.assertEqual(record["region"], record["scales"][fit.begin:fit.end])
+        self.assertAlmostEqual(record["dimension"], fit.slope)
+        self.assertLess(record["lower"], record["dimension"])
+        self.assertGreater(record["upper"], record["dimension"])
+
+    def test_undefined_dimension(self):
+        for arguments in [["--scales", "4"], ["--scales", "4,8", "--region"]]:
+            code, text = self.run_main([self.seriesPath] + arguments)
+            self.assertEqual(code, 0)
+            self.assertNotIn("NaN", text)
+            record = json.loads(text)
+            self.assertIsNone(record["dimension"])
+        code, text = self.run_main([self.seriesPath, "--scales", "4", "--format", "csv"])
+        self.assertEqual(text.splitlines()[1].split(",")[2], "")
+
+    def test_inputs_of_all_formats(self):
+        code, text = self.run_main([self.pointsPath, self.rawPath, "--dtype", "float32", "--columns", "2"])
+        self.assertEqual(code, 0)
+        records = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual([r["file"] for r in records], [self.pointsPath, self.rawPath])
+        for record in records:
+            self.assertEqual(record["points"], 800)
+            self.assertEqual(record["scales"], [2, 4, 8, 16])
+        self.assertEqual(records[0]["counts"], self.expected_counts(self.points, [2, 4, 8, 16], "points"))
+
+    def test_csv_output_and_failures(self):
+        missing = os.path.join(self.directory.name, "missing.npy")
+        code, text = self.run_main([self.seriesPath, missing, "--format", "csv", "--scales", "4,8"])
+        self.assertEqual(code, 1)
+        lines = text.splitlines()
+        self.assertEqual(lines[0], "file,points,dimension,lower,upper,seconds,scales,counts,region,error")
+        self.assertTrue(lines[1].startswith(self.seriesPath + ",5000,"))
+        self.assertIn(",4 8,", lines[1])
+        self.assertTrue(lines[2].startswith(missing + ",,,,,,"))
+
+    def test_worker_pool(self):
+        stream = io.StringIO()
+        summary = cl.run([self.seriesPath, self.pointsPath] * 2, cl.ResultWriter(stream), {"dimension": 2},
+                         workers=2)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(records), 4)
+        self.assertEqual(summary["files"], 4)
+        self.assertEqual(summary["failed"], 0)
+        self.assertEqual(summary["points"], 2 * (4999 + 800))
+        self.assertGreater(summary["pointsPerSecond"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
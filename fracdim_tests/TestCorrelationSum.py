@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import unittest
+import numpy as np
+
+from fracdim import CorrelationSum as cs
+from fracdim import FractalGenerator as fg
+from fracdim import Kernels as kernels
+
+
+def brute_force_correlation_sum(points, radii, theiler, metric):
+    n = points.shape[0]
+    i, j = np.triu_indices(n, theiler + 1)
+    difference = np.abs(points[i] - points[j])
+    if metric == "chebyshev":
+        distances = difference.max(axis=1)
+    else:
+        distances = np.sqrt((difference * difference).sum(axis=1))
+    return np.asarray([np.count_nonzero(distances < r) for r in radii]) / i.shape[0]
+
+
+class Test_correlationSum(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(10)
+        for dim in [1, 2, 3]:
+            points = rng.random((400, dim))
+            radii = [0.3, 0.01, 0.05, 0.1]
+            for metric in ["chebyshev", "euclidean"]:
+                for theiler in [0, 5]:
+                    expected = brute_force_correlation_sum(points, radii, theiler, metric)
+                    result = cs.correlation_sum(points, radii, theiler=theiler, metric=metric, batchPairs=1000)
+                    self.assertTrue(np.allclose(result, expected))
+
+    def test_batches(self):
+        rng = np.random.default_rng(12)
+        points = rng.random((300, 2))
+        radii = [0.1, 0.6]
+        expected = brute_force_correlation_sum(points, radii, 2, "chebyshev")
+        backend = kernels.get_backend()
+        pairHistogram = kernels.pair_histogram
+        batches = []
+
+        def recorded(histogram, columns, i, j, radii, metric):
+            batches.append(i.shape[0])
+            self.assertTrue(np.all(i != j))
+            pairHistogram(histogram, columns, i, j, radii, metric)
+
+        kernels.set_backend("numpy")
+        kernels.pair_histogram = recorded
+        try:
+            for batchPairs in [1, 7, 1000]:
+                batches = []
+                result = cs.correlation_sum(points, radii, theiler=2, batchPairs=batchPairs)
+                self.assertTrue(np.allclose(result, expected))
+                # Rows of dense cells are split, no batch takes more than a row of a cell
+                self.assertLessEqual(max(batches), max(batchPairs, 300))
+                if batchPairs == 1000:
+                    self.assertLessEqual(max(batches), 1000)
+        finally:
+            kernels.pair_histogram = pairHistogram
+            kernels.set_backend(backend)
+        self.assertTrue(np.allclose(cs.correlation_sum(points, radii, theiler=2), expected))
+
+    def test_prebuilt_grid(self):
+        rng = np.random.default_rng(16)
+        points = rng.random((500, 2))
+        radii = [0.02, 0.1]
+        grid = cs.cell_list(points, 0.25)
+        self.assertTrue(np.allclose(cs.correlation_sum(points, radii, grid=grid),
+                                    brute_force_correlation_sum(points, radii, 0, "chebyshev")))
+        self.assertRaises(Exception, cs.correlation_sum, points, [0.3], grid=grid)
+
+    def test_integer_points(self):
+        rng = np.random.default_rng(25)
+        points = rng.integers(-32000, 32000, (500, 2)).astype(np.int16)
+        radii = [1000, 4000, 20000]
+        for metric in ["chebyshev", "euclidean"]:
+            expected = brute_force_correlation_sum(points.astype(np.float64), radii, 0, metric)
+            self.assertTrue(np.allclose(cs.correlation_sum(points, radii, metric=metric), expected))
+
+    def test_pairs_count(self):
+        self.assertEqual(cs.pairs_count(5), 10)
+        self.assertEqual(cs.pairs_count(5, 2), 3)
+        self.assertEqual(cs.pairs_count(3, 5), 0)
+
+    def test_sierpinski_dimension(self):
+        points = fg.SierpinskiTriangle(seed=3).construct(10000)
+        radii = np.logspace(-2.5, -1.5, 6)
+        sums = cs.correlation_sum(points, radii)
+        self.assertAlmostEqual(cs.correlation_dimension(radii, sums), fg.SierpinskiTriangle.get_dimension(),
+                               delta=0.1)
+
+    def test_sampled_sum(self):
+        rng = np.random.default_rng(11)
+        points = rng.random((2000, 2))
+        radii = [0.05, 0.2]
+        exact = cs.correlation_sum(points, radii, theiler=3)
+        estimates, errors = cs.sampled_correlation_sum(points, radii, 50000, theiler=3, seed=1)
+        self.assertTrue(np.all(np.abs(estimates - exact) < 5 * errors))
+
+    def test_invalid_metric(self):
+        self.assertRaises(Exception, cs.correlation_sum, np.zeros((3, 1)), [1.0], metric="manhattan")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import CountCache as cc
+
+
+class Test_CountCache(unittest.TestCase):
+    rng = np.random.default_rng(19)
+    points = rng.random((1000, 2))
+    globalCell = fu.MultiCell(2, np.zeros(2), np.ones(2))
+    scales = [2, 4, 8, 16]
+
+    def expected_counts(self, points, globalCell, mode="points"):
+        return [fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=s, mode=mode).calculate(points)
+                for s in self.scales]
+
+    def test_memory_tier(self):
+        cache = cc.CountCache()
+        for mode in ["points", "lines"]:
+            first = cache.box_counts(self.points, self.globalCell, self.scales, mode)
+            second = cache.box_counts(self.points, self.globalCell, self.scales, mode)
+            self.assertEqual(list(first), self.expected_counts(self.points, self.globalCell, mode))
+            np.testing.assert_array_equal(first, second)
+        self.assertEqual(cache.stats(), (2, 2))
+
+    def test_key_depends_on_data_and_grid(self):
+        key = cc.CountCache.key(self.points, self.globalCell, self.scales)
+        self.assertEqual(key, cc.CountCache.key(self.points.copy(), self.globalCell, self.scales))
+        changed = self.points.copy()
+        changed[10, 1] += 1e-12
+        self.assertNotEqual(key, cc.CountCache.key(changed, self.globalCell, self.scales))
+        self.assertNotEqual(key, cc.CountCache.key(self.points.astype(np.float32), self.globalCell, self.scales))
+        self.assertNotEqual(key, cc.CountCache.key(self.points, self.globalCell, [2, 4, 8]))
+        self.assertNotEqual(key, cc.CountCache.key(self.points, self.globalCell, self.scales, "lines"))
+        self.assertNotEqual(key, cc.CountCache.key(self.points, None, self.scales))
+        self.assertNotEqual(key, cc.CountCache.key(self.points, fu.MultiCell(2, np.zeros(2), np.full(2, 2.0)),
+                                                   self.scales))
+
+    def test_memory_eviction(self):
+        cache = cc.CountCache(memoryEntries=2)
+        for k in range(0, 3):
+            cache.put("key%d" % k, [k])
+        self.assertIsNone(cache.get("key0"))
+        self.assertEqual(list(cache.get("key2")), [2])
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = cc.CountCache(directory)
+            expected = cache.series_counts(self.points[:, 0], 3, self.scales, lag=2)
+
+            # New cache object reads curve stored by the previous one
+            cache = cc.CountCache(directory)
+            np.testing.assert_array_equal(cache.series_counts(self.points[:, 0], 3, self.scales, lag=2), expected)
+            self.assertEqual(cache.stats(), (1, 0))
+
+            embedding = fu.time_delay_embedding(self.points[:, 0], 3, 2)
+            self.assertEqual(list(expected), self.expected_counts(embedding, fu.bounding_cell(embedding)))
+
+            cache.clear()
+            self.assertEqual(os.listdir(directory), [])
+            self.assertIsNone(cache.get(cc.CountCache.key(self.points[:, 0], None, self.scales, "points", 3, 2)))
+
+    def test_disk_eviction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = cc.CountCache(directory, diskLimitBytes=1000)
+            for k in range(0, 20):
+                cache.put("key%02d" % k, np.arange(10))
+            files = os.listdir(directory)
+            self.assertLessEqual(sum(os.path.getsize(os.path.join(directory, f)) for f in files), 1000)
+            self.assertIn("key19.npy", files)
+            self.assertNotIn("key00.npy", files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,70 @@ import numpy as np
 
 import fracdim
 #from fracdim import FracdimUtils
+from fracdim import FractalGenerator
+
+
+def reference_lines_cells(points, globalCell, cellsPerAxis):
+    """
+    Former loop-based implementation of BlocksCounter "lines" mode, kept as reference
+    :return: set of visited cells indices tuples
+    """
+    dim = globalCell.dim()
+    cellMin = globalCell.get_min()
+    cellMax = globalCell.get_max()
+
+    def get_point_indexes(point):
+        indexes = []
+        for i in range(0, dim):
+            index = int((point[i] - cellMin[i]) / (cellMax[i] - cellMin[i]) * cellsPerAxis)
+            if index == cellsPerAxis:
+                index = cellsPerAxis - 1
+            indexes.append(index)
+        return tuple(indexes)
+
+    visited = {get_point_indexes(points[0, :])}
+    middle_point = np.ndarray(dim)
+    begin_indexes = get_point_indexes(points[0, :])
+    for pointIndex in range(1, points.shape[0]):
+        end_indexes = get_point_indexes(points[pointIndex, :])
+        visited.add(end_indexes)
+        for d in range(0, dim):
+            begin = min(begin_indexes[d], end_indexes[d]) + 1
+            end = max(begin_indexes[d], end_indexes[d])
+            for i in range(begin, end + 1):
+                fracdim.FracdimUtils.get_point_on_line(
+                    lineBegin=points[pointIndex - 1, :], lineEnd=points[pointIndex, :], axis=d,
+                    axisValue=cellMin[d] + (cellMax[d] - cellMin[d]) * (i / cellsPerAxis),
+                    targetPoint=middle_point)
+                middle_point[d] -= (cellMax[d] - cellMin[d]) / cellsPerAxis * 0.1
+                visited.add(get_point_indexes(middle_point))
+        begin_indexes = end_indexes
+    return visited
+
+
+def split_lines_cells(points, globalCell, cellsPerAxis):
+    """
+    Cells of middle points of segment pieces between neighbour crossings with grid planes,
+    exact when no segment passes through a grid corner
+    :return: set of visited cells indices tuples
+    """
+    cellMin = np.asarray(globalCell.get_min(), dtype=float)
+    cellMax = np.asarray(globalCell.get_max(), dtype=float)
+    planes = np.linspace(0, 1, cellsPerAxis + 1)
+    visited = set()
+    for i in range(1, points.shape[0]):
+        begin = (points[i - 1] - cellMin) / (cellMax - cellMin)
+        end = (points[i] - cellMin) / (cellMax - cellMin)
+        t = [0.0, 1.0]
+        for d in range(0, points.shape[1]):
+            if begin[d] != end[d]:
+                t.extend((planes - begin[d]) / (end[d] - begin[d]))
+        t = np.unique(np.clip(t, 0.0, 1.0))
+        middles = (t[1:] + t[:-1])[:, np.newaxis] * 0.5
+        pieces = points[i - 1] + (points[i] - points[i - 1]) * middles
+        indexes = fracdim.FracdimUtils.points_to_cell_indexes(pieces, globalCell, cellsPerAxis)
+        visited.update(map(tuple, indexes))
+    return visited
 
 
 class Test_rowToPoints(unittest.TestCase):
@@ -31,6 +95,52 @@ class Test_rowToPoints(unittest.TestCase):
         self.assertEqual(a[-1,-1], testRow[-1])
 
 
+    def test_lag(self):
+        testRow = [1, 2, 3, 4, 5, 6, 7]
+        a = fracdim.FracdimUtils.row_to_points(testRow, 3, lag=2)
+        self.assertEqual(a.shape, (3, 3))
+        self.assertEqual(list(a[0, :]), [1, 3, 5])
+        self.assertEqual(list(a[-1, :]), [3, 5, 7])
+
+    def test_too_short_row(self):
+        self.assertEqual(fracdim.FracdimUtils.row_to_points([1, 2], 3), 0)
+
+    def test_row_type_is_kept(self):
+        for dtype in [np.float32, np.int16]:
+            a = fracdim.FracdimUtils.row_to_points(np.arange(10, dtype=dtype), 3)
+            self.assertEqual(a.dtype, dtype)
+            self.assertEqual(list(a[-1, :]), [7, 8, 9])
+
+
+class Test_timeDelayEmbedding(unittest.TestCase):
+    def test_view_without_copy(self):
+        row = np.arange(20.0)
+        a = fracdim.FracdimUtils.time_delay_embedding(row, 4, lag=3)
+        self.assertEqual(a.shape, (11, 4))
+        self.assertTrue(np.shares_memory(a, row))
+        self.assertFalse(a.flags.writeable)
+        self.assertEqual(list(a[2, :]), [2, 5, 8, 11])
+        self.assertTrue(np.array_equal(a, fracdim.FracdimUtils.row_to_points(row, 4, lag=3)))
+
+    def test_short_row(self):
+        a = fracdim.FracdimUtils.time_delay_embedding(np.arange(3.0), 4)
+        self.assertEqual(a.shape, (0, 4))
+
+    def test_invalid_parameters(self):
+        self.assertRaises(Exception, fracdim.FracdimUtils.time_delay_embedding, np.arange(3.0), 0)
+        self.assertRaises(Exception, fracdim.FracdimUtils.time_delay_embedding, np.arange(3.0), 2, 0)
+
+    def test_blocks_counter_accepts_view(self):
+        rng = np.random.default_rng(5)
+        row = rng.random(200)
+        view = fracdim.FracdimUtils.time_delay_embedding(row, 2, lag=2)
+        copy = fracdim.FracdimUtils.row_to_points(row, 2, lag=2)
+        globalCell = fracdim.FracdimUtils.MultiCell(2, np.zeros(2), np.ones(2))
+        for mode in ["points", "lines"]:
+            a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=8, globalCell=globalCell, mode=mode)
+            self.assertEqual(a.calculate(view), a.calculate(copy))
+
+
 class Test_getPointOnLine(unittest.TestCase):
     def test_1d_trivial(self):
         p1 = np.asarray([0])
@@ -112,6 +222,47 @@ class Test_MultiCell(unittest.TestCase):
         self.assertEqual(a.get_min()[2], -1)
         self.assertEqual(a.get_max()[2], 4)
 
+    def test_points_checking(self):
+        a = fracdim.FracdimUtils.MultiCell(3, np.asarray([1, 3, 1]), np.asarray([3, 1, 3]))
+        points = np.asarray([[2, 2, 2], [2, 3.001, 2], [0.999, 2, 2], [3, 3, 3]])
+        np.testing.assert_array_equal(a.check_points(points), [True, False, False, True])
+        np.testing.assert_array_equal(a.check_points(points[:, :2]), [True, False, False, True])
+        self.assertEqual(list(a.check_points(points)), [a.check_point(p) for p in points])
+        self.assertRaises(Exception, a.check_points, np.zeros((2, 4)))
+
+    def test_no_instance_dict(self):
+        a = fracdim.FracdimUtils.MultiCell(2, np.asarray([0, 0]), np.asarray([1, 1]))
+        self.assertFalse(hasattr(a, "__dict__"))
+
+
+class Test_MultiCellArray(unittest.TestCase):
+    cells = fracdim.FracdimUtils.MultiCellArray([[0, 0], [1, 1], [5, 0]], [[1, 1], [3, 2], [4, 1]])
+
+    def test_creation(self):
+        self.assertEqual(len(self.cells), 3)
+        self.assertEqual(self.cells.dim(), 2)
+        np.testing.assert_array_equal(self.cells.get_min()[2], [4, 0])
+        np.testing.assert_array_equal(self.cells.volumes(), [1, 2, 1])
+        cell = self.cells.get_cell(1)
+        np.testing.assert_array_equal(cell.get_max(), [3, 2])
+
+        same = fracdim.FracdimUtils.MultiCellArray.from_cells([self.cells.get_cell(k) for k in range(0, 3)])
+        np.testing.assert_array_equal(same.get_min(), self.cells.get_min())
+        self.assertRaises(Exception, fracdim.FracdimUtils.MultiCellArray, np.zeros((2, 2)), np.zeros((3, 2)))
+
+    def test_points_checking(self):
+        rng = np.random.default_rng(17)
+        points = rng.random((200, 2)) * 6 - 0.5
+        mask = self.cells.check_points(points)
+        for k in range(0, 3):
+            np.testing.assert_array_equal(mask[:, k], self.cells.get_cell(k).check_points(points))
+
+    def test_overlaps(self):
+        other = fracdim.FracdimUtils.MultiCellArray([[0.5, 0.5], [3, 2], [10, 10]], [[0.6, 0.6], [4, 3], [11, 11]])
+        np.testing.assert_array_equal(self.cells.overlaps(other), [[True, False, False],
+                                                                   [False, True, False],
+                                                                   [False, False, False]])
+
 
 class Test_BlocksCounter(unittest.TestCase):
     p1 = np.asarray([0, 0, 0])
@@ -197,6 +348,168 @@ class Test_BlocksCounter(unittest.TestCase):
 
         self.assertEqual(a.calculate(points), count)
 
+    def test_random_points_match_naive_count_mode_is_point(self):
+        count = 7
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=count, globalCell=self.globalCell)
+
+        rng = np.random.default_rng(1)
+        points = rng.random((500, 3))
+        points[:10, :] = 1.0
+        points[10:20, :] = 0.0
+
+        visited = set()
+        for p in points:
+            visited.add(tuple(min(int(x * count), count - 1) for x in p))
+
+        self.assertEqual(a.calculate(points), len(visited))
+
+    def test_boundary_points_match_per_point_formula(self):
+        def naive_count(points, globalCell, count):
+            cellMin = globalCell.get_min()
+            cellMax = globalCell.get_max()
+            return len({tuple(min(int((p[i] - cellMin[i]) / (cellMax[i] - cellMin[i]) * count), count - 1)
+                              for i in range(0, len(p))) for p in points})
+
+        # Koch vertices and integer samples often lie exactly on cell boundaries
+        koch = FractalGenerator.KochSnowflake().construct(6)
+        kochCell = fracdim.FracdimUtils.bounding_cell(koch)
+        rng = np.random.default_rng(15)
+        series = fracdim.FracdimUtils.row_to_points(rng.integers(0, 1000, 20000).astype(float), 2)
+        seriesCell = fracdim.FracdimUtils.bounding_cell(series)
+        for points, globalCell, counts in [(koch, kochCell, [6, 12, 81]), (series, seriesCell, [7, 333, 999])]:
+            for count in counts:
+                for storage in ["dense", "sparse"]:
+                    a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=count, globalCell=globalCell,
+                                                           storage=storage)
+                    self.assertEqual(a.calculate(points), naive_count(points, globalCell, count))
+        self.assertEqual([fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=n, globalCell=kochCell).calculate(koch)
+                          for n in [6, 12, 81]], [26, 65, 842])
+
+    def test_cells_per_axis_reset(self):
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=10, globalCell=self.globalCell)
+        a.set_cells_per_axis(2)
+        points = np.ndarray(6).reshape((2, 3))
+        points[0, :] = [0.1, 0.1, 0.9]
+        points[1, :] = [0.9, 0.9, 0.1]
+        self.assertEqual(a.calculate(points), 2)
+
+    def test_sparse_storage_matches_dense(self):
+        rng = np.random.default_rng(2)
+        points = rng.random((300, 3))
+        for mode in ["points", "lines"]:
+            dense = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=9, globalCell=self.globalCell,
+                                                       mode=mode, storage="dense")
+            sparse = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=9, globalCell=self.globalCell,
+                                                        mode=mode, storage="sparse")
+            self.assertFalse(dense.is_sparse())
+            self.assertTrue(sparse.is_sparse())
+            self.assertEqual(sparse.calculate(points), dense.calculate(points))
+
+    def test_auto_storage_for_huge_grid(self):
+        dim = 6
+        globalCell = fracdim.FracdimUtils.MultiCell(dim, np.zeros(dim), np.ones(dim))
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=100, globalCell=globalCell)
+        self.assertTrue(a.is_sparse())
+
+        points = np.ndarray(2 * dim).reshape((2, dim))
+        points[0, :] = 0.5
+        points[1, :] = 0.501
+        self.assertEqual(a.calculate(points), 1)
+        points[1, :] = 0.7
+        self.assertEqual(a.calculate(points), 2)
+
+        # Grid volume does not fit int64 linear indices
+        dim = 12
+        globalCell = fracdim.FracdimUtils.MultiCell(dim, np.zeros(dim), np.ones(dim))
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=100, globalCell=globalCell)
+        points = np.ndarray(3 * dim).reshape((3, dim))
+        points[0, :] = 0.5
+        points[1, :] = 0.7
+        points[2, :] = 0.7
+        self.assertEqual(a.calculate(points), 2)
+
+    def test_invalid_storage(self):
+        self.assertRaises(Exception, fracdim.FracdimUtils.BlocksCounter, storage="compressed")
+
+    def test_dense_storage_is_byte_per_cell(self):
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=10, globalCell=self.globalCell, stats=True)
+        self.assertFalse(a.is_sparse())
+        self.assertEqual(a.get_stats().allocatedBytes, 1000)
+
+        # Grid of 2**27 cells fits default limit only with byte flags
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=2**9, globalCell=self.globalCell)
+        self.assertFalse(a.is_sparse())
+
+    def test_float32_and_integer_points(self):
+        rng = np.random.default_rng(25)
+        samples = np.cumsum(rng.integers(-2000, 2001, (3000, 3)), axis=0)
+        samples = (samples * (32000 / np.abs(samples).max())).astype(np.int16)
+        globalCell = fracdim.FracdimUtils.bounding_cell(samples)
+        for points in [samples, samples.astype(np.float32)]:
+            reference = points.astype(np.float64)
+            for mode in ["points", "lines"]:
+                for storage in ["dense", "sparse"]:
+                    for cellsPerAxis in [7, 64]:
+                        a = fracdim.FracdimUtils.BlocksCounter(globalCell=globalCell, cellsPerAxis=cellsPerAxis,
+                                                               mode=mode, storage=storage)
+                        self.assertEqual(a.calculate(points), a.calculate(reference))
+
+    def test_inferred_cell_matches_bounding_cell(self):
+        rng = np.random.default_rng(3)
+        points = rng.random((500, 2)) * [4, 1] + [-2, 3]
+        for mode in ["points", "lines"]:
+            inferred = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=16, mode=mode)
+            given = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=16, mode=mode,
+                                                       globalCell=fracdim.FracdimUtils.bounding_cell(points))
+            self.assertEqual(inferred.calculate(points), given.calculate(points))
+            # Cell is inferred again for every dataset
+            given.set_size(fracdim.FracdimUtils.bounding_cell(points[:10]))
+            self.assertEqual(inferred.calculate(points[:10] * 100), given.calculate(points[:10]))
+
+    def test_cells_per_axis_before_inferred_cell(self):
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=4)
+        a.set_cells_per_axis(8)
+        self.assertIsNone(a.get_size())
+        points = np.asarray([[0.0, 0.0], [0.2, 0.0], [1.0, 1.0]])
+        self.assertEqual(a.calculate(points), 3)
+        a.set_cells_per_axis(2)
+        self.assertEqual(a.calculate(points), 2)
+
+    def test_empty_dataset(self):
+        for mode in ["points", "lines"]:
+            a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=4, mode=mode)
+            self.assertEqual(a.calculate(np.empty((0, 2))), 0)
+            self.assertEqual(a.occupied_cells(np.empty((0, 2))).shape[0], 0)
+            self.assertIsNone(a.get_size())
+            self.assertEqual(a.calculate(np.asarray([[0.0, 0.0], [1.0, 1.0]])), 2 if mode == "points" else 7)
+            self.assertEqual(a.calculate(np.empty((0, 2))), 0)
+
+    def test_inferred_cube_cell(self):
+        points = np.asarray([[0.0, 0.0], [4.0, 1.0]])
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=4, cube=True)
+        self.assertEqual(a.calculate(points), 2)
+        np.testing.assert_array_equal(a.get_size().get_max(), [4.0, 4.0])
+
+    def test_outside_points(self):
+        points = np.asarray([[0.5, 0.5, 0.5], [1.5, 0.5, 0.5], [-0.01, 0.5, 0.5]])
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=10, globalCell=self.globalCell)
+        self.assertRaises(Exception, a.calculate, points)
+        self.assertEqual(a.outside_count(), 2)
+
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=10, globalCell=self.globalCell, outside="drop")
+        self.assertEqual(a.calculate(points), 1)
+        self.assertEqual(a.outside_count(), 2)
+        self.assertEqual(a.calculate(points[:1]), 1)
+        self.assertEqual(a.outside_count(), 0)
+
+    def test_outside_lines_are_clipped(self):
+        globalCell = fracdim.FracdimUtils.MultiCell(2, np.asarray([0, 0]), np.asarray([10, 10]))
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=10, globalCell=globalCell, mode="lines",
+                                               outside="drop")
+        points = np.asarray([[-5.5, 0.5], [5.5, 0.5]])
+        self.assertEqual(a.calculate(points), 6)
+        self.assertEqual(a.outside_count(), 1)
+
     # Now lets fracdim_tests mode="lines"
 
     def test_1d_test_boundaries_mode_is_lines(self):
@@ -259,5 +572,178 @@ class Test_BlocksCounter(unittest.TestCase):
         self.assertEqual(a.calculate(points), 2*count+1)
 
 
+class Test_insertCells(unittest.TestCase):
+    def test_matches_merge(self):
+        rng = np.random.default_rng(7)
+        cells = np.empty(0, dtype=np.int64)
+        for size in [0, 10, 1000, 1, 300]:
+            newCells = np.unique(rng.integers(0, 2000, size))
+            expected = fracdim.FracdimUtils.merge_cells([cells, newCells])
+            cells = fracdim.FracdimUtils.insert_cells(cells, newCells)
+            np.testing.assert_array_equal(cells, expected)
+        self.assertIs(fracdim.FracdimUtils.insert_cells(cells, cells[::3]), cells)
+
+    def test_rows_of_indices(self):
+        first = np.asarray([[0, 1], [2, 2]])
+        second = np.asarray([[0, 0], [2, 2]])
+        np.testing.assert_array_equal(fracdim.FracdimUtils.insert_cells(first, second),
+                                      [[0, 0], [0, 1], [2, 2]])
+
+
+class Test_CounterStats(unittest.TestCase):
+    points = FractalGenerator.KochSnowflake().construct(5)
+    globalCell = fracdim.FracdimUtils.bounding_cell(points)
+
+    def test_disabled_by_default(self):
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=10, globalCell=self.globalCell)
+        a.calculate(self.points)
+        self.assertIsNone(a.get_stats())
+
+    def test_points_mode(self):
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=10, globalCell=self.globalCell, stats=True)
+        count = a.calculate(self.points)
+        a.calculate(self.points)
+        stats = a.get_stats()
+        self.assertEqual(stats.calls, 2)
+        self.assertEqual(stats.points, 2 * self.points.shape[0])
+        self.assertEqual(stats.cellsVisited, 2 * self.points.shape[0])
+        self.assertEqual(stats.cellsOccupied, 2 * count)
+        self.assertEqual(stats.segments, 0)
+        self.assertGreaterEqual(stats.allocatedBytes, 100 * 8)
+        self.assertEqual(sorted(stats.phases), ["conversion", "counting", "quantization"])
+        self.assertGreater(stats.total_time(), 0)
+
+    def test_lines_mode_with_callback(self):
+        reports = []
+        a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=10, mode="lines", storage="sparse",
+                                               callback=lambda stats: reports.append(stats.as_dict()))
+        a.occupied_cells(self.points)
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(reports[0]["segments"], self.points.shape[0] - 1)
+        self.assertGreater(reports[0]["cellsVisited"], self.points.shape[0])
+        self.assertIn("bounding", reports[0]["phases"])
+        self.assertIn("traversal", reports[0]["phases"])
+
+    def test_shared_stats_and_logging(self):
+        stats = fracdim.FracdimUtils.CounterStats()
+        for s in [4, 8]:
+            a = fracdim.FracdimUtils.BlocksCounter(cellsPerAxis=s, globalCell=self.globalCell, stats=stats,
+                                                   callback=fracdim.FracdimUtils.log_stats)
+            with self.assertLogs("fracdim", level="DEBUG") as logs:
+                a.calculate(self.points)
+            self.assertIn("CounterStats(calls=", logs.output[0])
+        self.assertEqual(stats.calls, 2)
+        stats.reset()
+        self.assertEqual(stats.calls, 0)
+
+
+class Test_MultiGrid(unittest.TestCase):
+    rng = np.random.default_rng(15)
+    points = rng.random((2000, 3))
+    globalCell = fracdim.FracdimUtils.MultiCell(3, np.zeros(3), np.ones(3))
+
+    def build(self, cellsPerAxis):
+        grid = fracdim.FracdimUtils.MultiGrid()
+        grid.build(self.globalCell, cellsPerAxis, self.points)
+        return grid
+
+    def test_csr_layout(self):
+        grid = self.build(8)
+        cells = grid.get_cells()
+        offsets = grid.get_offsets()
+        self.assertTrue(np.all(np.diff(cells) > 0))
+        self.assertEqual(offsets[-1], self.points.shape[0])
+        self.assertEqual(sorted(grid.get_permutation()), list(range(0, self.points.shape[0])))
+        for k in range(0, cells.shape[0]):
+            indexes = grid.point_cells(self.points[grid.get_permutation()[offsets[k]:offsets[k + 1]]])
+            self.assertTrue(np.all(grid.linear_indexes(indexes) == cells[k]))
+
+    def test_cell_points(self):
+        grid = self.build(5)
+        indexes = fracdim.FracdimUtils.points_to_cell_indexes(self.points, self.globalCell, 5)
+        for cell in [[0, 0, 0], [4, 2, 1], [2, 2, 2]]:
+            expected = np.nonzero(np.all(indexes == cell, axis=1))[0]
+            self.assertEqual(sorted(grid.cell_points(cell)), list(expected))
+        self.assertEqual(grid.cell_points([5, 0, 0]).shape[0], 0)
+
+        cell = grid.get_cell([4, 2, 1])
+        np.testing.assert_allclose(cell.get_min(), [0.8, 0.4, 0.2])
+        np.testing.assert_allclose(cell.get_max(), [1.0, 0.6, 0.4])
+
+    def test_neighbours(self):
+        grid = fracdim.FracdimUtils.MultiGrid()
+        points = np.asarray([[0.1, 0.1], [0.3, 0.1], [0.9, 0.9], [0.1, 0.3]])
+        grid.build(fracdim.FracdimUtils.MultiCell(2, np.zeros(2), np.ones(2)), 5, points)
+        neighbours = grid.get_cell_indexes()[grid.neighbours([0, 0])]
+        self.assertEqual(sorted(map(tuple, neighbours.tolist())), [(0, 0), (0, 1), (1, 0)])
+        self.assertEqual(grid.neighbours([2, 2]).shape[0], 0)
+
+        first, second = grid.shifted_cells([1, 0])
+        np.testing.assert_array_equal(grid.get_cell_indexes()[second] - grid.get_cell_indexes()[first],
+                                      [[1, 0]])
+
+    def test_blocks_counter_reuses_grid(self):
+        grid = self.build(24)
+        for s in [1, 2, 3, 8, 12, 24]:
+            counter = fracdim.FracdimUtils.BlocksCounter(globalCell=self.globalCell, cellsPerAxis=s)
+            self.assertEqual(counter.calculate_grid(grid), counter.calculate(self.points))
+        counter = fracdim.FracdimUtils.BlocksCounter(globalCell=self.globalCell, cellsPerAxis=5)
+        self.assertRaises(Exception, counter.calculate_grid, grid)
+
+    def test_points_out_of_grid(self):
+        grid = fracdim.FracdimUtils.MultiGrid()
+        self.assertRaises(Exception, grid.build, self.globalCell, 4, self.points + 1)
+
+
+class Test_polylineCellIndexes(unittest.TestCase):
+    def cells(self, points, globalCell, cellsPerAxis):
+        indexes = fracdim.FracdimUtils.polyline_cell_indexes(points, globalCell, cellsPerAxis)
+        vertexIndexes = fracdim.FracdimUtils.points_to_cell_indexes(points, globalCell, cellsPerAxis)
+        np.testing.assert_array_equal(
+            fracdim.FracdimUtils.polyline_cell_indexes(points, globalCell, cellsPerAxis, vertexIndexes), indexes)
+        return set(map(tuple, indexes))
+
+    def test_monotone_polylines_match_reference(self):
+        # When all coordinates grow the former implementation visits every cell
+        rng = np.random.default_rng(6)
+        for dim in [1, 2, 3]:
+            globalCell = fracdim.FracdimUtils.MultiCell(dim, np.zeros(dim), np.ones(dim))
+            for trial in range(0, 20):
+                points = np.cumsum(rng.random((10, dim)), axis=0)
+                points /= points[-1, :]
+                cellsPerAxis = int(rng.integers(1, 30))
+                self.assertEqual(self.cells(points, globalCell, cellsPerAxis),
+                                 reference_lines_cells(points, globalCell, cellsPerAxis))
+
+    def test_random_polylines_cover_reference(self):
+        # Former implementation skips cells that are entered and left through lower faces
+        rng = np.random.default_rng(7)
+        for dim in [1, 2, 3, 4]:
+            globalCell = fracdim.FracdimUtils.MultiCell(dim, np.zeros(dim), np.ones(dim))
+            for trial in range(0, 20):
+                points = rng.random((int(rng.integers(1, 12)), dim))
+                cellsPerAxis = int(rng.integers(1, 12))
+                cells = self.cells(points, globalCell, cellsPerAxis)
+                reference = reference_lines_cells(points, globalCell, cellsPerAxis)
+                self.assertTrue(reference <= cells)
+                self.assertEqual(cells, reference | split_lines_cells(points, globalCell, cellsPerAxis))
+
+    def test_koch_snowflake_covers_reference(self):
+        points = FractalGenerator.KochSnowflake().construct(5)
+        globalCell = fracdim.FracdimUtils.MultiCell(2, np.asarray([-0.1, -0.4]), np.asarray([1.1, 0.9]))
+        for cellsPerAxis in [10, 50, 200]:
+            cells = self.cells(points, globalCell, cellsPerAxis)
+            reference = reference_lines_cells(points, globalCell, cellsPerAxis)
+            self.assertTrue(reference <= cells)
+            self.assertEqual(cells, reference | split_lines_cells(points, globalCell, cellsPerAxis))
+
+    def test_diagonal_through_corners(self):
+        globalCell = fracdim.FracdimUtils.MultiCell(2, np.zeros(2), np.ones(2) * 4)
+        points = np.asarray([[0.5, 0.5], [3.5, 3.5]])
+        # Ties are resolved in axis order, so every corner adds one cell
+        self.assertEqual(self.cells(points, globalCell, 4),
+                         {(0, 0), (1, 0), (1, 1), (2, 1), (2, 2), (3, 2), (3, 3)})
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,9 +1,51 @@
 #!/usr/bin/env python3
 
+import math
+import os
+import tempfile
 import unittest
 import numpy as np
 
 from fracdim import FractalGenerator as fg
+from fracdim import FracdimUtils as fu
+
+
+def reference_koch_snowflake(depth):
+    """
+    Former recursive KochSnowflake construction, kept as reference
+    """
+    points = []
+
+    def add_line(currentDepth, p1, p2):
+        if currentDepth == depth:
+            return
+        pl = p1 * 2.0/3.0 + p2 * 1.0/3.0
+        pr = p1 * 1.0/3.0 + p2 * 2.0/3.0
+        pc = p1 * 0.5 + p2 * 0.5
+        vs = (p2-p1) / 3
+        v = np.ndarray(shape=[2])
+        v[0] = vs[1] * math.sqrt(3) / 2
+        v[1] = -vs[0] * math.sqrt(3) / 2
+        pc += v
+        add_line(currentDepth+1, p1, pl)
+        points.append(pl)
+        add_line(currentDepth+1, pl, pc)
+        points.append(pc)
+        add_line(currentDepth+1, pc, pr)
+        points.append(pr)
+        add_line(currentDepth+1, pr, p2)
+
+    p1 = np.asarray([0, 0])
+    p2 = np.asarray([1, 0])
+    p3 = np.asarray([0.5, math.sqrt(3) / 2])
+    points.append(p1)
+    add_line(1, p1, p2)
+    points.append(p2)
+    add_line(1, p2, p3)
+    points.append(p3)
+    add_line(1, p3, p1)
+    points.append(p1)
+    return np.asarray(points, dtype=float)
 
 
 class Test_KochSnowflake(unittest.TestCase):
@@ -12,3 +54,108 @@ class Test_KochSnowflake(unittest.TestCase):
         p = a.construct(3)
         a = fg.KochSnowflake()
         pp = a.construct(3)
+
+    def test_matches_recursive_construction(self):
+        for depth in range(1, 7):
+            p = fg.KochSnowflake().construct(depth)
+            self.assertEqual(p.shape, (fg.KochSnowflake.get_points_count(depth), 2))
+            self.assertTrue(np.array_equal(p, reference_koch_snowflake(depth)))
+
+    def test_blocks(self):
+        blockSegments = fg.KochSnowflake.BLOCK_SEGMENTS
+        fg.KochSnowflake.BLOCK_SEGMENTS = 5
+        try:
+            for depth in [1, 2, 6]:
+                self.assertTrue(np.array_equal(fg.KochSnowflake().construct(depth), reference_koch_snowflake(depth)))
+        finally:
+            fg.KochSnowflake.BLOCK_SEGMENTS = blockSegments
+
+    def test_float32(self):
+        p = fg.KochSnowflake().construct(6, dtype=np.float32)
+        self.assertEqual(p.dtype, np.float32)
+        self.assertTrue(np.allclose(p, reference_koch_snowflake(6), atol=1e-6))
+
+    def test_memmap_output(self):
+        depth = 5
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "koch.f64")
+            out = np.memmap(path, dtype=np.float64, mode="w+",
+                            shape=(fg.KochSnowflake.get_points_count(depth), 2))
+            p = fg.KochSnowflake().construct(depth, out=out)
+            self.assertIs(p, out)
+            out.flush()
+            self.assertTrue(np.array_equal(np.fromfile(path).reshape((-1, 2)), reference_koch_snowflake(depth)))
+            del p, out
+
+    def test_invalid_arguments(self):
+        self.assertRaises(Exception, fg.KochSnowflake().construct, 0)
+        self.assertRaises(Exception, fg.KochSnowflake().construct, 3, out=np.ndarray((5, 2)))
+
+
+def box_dimension(points, scales):
+    points = np.asarray(points).reshape((points.shape[0], -1))
+    globalCell = fu.bounding_cell(points)
+    counts, dimension = fu.box_counting(points, globalCell, scales)
+    return dimension
+
+
+class Test_ReferenceFractals(unittest.TestCase):
+    def test_cantor_set(self):
+        p = fg.CantorSet().construct(12)
+        self.assertEqual(p.shape, (2**12, 1))
+        globalCell = fu.MultiCell(1, -np.ones(1) * 1e-9, np.ones(1) * (1 - 1e-9))
+        counts, dimension = fu.box_counting(p, globalCell, [3**i for i in range(2, 8)])
+        self.assertAlmostEqual(dimension, fg.CantorSet.get_dimension(), delta=0.02)
+
+    def test_sierpinski_triangle(self):
+        p = fg.SierpinskiTriangle(seed=1).construct(200000)
+        self.assertEqual(p.shape, (200000, 2))
+        self.assertTrue(np.array_equal(p, fg.SierpinskiTriangle(seed=1).construct(200000)))
+        self.assertAlmostEqual(box_dimension(p, [2**i for i in range(2, 7)]),
+                               fg.SierpinskiTriangle.get_dimension(), delta=0.05)
+
+    def test_henon_attractor(self):
+        p = fg.HenonAttractor(trajectories=1000, seed=1).construct(200001, dtype=np.float32)
+        self.assertEqual(p.shape, (200001, 2))
+        self.assertEqual(p.dtype, np.float32)
+        self.assertAlmostEqual(box_dimension(p, [2**i for i in range(3, 8)]),
+                               fg.HenonAttractor.get_dimension(), delta=0.1)
+
+    def test_lorenz_attractor(self):
+        p = fg.LorenzAttractor(trajectories=1000, seed=1).construct(100000)
+        self.assertEqual(p.shape, (100000, 3))
+        self.assertTrue(np.all(np.isfinite(p)))
+        self.assertAlmostEqual(box_dimension(p, [2**i for i in range(2, 6)]),
+                               fg.LorenzAttractor.get_dimension(), delta=0.2)
+
+    def test_fractional_brownian_motion(self):
+        generator = fg.FractionalBrownianMotion(hurst=0.3, seed=2)
+        p = generator.construct(2**16)
+        self.assertEqual(p.shape, (2**16,))
+        self.assertEqual(p[0], 0)
+        graph = np.column_stack((np.linspace(0, 1, p.shape[0]), p))
+        self.assertAlmostEqual(box_dimension(graph, [2**i for i in range(3, 8)]),
+                               generator.get_dimension(), delta=0.15)
+        self.assertRaises(Exception, fg.FractionalBrownianMotion, 1.0)
+
+    def test_fractional_brownian_motion_covariance(self):
+        hurst = 0.7
+        generator = fg.FractionalBrownianMotion(hurst=hurst, seed=3)
+        # 18 increments are generated as 20 and truncated
+        increments = np.asarray([np.diff(generator.construct(19)) for i in range(0, 5000)]) * 18**hurst
+        for k in range(0, 4):
+            expected = 0.5 * ((k + 1)**(2 * hurst) - 2 * k**(2 * hurst) + abs(k - 1)**(2 * hurst))
+            self.assertAlmostEqual(np.mean(increments[:, 0] * increments[:, k]), expected, delta=0.05)
+        np.testing.assert_allclose(increments.var(axis=0), 1.0, atol=0.08)
+
+    def test_fft_size(self):
+        self.assertEqual([fg._fft_size(n) for n in [1, 7, 97, 1025, 9999999, 10**7]],
+                         [1, 8, 100, 1080, 10**7, 10**7])
+
+    def test_weierstrass_function(self):
+        generator = fg.WeierstrassFunction(a=0.6, b=3.0)
+        p = generator.construct(2**16)
+        graph = np.column_stack((np.linspace(0, 1, p.shape[0]), p))
+        self.assertAlmostEqual(box_dimension(graph, [2**i for i in range(3, 8)]),
+                               generator.get_dimension(), delta=0.15)
+        self.assertRaises(Exception, fg.WeierstrassFunction, 0.2, 3.0)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import unittest
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import Kernels as kernels
+from fracdim import CorrelationSum as cs
+from fracdim import FractalGenerator as fg
+
+
+def run_with_backend(backend, function, *args):
+    previous = kernels.get_backend()
+    kernels.set_backend(backend)
+    try:
+        return function(*args)
+    finally:
+        kernels.set_backend(previous)
+
+
+class Test_quantize(unittest.TestCase):
+    def test_chunks_and_input_types(self):
+        rng = np.random.default_rng(25)
+        points = rng.integers(-100, 100, (1000, 2)).astype(np.int16)
+        origin = np.full(2, -100.0)
+        extent = np.full(2, 200.0)
+        expected = np.floor((points.astype(np.float64) - origin) / extent * 60).astype(np.int64)
+        previous = kernels.QUANTIZE_CHUNK_ROWS
+        kernels.QUANTIZE_CHUNK_ROWS = 77
+        try:
+            for dtype in [np.int16, np.int32, np.float32, np.float64]:
+                indexes = kernels.quantize(points.astype(dtype), origin, extent, 60)
+                self.assertEqual(indexes.dtype, np.int64)
+                np.testing.assert_array_equal(indexes, expected)
+        finally:
+            kernels.QUANTIZE_CHUNK_ROWS = previous
+
+
+class Test_backendSelection(unittest.TestCase):
+    def test_numpy_is_always_available(self):
+        self.assertIn("numpy", kernels.available_backends())
+        self.assertEqual(run_with_backend("numpy", kernels.get_backend), "numpy")
+
+    def test_auto_backend(self):
+        expected = "numba" if "numba" in kernels.available_backends() else "numpy"
+        self.assertEqual(run_with_backend("auto", kernels.get_backend), expected)
+
+    def test_invalid_backend(self):
+        self.assertRaises(Exception, kernels.set_backend, "cuda")
+
+    @unittest.skipIf("numba" in kernels.available_backends(), "Numba is installed")
+    def test_numba_is_unavailable(self):
+        self.assertRaises(Exception, kernels.set_backend, "numba")
+
+
+@unittest.skipIf("numba" not in kernels.available_backends(), "Numba is not installed")
+class Test_backendsAgree(unittest.TestCase):
+    rng = np.random.default_rng(18)
+
+    def assert_backends_agree(self, function, *args):
+        expected = run_with_backend("numpy", function, *args)
+        result = run_with_backend("numba", function, *args)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_quantize(self):
+        points = self.rng.random((1000, 3)) * 1.2 - 0.1
+        points[0] = 1.0
+        self.assert_backends_agree(kernels.quantize, points, np.zeros(3), np.ones(3), 10)
+        self.assert_backends_agree(kernels.quantize, points.astype(np.float32), np.zeros(3), np.ones(3),
+                                   np.asarray([7, 7, 7]))
+
+    def test_blocks_count(self):
+        points = fg.KochSnowflake().construct(6)
+        globalCell = fu.bounding_cell(points)
+        for mode in ["points", "lines"]:
+            for s in [3, 17, 64]:
+                counter = fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=s, mode=mode, storage="dense")
+                self.assert_backends_agree(counter.calculate, points)
+
+    def test_traverse_segments(self):
+        globalCell = fu.MultiCell(3, np.zeros(3), np.ones(3))
+        points = self.rng.random((300, 3))
+        # Segments through grid corners check order of simultaneous crossings
+        points[:4] = [[0.05, 0.05, 0.05], [0.95, 0.95, 0.95], [0.05, 0.95, 0.5], [0.95, 0.05, 0.5]]
+        self.assert_backends_agree(fu.polyline_cell_indexes, points, globalCell, 10)
+
+        # Coordinates difference of integer points does not fit int16
+        points = self.rng.integers(-32000, 32000, (300, 3)).astype(np.int16)
+        globalCell = fu.bounding_cell(points)
+        self.assert_backends_agree(fu.polyline_cell_indexes, points, globalCell, 10)
+        np.testing.assert_array_equal(run_with_backend("numpy", fu.polyline_cell_indexes, points, globalCell, 10),
+                                      fu.polyline_cell_indexes(points.astype(np.float64), globalCell, 10))
+
+    def test_correlation_sum(self):
+        points = self.rng.random((3000, 2))
+        radii = [0.01, 0.03, 0.1]
+        for metric in ["chebyshev", "euclidean"]:
+            self.assert_backends_agree(cs.correlation_sum, points, radii, 2, metric)
+            self.assert_backends_agree(cs.correlation_sum, points.astype(np.float32), radii, 2, metric)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import unittest
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import Multifractal as mf
+from fracdim import FractalGenerator as fg
+
+
+class Test_cellHistograms(unittest.TestCase):
+    def test_matches_direct_count(self):
+        rng = np.random.default_rng(12)
+        points = rng.random((3000, 2)) ** 2
+        globalCell = fu.MultiCell(2, np.zeros(2), np.ones(2))
+        for scales in [[2, 4, 8, 16], [3, 6, 12]]:
+            histograms = fu.cell_histograms(points, globalCell, scales)
+            for s, h in zip(scales, histograms):
+                indexes = fu.points_to_cell_indexes(points, globalCell, s)
+                cells, counts = np.unique(indexes, axis=0, return_counts=True)
+                self.assertEqual(h.dtype, np.uint32)
+                self.assertEqual(int(h.sum()), points.shape[0])
+                self.assertTrue(np.array_equal(np.sort(h), np.sort(counts)))
+
+
+class Test_renyiSpectrum(unittest.TestCase):
+    def test_uniform_measure(self):
+        # Every point of Sierpinski chaos game carries equal weight, so spectrum is flat.
+        # Negative q are not checked: they magnify cells which triangle covers partially
+        points = fg.SierpinskiTriangle(seed=4).construct(300000)
+        globalCell = fu.MultiCell(2, np.zeros(2), np.ones(2))
+        qs = [0, 1, 2, 4]
+        dq, alpha, f = mf.renyi_spectrum(points, globalCell, [2**i for i in range(2, 7)], qs)
+        expected = fg.SierpinskiTriangle.get_dimension()
+        self.assertTrue(np.allclose(dq, expected, atol=0.06))
+        self.assertTrue(np.allclose(alpha, expected, atol=0.06))
+        self.assertTrue(np.allclose(f, expected, atol=0.06))
+
+    def test_binomial_cascade(self):
+        # Binomial measure with weights p, 1-p has D_q = -log2(p**q + (1-p)**q) / (q - 1)
+        p = 0.3
+        depth = 14
+        weights = np.ones(1)
+        for level in range(0, depth):
+            weights = np.concatenate((weights * p, weights * (1 - p)))
+        rng = np.random.default_rng(5)
+        cells = rng.choice(weights.shape[0], size=2000000, p=weights)
+        points = ((cells + 0.5) / weights.shape[0]).reshape((-1, 1))
+        globalCell = fu.MultiCell(1, np.zeros(1), np.ones(1))
+        qs = np.asarray([0.0, 2.0, 3.0])
+        dq, alpha, f = mf.renyi_spectrum(points, globalCell, [2**i for i in range(3, 9)], qs)
+        expected = -np.log2(p**qs + (1 - p)**qs) / (qs - 1)
+        self.assertTrue(np.allclose(dq, expected, atol=0.03))
+        self.assertTrue(np.all(f <= alpha + 1e-9))
+
+    def test_single_scale(self):
+        globalCell = fu.MultiCell(1, np.zeros(1), np.ones(1))
+        self.assertRaises(Exception, mf.renyi_spectrum, np.zeros((3, 1)), globalCell, [4], [2])
+
+
+if __name__ == "__main__":
+    unittest.main()
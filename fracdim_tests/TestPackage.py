@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import sys
+import unittest
+
+import fracdim
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import fracdim" should stay far below import of numpy, which is about 0.1 s
+IMPORT_BUDGET_SECONDS = 0.05
+
+
+def run_python(code):
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = ROOT + os.pathsep + environment.get("PYTHONPATH", "")
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=environment, check=True,
+                          capture_output=True, text=True).stdout
+
+
+class Test_lazyImport(unittest.TestCase):
+    def test_import_loads_nothing(self):
+        output = run_python("import sys, fracdim; "
+                            "print(sorted(m for m in sys.modules if m.startswith('fracdim.') or "
+                            "m in ('numpy', 'numba')))")
+        self.assertEqual(output.strip(), "[]")
+
+    def test_import_time(self):
+        output = run_python("import time; start = time.perf_counter(); import fracdim; "
+                            "print(time.perf_counter() - start)")
+        self.assertLess(float(output), IMPORT_BUDGET_SECONDS)
+
+    def test_submodules_on_access(self):
+        output = run_python("import sys, fracdim; fracdim.TimeSeries; "
+                            "print('fracdim.TimeSeries' in sys.modules, 'fracdim.CorrelationSum' in sys.modules)")
+        self.assertEqual(output.strip(), "True False")
+        for name in fracdim.__all__:
+            self.assertEqual(getattr(fracdim, name).__name__, "fracdim." + name)
+        self.assertIn("Multifractal", dir(fracdim))
+        self.assertRaises(AttributeError, getattr, fracdim, "Missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
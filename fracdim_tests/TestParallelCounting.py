@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import ParallelCounting as pc
+from fracdim import FractalGenerator as fg
+
+
+class Test_SharedPoints(unittest.TestCase):
+    def test_attach(self):
+        points = np.arange(12.0).reshape((4, 3))
+        with pc.SharedPoints(points) as shared:
+            shm, attached = pc.attach_points(shared.descriptor())
+            self.assertTrue(np.array_equal(attached, points))
+            del attached
+            shm.close()
+
+    def test_embedding_is_not_copied(self):
+        series = np.cumsum(np.random.default_rng(6).standard_normal(1000))
+        points = fu.time_delay_embedding(series, 4, 3)
+        with pc.SharedPoints(points) as shared:
+            descriptor = shared.descriptor()
+            self.assertEqual(descriptor[0], "shm")
+            handle, attached = pc.attach_points(descriptor)
+            self.assertLess(handle.size, 2 * series.nbytes)
+            self.assertTrue(np.array_equal(attached, points))
+            del attached
+            handle.close()
+
+    def test_memmap_is_not_copied(self):
+        series = np.cumsum(np.random.default_rng(6).standard_normal(1000))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "series.npy")
+            np.save(path, series)
+            mapped = np.load(path, mmap_mode="r")
+            for points in [fu.time_delay_embedding(mapped[10:], 3, 2), mapped.reshape((-1, 4))[5:]]:
+                with pc.SharedPoints(points) as shared:
+                    descriptor = shared.descriptor()
+                    self.assertEqual(descriptor[:2], ("file", path))
+                    handle, attached = pc.attach_points(descriptor)
+                    self.assertTrue(np.array_equal(attached, points))
+                    del attached
+                    handle.close()
+            points = fu.time_delay_embedding(mapped, 2)
+            counter = fu.BlocksCounter(cellsPerAxis=30, mode="lines")
+            self.assertEqual(pc.count_by_chunks(points, None, 30, mode="lines", workers=2, chunks=3),
+                             counter.calculate(points))
+            del mapped, points
+
+
+class Test_parallelCounting(unittest.TestCase):
+    def setUp(self):
+        self.points = fg.KochSnowflake().construct(5)
+        self.globalCell = fu.MultiCell(2, np.asarray([-0.1, -0.4]), np.asarray([1.1, 0.9]))
+
+    def test_by_scales(self):
+        scales = [3, 10, 40, 100]
+        for mode in ["points", "lines"]:
+            counts = pc.count_by_scales(self.points, self.globalCell, scales, mode=mode, workers=2)
+            for s, c in zip(scales, counts):
+                counter = fu.BlocksCounter(globalCell=self.globalCell, cellsPerAxis=s, mode=mode)
+                self.assertEqual(c, counter.calculate(self.points))
+
+    def test_by_chunks(self):
+        for mode in ["points", "lines"]:
+            counter = fu.BlocksCounter(globalCell=self.globalCell, cellsPerAxis=50, mode=mode)
+            count = pc.count_by_chunks(self.points, self.globalCell, 50, mode=mode, workers=2, chunks=7)
+            self.assertEqual(count, counter.calculate(self.points))
+
+    def test_inferred_cell(self):
+        for mode in ["points", "lines"]:
+            counter = fu.BlocksCounter(cellsPerAxis=50, mode=mode)
+            expected = counter.calculate(self.points)
+            self.assertEqual(pc.count_by_chunks(self.points, None, 50, mode=mode, workers=2, chunks=5), expected)
+            self.assertEqual(list(pc.count_by_scales(self.points, None, [50], mode=mode, workers=1)), [expected])
+        self.assertEqual(pc.count_by_chunks(np.empty((0, 2)), None, 50, workers=1), 0)
+        self.assertEqual(pc.count_by_scales(self.points, self.globalCell, [], workers=2).shape, (0,))
+
+    def test_occupied_cells_merge(self):
+        counter = fu.BlocksCounter(globalCell=self.globalCell, cellsPerAxis=20, mode="lines")
+        half = self.points.shape[0] // 2
+        cells = fu.merge_cells([counter.occupied_cells(self.points[:half + 1]),
+                                counter.occupied_cells(self.points[half:])])
+        self.assertTrue(np.array_equal(cells, counter.occupied_cells(self.points)))
+        self.assertEqual(cells.shape[0], counter.calculate(self.points))
+
+
+if __name__ == "__main__":
+    unittest.main()
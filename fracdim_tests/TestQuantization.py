@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import FractalGenerator as fg
+from fracdim import Kernels as kernels
+from fracdim import Quantization as qz
+
+
+class Test_QuantizedPoints(unittest.TestCase):
+    points = fg.SierpinskiTriangle(seed=20).construct(20000)
+    globalCell = fu.bounding_cell(points)
+    scales = [1, 2, 8, 64, 1024]
+
+    def expected_counts(self, points, globalCell):
+        return [fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=s).calculate(points) for s in self.scales]
+
+    def test_compact_storage(self):
+        quantized = qz.QuantizedPoints.from_points(self.points, self.globalCell, bits=12)
+        self.assertEqual(quantized.get_indexes().dtype, np.uint16)
+        self.assertEqual(quantized.nbytes() * 4, self.points.nbytes)
+        self.assertEqual(qz.QuantizedPoints.from_points(self.points, bits=20).get_indexes().dtype, np.uint32)
+
+    def test_indexes_match_direct_quantization(self):
+        quantized = qz.QuantizedPoints.from_points(self.points, self.globalCell, bits=10)
+        for s in self.scales:
+            np.testing.assert_array_equal(quantized.indexes(s),
+                                          fu.points_to_cell_indexes(self.points, self.globalCell, s))
+        self.assertRaises(Exception, quantized.indexes, 3)
+        self.assertRaises(Exception, quantized.indexes, 2048)
+
+    def test_chunked_quantization(self):
+        chunkRows = kernels.QUANTIZE_CHUNK_ROWS
+        kernels.QUANTIZE_CHUNK_ROWS = 999
+        try:
+            quantized = qz.QuantizedPoints.from_points(self.points, self.globalCell, bits=10)
+            outside = np.vstack((self.points, [[10.0, 10.0]]))
+            self.assertRaises(Exception, qz.QuantizedPoints.from_points, outside, self.globalCell, 10)
+        finally:
+            kernels.QUANTIZE_CHUNK_ROWS = chunkRows
+        np.testing.assert_array_equal(quantized.get_indexes(),
+                                      fu.points_to_cell_indexes(self.points, self.globalCell, 1024))
+        self.assertEqual(qz.QuantizedPoints.from_points(self.points[:0], self.globalCell, bits=10).nbytes(), 0)
+
+    def test_box_counts(self):
+        expected = self.expected_counts(self.points, self.globalCell)
+        for bits in [10, 16]:
+            quantized = qz.QuantizedPoints.from_points(self.points, self.globalCell, bits=bits)
+            self.assertEqual(list(quantized.box_counts(self.scales)), expected)
+            counter = fu.BlocksCounter(globalCell=self.globalCell, cellsPerAxis=64)
+            self.assertEqual(counter.calculate_quantized(quantized), expected[3])
+
+    def test_box_counts_without_morton_codes(self):
+        rng = np.random.default_rng(20)
+        points = rng.random((3000, 5))
+        quantized = qz.QuantizedPoints.from_points(points, bits=16)
+        self.assertEqual(list(quantized.box_counts(self.scales)),
+                         self.expected_counts(points, quantized.get_global_cell()))
+
+    def test_grid(self):
+        quantized = qz.QuantizedPoints.from_points(self.points, self.globalCell, bits=10)
+        grid = quantized.grid(32)
+        direct = fu.MultiGrid()
+        direct.build(self.globalCell, 32, self.points)
+        np.testing.assert_array_equal(grid.get_cells(), direct.get_cells())
+        np.testing.assert_array_equal(grid.get_offsets(), direct.get_offsets())
+
+    def test_save_load(self):
+        quantized = qz.QuantizedPoints.from_points(self.points, bits=14)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "points.npy")
+            quantized.save(path)
+            for mmap in [False, True]:
+                loaded = qz.QuantizedPoints.load(path, mmap=mmap)
+                self.assertEqual(loaded.get_bits(), 14)
+                np.testing.assert_array_equal(loaded.get_indexes(), quantized.get_indexes())
+                np.testing.assert_array_equal(loaded.get_global_cell().get_max(),
+                                              quantized.get_global_cell().get_max())
+                self.assertEqual(list(loaded.box_counts(self.scales)), list(quantized.box_counts(self.scales)))
+                del loaded
+
+    def test_points_out_of_cell(self):
+        self.assertRaises(Exception, qz.QuantizedPoints.from_points, self.points + 1, self.globalCell)
+
+
+if __name__ == "__main__":
+    unittest.main()
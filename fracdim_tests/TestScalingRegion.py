@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import unittest
+import numpy as np
+
+from fracdim import FracdimUtils as fu
+from fracdim import ScalingRegion as sr
+
+
+class Test_fit_scaling_region(unittest.TestCase):
+    scales = 2.0 ** np.arange(1, 13)
+
+    def brute_force(self, counts, minPoints, penalty):
+        x = np.log(self.scales)
+        y = np.log(counts)
+        count = len(x)
+
+        def sse(a, b):
+            if b - a <= 2:
+                return 0.0
+            coefficients = np.polyfit(x[a:b], y[a:b], 1)
+            return float(((np.polyval(coefficients, x[a:b]) - y[a:b]) ** 2).sum())
+
+        best = None
+        for length in range(count, minPoints - 1, -1):
+            for a in range(0, count - length + 1):
+                b = a + length
+                cost = sse(0, a) + sse(a, b) + sse(b, count) + penalty * ((a > 0) + (b < count))
+                if best is None or cost < best[0] - 1e-12:
+                    best = (cost, a, b)
+        return best[1], best[2]
+
+    def test_saturated_curve(self):
+        counts = np.minimum(3 * self.scales ** 1.5, 5000.0)
+        counts[:2] = [2, 5]
+        fit = sr.fit_scaling_region(self.scales, counts)
+        self.assertEqual((fit.begin, fit.end), (2, 7))
+        self.assertAlmostEqual(fit.slope, 1.5)
+        self.assertAlmostEqual(fit.intercept, np.log(3))
+        self.assertLess(fit.lower, 1.5 + 1e-9)
+        self.assertGreater(fit.upper, 1.5 - 1e-9)
+
+    def test_straight_curve_is_fitted_entirely(self):
+        fit = sr.fit_scaling_region(self.scales, 7 * self.scales ** 2)
+        self.assertEqual((fit.begin, fit.end), (0, len(self.scales)))
+        self.assertAlmostEqual(fit.slope, 2.0)
+        self.assertAlmostEqual(fit.residual, 0.0)
+
+    def test_matches_brute_force_search(self):
+        rng = np.random.default_rng(24)
+        curves = np.exp(np.cumsum(rng.uniform(0.0, 2.0, (30, len(self.scales))), axis=1))
+        fit = sr.fit_scaling_region(self.scales, curves, minPoints=4, penalty=0.05)
+        for k in range(0, curves.shape[0]):
+            begin, end = self.brute_force(curves[k], 4, 0.05)
+            self.assertEqual((fit.begin[k], fit.end[k]), (begin, end))
+            x = np.log(self.scales[begin:end])
+            y = np.log(curves[k, begin:end])
+            coefficients, covariance = np.polyfit(x, y, 1, cov=True)
+            self.assertAlmostEqual(fit.slope[k], coefficients[0])
+            self.assertAlmostEqual(fit.intercept[k], coefficients[1])
+            self.assertAlmostEqual(fit.stderr[k], np.sqrt(covariance[0, 0]))
+            single = sr.fit_scaling_region(self.scales, curves[k], minPoints=4, penalty=0.05)
+            self.assertAlmostEqual(single.upper, fit.upper[k])
+
+    def test_confidence_interval(self):
+        rng = np.random.default_rng(25)
+        curves = np.exp(1.7 * np.log(self.scales) + rng.normal(0.0, 0.05, (2000, len(self.scales))))
+        fit = sr.fit_scaling_region(self.scales, curves, penalty=1.0)
+        np.testing.assert_array_equal(fit.end - fit.begin, len(self.scales))
+        covered = np.mean((fit.lower < 1.7) & (fit.upper > 1.7))
+        self.assertAlmostEqual(covered, 0.95, delta=0.02)
+
+    def test_invalid_counts(self):
+        counts = np.vstack((np.zeros(len(self.scales)), 5 * self.scales))
+        counts[1, 0] = 0
+        fit = sr.fit_scaling_region(self.scales, counts)
+        self.assertTrue(np.isnan(fit.slope[0]))
+        self.assertAlmostEqual(fit.slope[1], 1.0)
+        self.assertTrue(np.isnan(sr.fit_scaling_region([2, 4, 8], [4, 16, 64]).slope))
+        with self.assertRaises(Exception):
+            sr.fit_scaling_region([4, 2, 8, 16], [1, 2, 3, 4])
+
+    def test_box_counting_curve(self):
+        rng = np.random.default_rng(26)
+        points = rng.random((20000, 2))
+        scales = [2**i for i in range(1, 11)]
+        counts, dimension = fu.box_counting(points, fu.MultiCell(2, np.zeros(2), np.ones(2)), scales)
+        fit = sr.fit_scaling_region(scales, counts)
+        self.assertEqual(fit.begin, 0)
+        self.assertLess(fit.end, len(scales))
+        self.assertLess(fit.lower, 2.0)
+        self.assertGreater(fit.upper, 1.9)
+
+
+class Test_t_quantile(unittest.TestCase):
+    def test_table_values(self):
+        quantiles = sr.t_quantile(0.975, [1, 2, 3, 5, 10, 30, 0])
+        np.testing.assert_allclose(quantiles[:-1], [12.706, 4.303, 3.182, 2.571, 2.228, 2.042], rtol=2e-3)
+        self.assertTrue(np.isnan(quantiles[-1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
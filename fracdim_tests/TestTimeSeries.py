@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 
 from fracdim import TimeSeries as ts
+from fracdim import FracdimUtils as fu
 
+import os
+import tempfile
 import unittest
 import numpy as np
 
@@ -13,6 +16,201 @@ class Test_intrateByCellSize(unittest.TestCase):
         self.points = np.ndarray(shape=(self.pointsCount, self.dim))
 
     def test_1(self):
-        
-        pass
+        self.points[:, 0] = np.linspace(0, 1, self.pointsCount)
+        self.points[:, 1] = self.points[:, 0]
+        scales, counts, dimension = ts.intrateByCellSize(self.points, scales=[2, 4, 8, 16, 32])
+        self.assertEqual(list(counts), [2, 4, 8, 16, 32])
+        self.assertAlmostEqual(dimension, 1.0)
 
+    def test_default_scales(self):
+        rng = np.random.default_rng(3)
+        points = rng.random((20000, 2))
+        scales, counts, dimension = ts.intrateByCellSize(points)
+        self.assertEqual(scales[0], 2)
+        self.assertAlmostEqual(dimension, 2.0, delta=0.1)
+
+
+class Test_boxCounting(unittest.TestCase):
+    def test_sweep_matches_blocks_counter(self):
+        rng = np.random.default_rng(4)
+        points = rng.random((1000, 3))
+        points[0, :] = 1.0
+        globalCell = fu.MultiCell(3, np.zeros(3), np.ones(3))
+        for scales in [[1, 2, 4, 8, 16, 32], [3, 6, 12, 24], [2, 3, 6]]:
+            counts, dimension = fu.box_counting(points, globalCell, scales)
+            for s, c in zip(scales, counts):
+                counter = fu.BlocksCounter(cellsPerAxis=s, globalCell=globalCell)
+                self.assertEqual(c, counter.calculate(points))
+
+    def test_invalid_scales(self):
+        points = np.zeros((2, 2))
+        globalCell = fu.MultiCell(2, np.zeros(2), np.ones(2))
+        self.assertRaises(Exception, fu.box_counting, points, globalCell, [4, 3])
+
+    def test_points_out_of_cell(self):
+        points = np.ones((2, 2)) * 2
+        globalCell = fu.MultiCell(2, np.zeros(2), np.ones(2))
+        self.assertRaises(Exception, fu.box_counting, points, globalCell, [2, 4])
+
+
+class Test_streamCounting(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(8)
+        self.row = np.cumsum(rng.standard_normal(5000)).astype(np.float32)
+        self.row /= np.abs(self.row).max() * 2
+        self.globalCell = fu.MultiCell(3, -np.ones(3) * 0.5, np.ones(3) * 0.5)
+
+    def test_memmap_matches_whole_series(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "series.f32")
+            self.row.tofile(path)
+            source = np.memmap(path, dtype=np.float32, mode="r")
+            for mode in ["points", "lines"]:
+                counter = fu.BlocksCounter(globalCell=self.globalCell, cellsPerAxis=30, mode=mode)
+                expected = counter.calculate(fu.row_to_points(self.row, 3, lag=2))
+                count = ts.count_stream(source, self.globalCell, 30, 3, lag=2, mode=mode, chunkSize=333)
+                self.assertEqual(count, expected)
+            del source
+
+    def test_small_chunks(self):
+        chunks = [self.row[i:i + 3] for i in range(0, 200, 3)]
+        counter = fu.BlocksCounter(globalCell=self.globalCell, cellsPerAxis=10, mode="lines")
+        expected = counter.calculate(fu.row_to_points(self.row[:200], 3, lag=2))
+        self.assertEqual(ts.count_stream(iter(chunks), self.globalCell, 10, 3, lag=2, mode="lines"), expected)
+
+    def test_integer_samples(self):
+        samples = (self.row * 60000).astype(np.int16)
+        chunks = [samples[i:i + 500] for i in range(0, samples.shape[0], 500)]
+        globalCell = fu.bounding_cell(fu.time_delay_embedding(samples, 3, lag=2))
+        counter = fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=30, mode="lines")
+        expected = counter.calculate(fu.row_to_points(samples.astype(np.float64), 3, lag=2))
+        self.assertEqual(ts.count_stream(iter(chunks), globalCell, 30, 3, lag=2, mode="lines"), expected)
+
+    def test_inferred_cell(self):
+        row = self.row.astype(np.float64)
+        expected = fu.BlocksCounter(cellsPerAxis=16).calculate(fu.time_delay_embedding(row, 2))
+        self.assertEqual(ts.count_stream(row, None, 16, 2, chunkSize=1000), expected)
+        self.assertEqual(ts.count_stream(row[:1], None, 16, 2), 0)
+        self.assertRaises(Exception, ts.count_stream, iter([row]), None, 16, 2)
+        self.assertRaises(Exception, ts.StreamBlocksCounter, None, 16, 2)
+
+    def test_empty_stream(self):
+        self.assertEqual(ts.count_stream([], self.globalCell, 10, 3), 0)
+
+    def test_stream_stats(self):
+        counter = ts.StreamBlocksCounter(self.globalCell, 10, 3, lag=2, mode="lines", stats=True)
+        for i in range(0, 1000, 100):
+            counter.add_samples(self.row[i:i + 100])
+        stats = counter.get_stats()
+        self.assertEqual(stats.calls, 10)
+        # Every chunk boundary repeats one vector
+        self.assertEqual(stats.points, 996 + 9)
+        self.assertIn("embedding", stats.phases)
+        self.assertIn("merging", stats.phases)
+
+
+class Test_SlidingWindowDimension(unittest.TestCase):
+    def test_matches_blocks_counter(self):
+        rng = np.random.default_rng(9)
+        row = rng.random(400)
+        globalCell = fu.MultiCell(2, np.zeros(2), np.ones(2))
+        scales = [2, 4, 8, 16]
+        window = 50
+        sliding = ts.SlidingWindowDimension(globalCell, scales, 2, window, lag=3)
+        self.assertTrue(np.isnan(sliding.dimension()))
+
+        points = fu.row_to_points(row, 2, lag=3)
+        for i in range(0, row.shape[0]):
+            sliding.push(row[i])
+            last = i - 3
+            if last < 0 or i % 37 != 0:
+                continue
+            current = points[max(0, last - window + 1):last + 1]
+            counts, dimension = fu.box_counting(current, globalCell, scales)
+            self.assertTrue(np.array_equal(sliding.counts(), counts))
+            self.assertAlmostEqual(sliding.dimension(), dimension)
+
+    def test_boundary_samples_match_blocks_counter(self):
+        rng = np.random.default_rng(8)
+        row = rng.integers(0, 1000, 300).astype(float)
+        globalCell = fu.MultiCell(2, np.zeros(2), np.full(2, 999.0))
+        scales = [3, 37, 333, 999]
+        sliding = ts.SlidingWindowDimension(globalCell, scales, 2, 1000)
+        for sample in row:
+            sliding.push(sample)
+        points = fu.row_to_points(row, 2)
+        expected = [fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=s).calculate(points) for s in scales]
+        self.assertEqual(list(sliding.counts()), expected)
+
+    def test_outside_samples(self):
+        globalCell = fu.MultiCell(1, np.zeros(1), np.ones(1))
+        for sample in [-0.3, 1.7]:
+            sliding = ts.SlidingWindowDimension(globalCell, [2, 4], 1, 10)
+            sliding.push(0.5)
+            self.assertRaises(Exception, sliding.push, sample)
+
+        row = [0.1, -0.3, 0.6, 1.7, 0.9, 1.0, 0.35]
+        sliding = ts.SlidingWindowDimension(globalCell, [2, 4], 1, 3, outside="drop")
+        for i in range(0, len(row)):
+            sliding.push(row[i])
+            current = np.asarray(row[max(0, i - 2):i + 1]).reshape((-1, 1))
+            counter = fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=4, outside="drop")
+            self.assertEqual(sliding.counts()[1], counter.calculate(current))
+            self.assertEqual(sliding.outside_count(), counter.outside_count())
+        self.assertRaises(Exception, ts.SlidingWindowDimension, globalCell, [2], 1, 3, outside="clamp")
+
+    def test_invalid_window(self):
+        globalCell = fu.MultiCell(2, np.zeros(2), np.ones(2))
+        self.assertRaises(Exception, ts.SlidingWindowDimension, globalCell, [2, 4], 2, 0)
+
+
+class Test_batchBoxCounting(unittest.TestCase):
+    def expected_counts(self, row, dimension, scales, lag):
+        points = fu.row_to_points(row, dimension, lag)
+        if isinstance(points, int):
+            return [0] * len(scales)
+        size = row.max() - row.min()
+        pmin = np.full(dimension, row.min(), dtype=float)
+        pmax = pmin + (size if size != 0 else 1.0)
+        globalCell = fu.MultiCell(dimension, pmin, pmax)
+        return [fu.BlocksCounter(globalCell=globalCell, cellsPerAxis=s).calculate(points) for s in scales]
+
+    def test_matrix_of_series(self):
+        rng = np.random.default_rng(13)
+        series = np.cumsum(rng.standard_normal((50, 300)), axis=1)
+        scales = [2, 4, 8, 16]
+        counts, dimensions = ts.batch_box_counting(series, 2, scales, lag=2)
+        self.assertEqual(counts.shape, (50, 4))
+        for i in range(0, 50):
+            self.assertEqual(list(counts[i]), self.expected_counts(series[i], 2, scales, 2))
+            self.assertAlmostEqual(dimensions[i], fu.fit_dimension(scales, counts[i]))
+
+    def test_integer_series(self):
+        # Integer samples lie on cell boundaries, so rounding should match BlocksCounter exactly
+        rng = np.random.default_rng(15)
+        series = rng.integers(0, 1000, (200, 300)).astype(float)
+        scales = [4, 16, 64, 256]
+        counts, dimensions = ts.batch_box_counting(series, 2, scales)
+        for i in range(0, 200):
+            self.assertEqual(list(counts[i]), self.expected_counts(series[i], 2, scales, 1))
+
+    def test_ragged_series(self):
+        rng = np.random.default_rng(14)
+        series = [rng.random(n) for n in [1, 3, 100, 0, 57]] + [np.ones(10)]
+        scales = [4, 8, 32]
+        counts, dimensions = ts.batch_box_counting(series, 3, scales)
+        for i in range(0, len(series)):
+            self.assertEqual(list(counts[i]), self.expected_counts(series[i], 3, scales, 1))
+
+    def test_short_series_between_used_ones(self):
+        rng = np.random.default_rng(14)
+        a = rng.random(50)
+        c = rng.random(40)
+        scales = [2, 4, 8]
+        for series in [[a, [1000.0], c], [a, c, [1000.0]], [[-5.0, 7.0], a, [], [1000.0], c]]:
+            counts, dimensions = ts.batch_box_counting(series, 3, scales)
+            for i in range(0, len(series)):
+                self.assertEqual(list(counts[i]), self.expected_counts(np.asarray(series[i]), 3, scales, 1))
+
+    def test_invalid_scales(self):
+        self.assertRaises(Exception, ts.batch_box_counting, np.zeros((2, 10)), 2, [3, 4])
@@ -5,4 +5,14 @@ __all__ = [
     "TestFracdimUtils",
     "TestFractalGenerator",
     "TestTimeSeries",
+    "TestParallelCounting",
+    "TestBenchmarks",
+    "TestCorrelationSum",
+    "TestMultifractal",
+    "TestKernels",
+    "TestCountCache",
+    "TestQuantization",
+    "TestPackage",
+    "TestCommandLine",
+    "TestScalingRegion",
 ]